@@ -0,0 +1,100 @@
+"""
+Benchmarks the unscented and ensemble Kalman filters against the extended
+Kalman filter on the bundled fermentation. The measurements are the PLS
+glucose predictions of the fermentation spectra, with the HPLC glucose and
+ethanol samples fused as they arrive; without the spectra file, the HPLC
+glucose interpolated at the spectral rate plus noise stands in for them.
+
+    python benchmarks/kalman_filters.py [--members 100 1000] [--n-jobs 2]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from fermentools.chemometrics.models import load_pls_glucose_predictor
+from fermentools.datasets.ir import load_fermentation_hplc_data, load_fermentation_spectra_data
+from fermentools.datasets.ir._base import SAMPLING_INTERVAL
+from fermentools.mechanistic import MassBalance, YeastModel
+from fermentools.realtime import EnsembleKalmanFilter, ExtendedKalmanFilter, UnscentedKalmanFilter
+
+MEASUREMENT_VARIANCE = 0.25
+HPLC_COVARIANCE = np.diag([0.05, 0.05])
+MODEL_COVARIANCE = np.diag([1e-3, 1e-4, 1e-3])
+INITIAL_STATE = np.array([40.0, 0.45, 0.0])
+INITIAL_COVARIANCE = np.diag([10.0, 0.1, 0.1])
+
+
+def load_measurements(hplc):
+    try:
+        spectra = load_fermentation_spectra_data()
+    except FileNotFoundError:
+        times = np.arange(0, hplc.time.iloc[-1], SAMPLING_INTERVAL)
+        glucose = np.interp(times, hplc.time, hplc.glucose)
+        noise = np.random.default_rng(0).normal(0, np.sqrt(MEASUREMENT_VARIANCE), len(times))
+        return times, glucose + noise, "interpolated HPLC glucose"
+    glucose = load_pls_glucose_predictor().predict(spectra)[:, 0]
+    return np.arange(len(glucose)) * SAMPLING_INTERVAL, glucose, "PLS glucose predictions"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--n-jobs", type=int, default=None, help="worker processes of the largest ensemble")
+    args = parser.parse_args()
+
+    yeast_model = YeastModel(
+        model_type="monod_non_competitive",
+        substrate_biomass_yield=0.4,
+        substrate_product_yield=0.51,
+        max_uptake_rate=0.55,
+        affinity_constant=0.1,
+        substrate_inhibition_constant=5,
+    )
+    mass_balance = MassBalance(yeast_model, 0, 0)
+    hplc = load_fermentation_hplc_data()
+    times, glucose, source = load_measurements(hplc)
+
+    filters = {
+        "ExtendedKalmanFilter": lambda **kwargs: ExtendedKalmanFilter(**kwargs),
+        "UnscentedKalmanFilter": lambda **kwargs: UnscentedKalmanFilter(**kwargs),
+    }
+    for n_members in args.members:
+        filters[f"EnsembleKalmanFilter({n_members})"] = lambda n_members=n_members, **kwargs: EnsembleKalmanFilter(
+            n_members=n_members, random_state=0, **kwargs
+        )
+    if args.n_jobs:
+        n_members = max(args.members)
+        filters[f"EnsembleKalmanFilter({n_members}, n_jobs={args.n_jobs})"] = lambda **kwargs: EnsembleKalmanFilter(
+            n_members=n_members, random_state=0, n_jobs=args.n_jobs, **kwargs
+        )
+
+    print(f"{len(times)} measurements ({source}), {len(hplc)} HPLC samples")
+    print(f"{'filter':<44}{'time (s)':>10}{'per step (us)':>15}{'RMSE glucose':>14}{'RMSE ethanol':>14}")
+    for name, create in filters.items():
+        kalman_filter = create(
+            measurement_covariance=[[MEASUREMENT_VARIANCE]],
+            model_covariance=MODEL_COVARIANCE,
+            process_model=mass_balance,
+            initial_state=INITIAL_STATE,
+            initial_covariance=INITIAL_COVARIANCE,
+        )
+        start = time.perf_counter()
+        states, _ = kalman_filter.filter(glucose, times, hplc=hplc, hplc_covariance=HPLC_COVARIANCE)
+        elapsed = time.perf_counter() - start
+        if hasattr(kalman_filter, "close"):
+            kalman_filter.close()
+
+        # error of the estimates at the HPLC sampling times
+        errors = [
+            np.sqrt(np.mean((np.interp(hplc.time, times, states[:, state]) - hplc[column]) ** 2))
+            for column, state in [("glucose", 0), ("ethanol", 2)]
+        ]
+        print(
+            f"{name:<44}{elapsed:>10.3f}{elapsed / len(times) * 1e6:>15.1f}"
+            f"{errors[0]:>14.3f}{errors[1]:>14.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmarks the vectorised preprocessing operators against a naive loop that
+transforms one spectrum at a time.
+
+    python benchmarks/preprocessing.py [--dataset fermentation|training] [--repeat 5]
+"""
+import argparse
+import timeit
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+from scipy.signal import savgol_filter
+
+from fermentools.chemometrics.preprocessing import (
+    AsymmetricLeastSquaresBaseline,
+    MeanCentering,
+    MultiplicativeScatterCorrection,
+    PolynomialBaseline,
+    Smoothing,
+    StandardNormalVariate,
+)
+from fermentools.datasets.ir import load_fermentation_spectra_data, load_training_data
+
+
+def naive_standard_normal_variate(spectra: pd.DataFrame) -> pd.DataFrame:
+    return spectra.apply(lambda row: (row - row.mean()) / row.std(ddof=0), axis=1)
+
+
+def naive_multiplicative_scatter_correction(spectra: pd.DataFrame) -> pd.DataFrame:
+    reference = spectra.mean(axis=0).values
+
+    def correct(row):
+        slope, intercept = np.polyfit(reference, row.values, 1)
+        return (row - intercept) / slope
+
+    return spectra.apply(correct, axis=1)
+
+
+def naive_mean_centering(spectra: pd.DataFrame) -> pd.DataFrame:
+    mean = spectra.mean(axis=0)
+    return spectra.apply(lambda row: row - mean, axis=1)
+
+
+def naive_polynomial_baseline(spectra: pd.DataFrame, degree=2, max_iter=100, tol=1e-3) -> pd.DataFrame:
+    positions = np.linspace(-1.0, 1.0, spectra.shape[1])
+
+    def correct(row):
+        values = row.values
+        clipped = values.copy()
+        baseline = np.polyval(np.polyfit(positions, clipped, degree), positions)
+        clipped = np.minimum(clipped, baseline)
+        for _ in range(max_iter):
+            previous = baseline
+            baseline = np.polyval(np.polyfit(positions, clipped, degree), positions)
+            clipped = np.minimum(clipped, baseline)
+            if np.abs(baseline - previous).max() <= tol * np.abs(baseline).max():
+                break
+        return row - baseline
+
+    return spectra.apply(correct, axis=1)
+
+
+def naive_asymmetric_least_squares_baseline(spectra: pd.DataFrame, lam=1e5, p=0.01, max_iter=10) -> pd.DataFrame:
+    n_wavenumbers = spectra.shape[1]
+    difference = sparse.diags([1.0, -2.0, 1.0], [0, -1, -2], shape=(n_wavenumbers, n_wavenumbers - 2))
+    penalty = lam * difference.dot(difference.T)
+
+    def correct(row):
+        values = row.values
+        weights = np.ones(n_wavenumbers)
+        for _ in range(max_iter):
+            system = sparse.csc_matrix(sparse.spdiags(weights, 0, n_wavenumbers, n_wavenumbers) + penalty)
+            baseline = spsolve(system, weights * values)
+            weights = np.where(values > baseline, p, 1.0 - p)
+        return row - baseline
+
+    return spectra.apply(correct, axis=1)
+
+
+def naive_smoothing(spectra: pd.DataFrame) -> pd.DataFrame:
+    return spectra.apply(lambda row: pd.Series(savgol_filter(row.values, 15, 2), index=row.index), axis=1)
+
+
+BENCHMARKS = {
+    "StandardNormalVariate": (StandardNormalVariate(), naive_standard_normal_variate),
+    "MultiplicativeScatterCorrection": (MultiplicativeScatterCorrection(), naive_multiplicative_scatter_correction),
+    "MeanCentering": (MeanCentering(), naive_mean_centering),
+    "PolynomialBaseline": (PolynomialBaseline(), naive_polynomial_baseline),
+    "AsymmetricLeastSquaresBaseline": (AsymmetricLeastSquaresBaseline(), naive_asymmetric_least_squares_baseline),
+    "Smoothing": (Smoothing(), naive_smoothing),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", choices=["fermentation", "training"], default="fermentation")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.dataset == "fermentation":
+        spectra = load_fermentation_spectra_data()
+    else:
+        spectra = load_training_data()[0]
+    spectra = pd.DataFrame(np.array(spectra), columns=spectra.columns)
+    values = spectra.to_numpy()
+    buffer = np.empty_like(values)
+
+    print(f"{args.dataset} spectra: {spectra.shape[0]} x {spectra.shape[1]}")
+    print(f"{'operator':<32}{'naive (s)':>12}{'vectorised (s)':>16}{'in-place (s)':>14}{'speed-up':>10}")
+    for name, (operator, naive) in BENCHMARKS.items():
+        operator.fit(values)
+        expected = naive(spectra).to_numpy()
+        if not np.allclose(operator.apply_to(values), expected, atol=1e-6):
+            raise AssertionError(f"{name} does not match the naive implementation")
+
+        naive_time = min(timeit.repeat(lambda: naive(spectra), number=1, repeat=args.repeat))
+        vectorised_time = min(timeit.repeat(lambda: operator.apply_to(values), number=1, repeat=args.repeat))
+        in_place_time = min(
+            timeit.repeat(
+                lambda: operator.apply_to(buffer, out=buffer),
+                setup=lambda: np.copyto(buffer, values),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        print(
+            f"{name:<32}{naive_time:>12.4f}{vectorised_time:>16.4f}{in_place_time:>14.4f}"
+            f"{naive_time / vectorised_time:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
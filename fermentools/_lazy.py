@@ -0,0 +1,34 @@
+from typing import Callable, Dict, List, Tuple
+
+import importlib
+import sys
+
+
+def attach(package: str, imports: Dict[str, List[str]]) -> Tuple[Callable, Callable, List[str]]:
+    """
+    Lazy loading of the public names of a package. The submodule defining a
+    name is imported on the first access of the name, so that importing the
+    package does not import the dependencies of its submodules, e.g.
+    matplotlib or scikit-learn.
+    @param package __name__ of the package.
+    @param imports names defined by every submodule, e.g. {".plot_chemometrics": ["plot_spectra"]}.
+    @return __getattr__, __dir__ and __all__ of the package.
+    """
+    submodules = {name: submodule for submodule, names in imports.items() for name in names}
+    names = list(submodules)
+
+    def __getattr__(name: str):
+        if name not in submodules:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        submodule = submodules[name]
+        module = importlib.import_module(submodule, package)
+        namespace = vars(sys.modules[package])
+        # every name of the submodule is bound, also one that is the name of the submodule itself
+        for other in imports[submodule]:
+            namespace[other] = getattr(module, other)
+        return namespace[name]
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(names))
+
+    return __getattr__, __dir__, names
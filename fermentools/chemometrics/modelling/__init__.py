@@ -0,0 +1,19 @@
+from typing import TYPE_CHECKING
+
+from ..._lazy import attach
+
+# scikit-learn, mbpls and joblib are only imported when a modelling function is first used.
+# The submodules are private so that importing one never binds a module over a function of the same name.
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    {
+        "._cross_validation": ["cross_validation", "plot_cross_validation"],
+        "._pls_cross_validation": ["CrossValidationResult", "cross_validate", "pls_cross_validation"],
+        "._search": ["SearchResult", "search_preprocessing"],
+    },
+)
+
+if TYPE_CHECKING:
+    from ._cross_validation import cross_validation, plot_cross_validation
+    from ._pls_cross_validation import CrossValidationResult, cross_validate, pls_cross_validation
+    from ._search import SearchResult, search_preprocessing
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from ._pls_cross_validation import CrossValidationResult, cross_validate
+
+
+def plot_cross_validation(result: CrossValidationResult, ax=None):
+    """
+    Plots the training and validation error of a cross-validation against the
+    number of components. matplotlib is only imported when this is called.
+    @param result result of cross_validate.
+    @param ax optional matplotlib axes to draw on; a new figure is created otherwise.
+    @return ax: the matplotlib axes.
+    """
+    import matplotlib.pyplot as plt
+
+    if ax is None:
+        _, ax = plt.subplots(figsize=(10, 3))
+
+    ax.set_title("Cross-validation")
+    ax.set_xlabel("n_components")
+    ax.set_ylabel("root mean squared error")
+    ax.plot(
+        result.n_components,
+        result.train_rmse.mean(axis=0),
+        "o-",
+        label="Training error",
+        color="red",
+    )
+    ax.plot(
+        result.n_components,
+        np.sqrt(np.mean(np.reshape(result.rmsecv, (len(result.n_components), -1)) ** 2, axis=1)),
+        "o-",
+        label="Validation error",
+        color="blue",
+    )
+    ax.axvline(result.selected_n_components, color="gray", linestyle="--")
+    ax.legend()
+    return ax
+
+
+def cross_validation(X: pd.DataFrame, y: pd.DataFrame, plot: bool = True) -> CrossValidationResult:
+    """
+    Performs cross-validation on the data. By default it performs a leave-one-out cross-validation.
+    @param X spectra dataframe containing the spectra with the wavenumbers as columns.
+    @param y dataframe containing the reference hplc measurements.
+    @param plot whether to plot the results; matplotlib is not imported when False.
+    @return result: CrossValidationResult with the scores per fold and per number of components.
+    """
+
+    # Perform cross-validation: leave-one-out over 1 to 7 components, autoscaled as MBPLS(standardize=True)
+    result = cross_validate(X, y, max_components=7)
+
+    # Plot results
+    if plot:
+        import matplotlib.pyplot as plt
+
+        plot_cross_validation(result)
+        plt.show()
+
+    return result
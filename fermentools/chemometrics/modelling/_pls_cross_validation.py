@@ -0,0 +1,287 @@
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+
+from joblib import Parallel, delayed
+
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _kernel_pls(
+    xx_product: Callable[[np.ndarray], np.ndarray], xy: np.ndarray, n_components: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fits a PLS model from the cross-product matrices X'X and X'Y of centred (and
+    optionally scaled) data with the improved kernel algorithm of Dayal and
+    MacGregor. The models with fewer components are nested in the result: the
+    regression coefficients of the model with k components are R[:, :k] @ Q[:k].
+    @param xx_product function returning the product X'X v for a vector v
+    @param xy cross-product matrix X'Y, shape (n_features, n_targets)
+    @param n_components maximum number of components
+    @return rotations: X rotations R, shape (n_features, n_components)
+    @return y_loadings: Y loadings Q, shape (n_components, n_targets)
+    """
+    n_features, n_targets = xy.shape
+    xy = xy.copy()
+    rotations = np.zeros((n_features, n_components))
+    x_loadings = np.zeros((n_features, n_components))
+    y_loadings = np.zeros((n_components, n_targets))
+    tolerance = np.finfo(float).eps * max(np.linalg.norm(xy), np.finfo(float).tiny)
+
+    for component in range(n_components):
+        if n_targets == 1:
+            weights = xy[:, 0].copy()
+        else:
+            _, vectors = np.linalg.eigh(xy.T @ xy)
+            weights = xy @ vectors[:, -1]
+        norm = np.linalg.norm(weights)
+        if norm <= tolerance:
+            # the data is exhausted, the remaining components add nothing
+            break
+        weights /= norm
+
+        rotation = weights - rotations[:, :component] @ (x_loadings[:, :component].T @ weights)
+        xx_rotation = xx_product(rotation)
+        score_norm = rotation @ xx_rotation
+        if score_norm <= 0:
+            break
+
+        x_loadings[:, component] = xx_rotation / score_norm
+        y_loadings[component] = (rotation @ xy) / score_norm
+        rotations[:, component] = rotation
+        xy -= score_norm * np.outer(x_loadings[:, component], y_loadings[component])
+
+    return rotations, y_loadings
+
+
+def _nested_predictions(
+    x: np.ndarray, rotations: np.ndarray, y_loadings: np.ndarray
+) -> np.ndarray:
+    """
+    Predicts with every nested model at once.
+    @return predictions: shape (n_samples, n_components, n_targets)
+    """
+    scores = x @ rotations
+    return np.cumsum(scores[:, :, np.newaxis] * y_loadings[np.newaxis, :, :], axis=1)
+
+
+def _get_folds(cv, n_samples: int, x: np.ndarray) -> List[np.ndarray]:
+    if cv is None:
+        return [np.array([i]) for i in range(n_samples)]
+    if isinstance(cv, int):
+        if not 2 <= cv <= n_samples:
+            raise ValueError(f"cv must be between 2 and the number of samples ({n_samples}).")
+        return np.array_split(np.arange(n_samples), cv)
+    if hasattr(cv, "split"):
+        folds = [np.asarray(test) for _, test in cv.split(x)]
+    else:
+        folds = [np.asarray(test) for _, test in cv]
+    # every sample must be predicted exactly once for PRESS and RMSECV
+    counts = np.bincount(np.concatenate(folds).astype(int), minlength=n_samples) if folds else np.zeros(n_samples)
+    if len(counts) != n_samples or np.any(counts != 1):
+        raise ValueError(
+            "The test folds must cover every sample exactly once, e.g. KFold or LeaveOneOut, not ShuffleSplit "
+            "or RepeatedKFold."
+        )
+    return folds
+
+
+def _fit_fold(
+    x: np.ndarray,
+    y: np.ndarray,
+    xx: np.ndarray,
+    xy: np.ndarray,
+    test: np.ndarray,
+    n_components: int,
+    scale: bool,
+):
+    """
+    Fits the fold that leaves out the test samples by downdating the centred
+    cross-product matrices of the whole data set, and predicts the left out
+    and the training samples with every nested model.
+    """
+    n_samples = x.shape[0]
+    train = np.ones(n_samples, dtype=bool)
+    train[test] = False
+    n_train = n_samples - len(test)
+
+    x_test = x[test]
+    y_test = y[test]
+    # x and y are centred on the whole data set, so the sums over the training
+    # samples are minus the sums over the test samples. The fold X'X is never
+    # formed: it is the whole-data X'X downdated by the test rows and corrected
+    # for the fold mean, applied as a matrix-vector product.
+    x_mean = -x_test.sum(axis=0) / n_train
+    y_mean = -y_test.sum(axis=0) / n_train
+    xy_fold = xy - x_test.T @ y_test - n_train * np.outer(x_mean, y_mean)
+
+    if scale:
+        x_variance = np.diagonal(xx) - (x_test ** 2).sum(axis=0) - n_train * x_mean ** 2
+        x_std = np.sqrt(np.clip(x_variance, 0, None) / (n_train - 1))
+        x_std[x_std == 0] = 1.0
+        y_std = np.sqrt(((y[train] - y_mean) ** 2).sum(axis=0) / (n_train - 1))
+        y_std[y_std == 0] = 1.0
+    else:
+        x_std = np.ones(x.shape[1])
+        y_std = np.ones(y.shape[1])
+    xy_fold = xy_fold / np.outer(x_std, y_std)
+
+    def xx_product(vector: np.ndarray) -> np.ndarray:
+        vector = vector / x_std
+        product = xx @ vector - x_test.T @ (x_test @ vector) - n_train * x_mean * (x_mean @ vector)
+        return product / x_std
+
+    rotations, y_loadings = _kernel_pls(xx_product, xy_fold, n_components)
+    rotations = rotations / x_std[:, np.newaxis]
+    y_loadings = y_loadings * y_std
+
+    test_predictions = y_mean + _nested_predictions(x_test - x_mean, rotations, y_loadings)
+    train_predictions = y_mean + _nested_predictions(x[train] - x_mean, rotations, y_loadings)
+    train_rmse = np.sqrt(((train_predictions - y[train, np.newaxis, :]) ** 2).mean(axis=(0, 2)))
+
+    return test_predictions, train_rmse
+
+
+def _cross_validation_predictions(
+    x: np.ndarray,
+    y: np.ndarray,
+    max_components: int,
+    cv,
+    scale: bool,
+    n_jobs: Optional[int],
+):
+    """
+    Computes the cross-validated predictions of every nested PLS model.
+    @return predictions: cross-validated predictions, shape (n_samples, max_components, n_targets)
+    @return folds: list with the test indices of every fold
+    @return train_rmse: training error of every fold and model, shape (n_folds, max_components)
+    """
+    n_samples, n_features = x.shape
+    if max_components > min(n_samples - 1, n_features):
+        raise ValueError(
+            f"max_components must be at most {min(n_samples - 1, n_features)} for this data."
+        )
+
+    x_mean = x.mean(axis=0)
+    y_mean = y.mean(axis=0)
+    x = x - x_mean
+    y = y - y_mean
+    xx = x.T @ x
+    xy = x.T @ y
+
+    folds = _get_folds(cv, n_samples, x)
+    results = Parallel(n_jobs=n_jobs, prefer="threads")(
+        delayed(_fit_fold)(x, y, xx, xy, test, max_components, scale) for test in folds
+    )
+
+    predictions = np.empty((n_samples, max_components, y.shape[1]))
+    for test, (test_predictions, _) in zip(folds, results):
+        predictions[test] = test_predictions
+    train_rmse = np.array([train_rmse for _, train_rmse in results])
+
+    return predictions + y_mean, folds, train_rmse
+
+
+def _as_2d(y) -> np.ndarray:
+    y = np.asarray(y, dtype=float)
+    return y.reshape(-1, 1) if y.ndim == 1 else y
+
+
+@dataclass
+class CrossValidationResult:
+    """
+    Scores of a PLS cross-validation for every number of components.
+    @param n_components number of components of every model, shape (max_components,)
+    @param press prediction error sum of squares, shape (max_components,) or (max_components, n_targets)
+    @param rmsecv root mean squared error of cross-validation, same shape as press
+    @param fold_rmse validation error of every fold and model, shape (n_folds, max_components)
+    @param train_rmse training error of every fold and model, shape (n_folds, max_components)
+    @param predictions cross-validated predictions, shape (n_samples, max_components, n_targets)
+    @param folds test indices of every fold
+    @param fit_time wall time of the cross-validation in seconds
+    @param selected_n_components number of components with the lowest RMSECV (averaged over the targets)
+    """
+
+    n_components: np.ndarray
+    press: np.ndarray
+    rmsecv: np.ndarray
+    fold_rmse: np.ndarray
+    train_rmse: np.ndarray
+    predictions: np.ndarray
+    folds: List[np.ndarray]
+    fit_time: float
+    selected_n_components: int
+
+
+def cross_validate(
+    X: Union[pd.DataFrame, np.ndarray],
+    y: Union[pd.DataFrame, pd.Series, np.ndarray],
+    max_components: int = 7,
+    cv: Optional[Union[int, Iterable]] = None,
+    scale: bool = True,
+    n_jobs: Optional[int] = None,
+) -> CrossValidationResult:
+    """
+    Cross-validates PLS models with 1 to max_components components without
+    plotting. Every fold is fitted once with max_components and the smaller
+    models are read off the nested solution. The folds are obtained by
+    downdating the cross-product matrices of the whole data set, and can be run
+    in parallel with joblib.
+    @param X spectra dataframe containing the spectra with the wavenumbers as columns.
+    @param y reference measurements, one column per target.
+    @param max_components maximum number of PLS components.
+    @param cv None for leave-one-out, an int for contiguous k-fold, or a scikit-learn splitter / iterable of (train, test) indices whose test folds partition the samples.
+    @param scale whether to autoscale X and y in every fold, as MBPLS(standardize=True) does.
+    @param n_jobs number of folds fitted in parallel (joblib semantics).
+    @return result: CrossValidationResult with the scores per fold and per number of components.
+    """
+    start = time.perf_counter()
+    y_values = _as_2d(y)
+    predictions, folds, train_rmse = _cross_validation_predictions(
+        np.asarray(X, dtype=float), y_values, max_components, cv, scale, n_jobs
+    )
+
+    squared_errors = (predictions - y_values[:, np.newaxis, :]) ** 2
+    press = squared_errors.sum(axis=0)
+    rmsecv = np.sqrt(press / y_values.shape[0])
+    fold_rmse = np.array([np.sqrt(squared_errors[test].mean(axis=(0, 2))) for test in folds])
+    selected_n_components = int(np.argmin(rmsecv.mean(axis=1))) + 1
+    if np.ndim(y) == 1:
+        press, rmsecv = press[:, 0], rmsecv[:, 0]
+
+    return CrossValidationResult(
+        n_components=np.arange(1, max_components + 1),
+        press=press,
+        rmsecv=rmsecv,
+        fold_rmse=fold_rmse,
+        train_rmse=train_rmse,
+        predictions=predictions,
+        folds=folds,
+        fit_time=time.perf_counter() - start,
+        selected_n_components=selected_n_components,
+    )
+
+
+def pls_cross_validation(
+    X: Union[pd.DataFrame, np.ndarray],
+    y: Union[pd.DataFrame, pd.Series, np.ndarray],
+    max_components: int = 7,
+    cv: Optional[Union[int, Iterable]] = None,
+    scale: bool = True,
+    n_jobs: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cross-validates PLS models with 1 to max_components components, see cross_validate.
+    @param X spectra dataframe containing the spectra with the wavenumbers as columns.
+    @param y reference measurements, one column per target.
+    @param max_components maximum number of PLS components.
+    @param cv None for leave-one-out, an int for contiguous k-fold, or a scikit-learn splitter / iterable of (train, test) indices whose test folds partition the samples.
+    @param scale whether to autoscale X and y in every fold, as MBPLS(standardize=True) does.
+    @param n_jobs number of folds fitted in parallel (joblib semantics).
+    @return press: prediction error sum of squares, shape (max_components,) or (max_components, n_targets)
+    @return rmsecv: root mean squared error of cross-validation, same shape as press
+    """
+    result = cross_validate(X, y, max_components, cv, scale, n_jobs)
+    return result.press, result.rmsecv
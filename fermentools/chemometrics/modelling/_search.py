@@ -0,0 +1,226 @@
+from dataclasses import dataclass
+from itertools import product
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from joblib import Parallel, delayed
+from sklearn.base import clone
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from ..preprocessing.preprocessing import (
+    AsymmetricLeastSquaresBaseline,
+    Derivative,
+    PolynomialBaseline,
+    RangeCut,
+    StandardNormalVariate,
+)
+from ._pls_cross_validation import CrossValidationResult, cross_validate
+
+# steps that transform every spectrum on its own, without learning from the
+# data set, so their output does not depend on the cross-validation fold
+_ROW_WISE_STEPS = (
+    RangeCut,
+    Derivative,
+    StandardNormalVariate,
+    PolynomialBaseline,
+    AsymmetricLeastSquaresBaseline,
+)
+
+
+@dataclass
+class SearchResult:
+    """
+    Results of a preprocessing and PLS hyperparameter search.
+    @param candidates one row per preprocessing candidate with its parameters, the best number of components, its RMSECV
+    and the error that made it invalid
+    @param best_params preprocessing parameters of the best candidate
+    @param best_n_components number of components of the best candidate
+    @param best_rmsecv RMSECV of the best candidate
+    @param cv_results cross-validation result of every candidate, None if the candidate was invalid
+    @param fit_time wall time of the search in seconds
+    """
+
+    candidates: pd.DataFrame
+    best_params: Dict[str, object]
+    best_n_components: int
+    best_rmsecv: float
+    cv_results: List[Optional[CrossValidationResult]]
+    fit_time: float
+
+
+def _get_candidates(
+    param_grid: Dict[str, Sequence], n_iter: Optional[int], random_state
+) -> List[Dict[str, object]]:
+    names = list(param_grid)
+    candidates = [dict(zip(names, values)) for values in product(*param_grid.values())]
+    if n_iter is not None and n_iter < len(candidates):
+        rng = np.random.default_rng(random_state)
+        selected = np.sort(rng.choice(len(candidates), size=n_iter, replace=False))
+        candidates = [candidates[i] for i in selected]
+    return candidates
+
+
+def _step_params(candidate: Dict[str, object], name: str) -> Dict[str, object]:
+    prefix = name + "__"
+    return {key[len(prefix):]: value for key, value in candidate.items() if key.startswith(prefix)}
+
+
+def _cache_key(params: Dict[str, object]) -> Tuple:
+    return tuple(sorted((key, repr(value)) for key, value in params.items()))
+
+
+def _prefix_keys(steps: List[Tuple[str, object]], candidate: Dict[str, object]) -> List[Tuple]:
+    """
+    Cache keys of the output of every prefix of the pipeline of a candidate.
+    """
+    keys = []
+    key = ()
+    for name, _ in steps:
+        key = key + ((name, _cache_key(_step_params(candidate, name))),)
+        keys.append(key)
+    return keys
+
+
+def _preprocess(
+    x,
+    steps: List[Tuple[str, object]],
+    candidate: Dict[str, object],
+    keys: List[Tuple],
+    cache: Dict[Tuple, object],
+    shared: Iterable[Tuple],
+):
+    """
+    Applies the steps configured with the candidate parameters, reusing the
+    output of every prefix of the pipeline already computed for another
+    candidate with the same parameters. Only the prefixes shared with a later
+    candidate are cached.
+    """
+    for key, (name, template) in zip(keys, steps):
+        if key in cache:
+            x = cache[key]
+            continue
+
+        step = clone(template).set_params(**_step_params(candidate, name))
+        x = step.fit(x).transform(x)
+        if key in shared:
+            cache[key] = x
+    return x
+
+
+def _validate(x, y, max_components, cv, scale) -> Optional[CrossValidationResult]:
+    if x is None:
+        return None
+    n_samples, n_features = x.shape
+    max_components = min(max_components, n_samples - 1, n_features)
+    if max_components < 1:
+        return None
+    return cross_validate(x, y, max_components=max_components, cv=cv, scale=scale)
+
+
+def search_preprocessing(
+    X: Union[pd.DataFrame, np.ndarray],
+    y: Union[pd.DataFrame, pd.Series, np.ndarray],
+    steps: List[Tuple[str, object]],
+    param_grid: Dict[str, Sequence],
+    max_components: int = 7,
+    cv: Optional[Union[int, Iterable]] = None,
+    n_iter: Optional[int] = None,
+    random_state=None,
+    scale: bool = True,
+    n_jobs: Optional[int] = None,
+) -> SearchResult:
+    """
+    Searches the preprocessing parameters and the number of PLS components
+    together. Every preprocessing stage is computed once per distinct set of
+    parameters of the stages up to it and shared by all candidates downstream;
+    the numbers of components come from one nested cross-validation per
+    candidate. Candidates are cross-validated in parallel worker processes.
+    @param X spectra dataframe containing the spectra with the wavenumbers as columns.
+    @param y reference measurements, one column per target.
+    @param steps list of (name, step) preprocessing templates, e.g. [("rangecut", RangeCut(950, 1550)), ("derivative", Derivative(1))].
+    @param param_grid dictionary mapping "<name>__<parameter>" to the values to try.
+    @param max_components maximum number of PLS components.
+    @param cv None for leave-one-out, an int for contiguous k-fold, or a scikit-learn splitter / iterable of (train, test) indices whose test folds partition the samples.
+    @param n_iter number of candidates sampled from the grid for a random search; None searches the full grid.
+    @param random_state seed of the random search.
+    @param scale whether to autoscale X and y in every fold.
+    @param n_jobs number of worker processes (joblib semantics).
+    @return result: SearchResult with one row per candidate.
+    """
+    for name, step in steps:
+        if not isinstance(step, _ROW_WISE_STEPS):
+            raise TypeError(
+                f"Step '{name}' is not a row-wise preprocessing step; steps that learn from "
+                "the data cannot be shared between folds."
+            )
+    step_names = {name for name, _ in steps}
+    for key in param_grid:
+        if key.split("__", 1)[0] not in step_names:
+            raise ValueError(f"Parameter '{key}' does not refer to any step.")
+
+    start = time.perf_counter()
+    y = np.asarray(y, dtype=float)
+    if cv is not None and not isinstance(cv, int):
+        # materialise the splits once so that every candidate uses the same folds
+        cv = list(cv.split(np.asarray(X)) if hasattr(cv, "split") else cv)
+    candidates = _get_candidates(param_grid, n_iter, random_state)
+    keys = [_prefix_keys(steps, candidate) for candidate in candidates]
+    # index of the last candidate that uses every prefix
+    last_use = {key: i for i, candidate_keys in enumerate(keys) for key in candidate_keys}
+    cache: Dict[Tuple, object] = {}
+    errors: List[Optional[ValueError]] = [None] * len(candidates)
+
+    def preprocessed_candidates():
+        for i, candidate in enumerate(candidates):
+            shared = {key for key in keys[i] if last_use[key] > i}
+            try:
+                x = np.asarray(_preprocess(X, steps, candidate, keys[i], cache, shared), dtype=float)
+            except ValueError as e:
+                # e.g. a derivative window longer than the spectra
+                errors[i] = e
+                x = None
+            # the prefixes are dropped once no later candidate needs them
+            for key in keys[i]:
+                if last_use[key] == i:
+                    cache.pop(key, None)
+            yield candidate, x
+
+    cv_results = Parallel(n_jobs=n_jobs)(
+        delayed(_validate)(x, y, max_components, cv, scale)
+        for _, x in preprocessed_candidates()
+    )
+
+    rows = []
+    for candidate, result, error in zip(candidates, cv_results, errors):
+        row = dict(candidate)
+        row["error"] = None if error is None else str(error)
+        if result is None:
+            row.update(n_components=np.nan, rmsecv=np.nan)
+        else:
+            rmsecv = np.reshape(result.rmsecv, (len(result.n_components), -1)).mean(axis=1)
+            row.update(
+                n_components=result.selected_n_components,
+                rmsecv=rmsecv[result.selected_n_components - 1],
+            )
+        rows.append(row)
+    table = pd.DataFrame(rows)
+
+    if table["rmsecv"].isna().all():
+        first_error = next((error for error in errors if error is not None), None)
+        if first_error is not None:
+            # the same error for every candidate is rather a misconfiguration, e.g. a RangeCut without wavenumbers
+            raise ValueError(f"None of the candidates could be preprocessed: {first_error}") from first_error
+        raise ValueError("None of the candidates could be cross-validated.")
+    best = int(table["rmsecv"].idxmin())
+
+    return SearchResult(
+        candidates=table,
+        best_params=candidates[best],
+        best_n_components=int(table.loc[best, "n_components"]),
+        best_rmsecv=float(table.loc[best, "rmsecv"]),
+        cv_results=cv_results,
+        fit_time=time.perf_counter() - start,
+    )
@@ -1 +1,5 @@
-from .load_pls_glucose_model import load_pls_glucose_model
\ No newline at end of file
+from .load_pls_glucose_model import load_pls_glucose_model
+from .load_pls_glucose_predictor import load_pls_glucose_predictor
+from .linear_spectral_predictor import LinearSpectralPredictor
+from .export_linear_predictor import export_linear_predictor
+from .model_registry import ModelRegistry, get_model_registry
@@ -0,0 +1,112 @@
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .linear_spectral_predictor import LinearSpectralPredictor
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def _linear_model_coefficients(model) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reads the affine map y = x @ coef + intercept of a fitted linear model from
+    its attributes, without calling its predict method.
+    @param model fitted MBPLS, PLSRegression or scikit-learn linear model
+    @return coef: shape (n_features, n_targets)
+    @return intercept: shape (n_targets,)
+    """
+    if hasattr(model, "beta_"):
+        # MBPLS: y = y_scaler^-1(x_scaler(x) @ beta)
+        beta = np.asarray(model.beta_, dtype=float)
+        beta = beta.reshape(len(beta), -1)
+        if not getattr(model, "standardize", False):
+            return beta, np.zeros(beta.shape[1])
+        if len(model.x_scalers_) != 1:
+            raise ValueError("Only single block MBPLS models can be exported.")
+        x_mean, x_scale = _scaler_parameters(model.x_scalers_[0], beta.shape[0])
+        y_mean, y_scale = _scaler_parameters(model.y_scaler_, beta.shape[1])
+        coef = beta / x_scale[:, np.newaxis] * y_scale
+        return coef, y_mean - (x_mean / x_scale) @ beta * y_scale
+
+    if hasattr(model, "coef_") and hasattr(model, "intercept_"):
+        # PLSRegression centres x before applying coef_, linear models do not
+        coef = np.atleast_2d(np.asarray(model.coef_, dtype=float)).T
+        intercept = np.asarray(model.intercept_, dtype=float).reshape(-1)
+        if hasattr(model, "_x_mean"):
+            intercept = intercept - np.asarray(model._x_mean, dtype=float) @ coef
+        return coef, intercept
+
+    raise TypeError(f"{type(model).__name__} is not a supported linear model.")
+
+
+def _scaler_parameters(scaler, n_features: int) -> Tuple[np.ndarray, np.ndarray]:
+    mean = scaler.mean_ if getattr(scaler, "with_mean", True) else None
+    scale = scaler.scale_ if getattr(scaler, "with_std", True) else None
+    mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=float)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=float)
+    return mean, scale
+
+
+def _preprocess(x: "pd.DataFrame", steps: List) -> np.ndarray:
+    for step in steps:
+        x = step.transform(x)
+    return np.asarray(x, dtype=float)
+
+
+def export_linear_predictor(
+    model,
+    preprocessing: Optional[Union[List, object]],
+    wavenumbers: Sequence[float],
+    targets: Optional[Sequence[str]] = None,
+    path: Optional[str] = None,
+) -> LinearSpectralPredictor:
+    """
+    Folds the preprocessing and a fitted linear calibration model into one
+    coefficient vector and intercept over the raw spectra. The preprocessing
+    must be affine (e.g. RangeCut, Derivative, Smoothing, fitted MeanCentering);
+    the map is probed with the unit spectra and checked on random spectra.
+    @param model fitted MBPLS, PLSRegression or scikit-learn linear model.
+    @param preprocessing list of fitted preprocessing steps applied in order, a FusedPreprocessing, or None.
+    @param wavenumbers wavenumber axis of the raw spectra.
+    @param targets names of the predicted targets.
+    @param path optional .npz file to save the predictor to.
+    @return predictor: LinearSpectralPredictor
+    """
+    # pandas is only needed to export, not by the predictor
+    import pandas as pd
+
+    if preprocessing is None:
+        steps = []
+    elif isinstance(preprocessing, (list, tuple)):
+        steps = list(preprocessing)
+    else:
+        steps = [preprocessing]
+    for step in getattr(preprocessing, "steps", steps):
+        if not getattr(step, "__sklearn_is_fitted__", lambda: True)():
+            raise ValueError(f"{type(step).__name__} must be fitted before it is exported.")
+
+    wavenumbers = np.asarray(wavenumbers, dtype=float)
+    n_features = len(wavenumbers)
+    coef, intercept = _linear_model_coefficients(model)
+
+    # the first probe is the zero spectrum, the others are the unit spectra
+    probes = np.vstack([np.zeros(n_features), np.eye(n_features)])
+    responses = _preprocess(pd.DataFrame(probes, columns=wavenumbers), steps) @ coef + intercept
+    full_intercept = responses[0]
+    full_coef = responses[1:] - full_intercept
+
+    rng = np.random.default_rng(0)
+    check = rng.standard_normal((4, n_features))
+    expected = _preprocess(pd.DataFrame(check, columns=wavenumbers), steps) @ coef + intercept
+    if not np.allclose(check @ full_coef + full_intercept, expected, rtol=1e-6, atol=1e-8):
+        raise ValueError("The preprocessing is not affine and cannot be folded into the model.")
+
+    support = np.flatnonzero(np.any(full_coef != 0, axis=1))
+    start, stop = (support[0], support[-1] + 1) if len(support) else (0, 0)
+    predictor = LinearSpectralPredictor(
+        full_coef[start:stop], full_intercept, wavenumbers, start, targets
+    )
+    if path is not None:
+        predictor.save(path)
+    return predictor
@@ -0,0 +1,94 @@
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+class LinearSpectralPredictor:
+    """
+    Predicts concentrations from raw spectra with a single affine map,
+    y = X[:, start:stop] @ coef + intercept. The preprocessing and the
+    centering/scaling of a linear calibration model are folded into coef and
+    intercept by export_linear_predictor, so predicting only needs numpy.
+    """
+
+    def __init__(
+        self,
+        coef: np.ndarray,
+        intercept: np.ndarray,
+        wavenumbers: np.ndarray,
+        start: int = 0,
+        targets: Optional[Sequence[str]] = None,
+    ):
+        """
+        Constructor.
+        @param coef regression coefficients over the support of the model, shape (n_support, n_targets)
+        @param intercept intercept of every target, shape (n_targets,)
+        @param wavenumbers wavenumber axis of the raw spectra the model is applied to
+        @param start index of the first wavenumber of the support
+        @param targets names of the predicted targets
+        """
+        coef = np.asarray(coef, dtype=float)
+        self.coef = coef.reshape(len(coef), -1)
+        self.intercept = np.asarray(intercept, dtype=float).reshape(-1)
+        self.wavenumbers = np.asarray(wavenumbers, dtype=float)
+        self.start = int(start)
+        self.stop = self.start + len(self.coef)
+        self.targets = [str(target) for target in targets] if targets is not None else None
+
+        if self.intercept.shape != (self.coef.shape[1],):
+            raise ValueError("intercept must have one value per target.")
+        if not 0 <= self.start <= self.stop <= len(self.wavenumbers):
+            raise ValueError("The support of the model does not fit in the wavenumber axis.")
+        if self.targets is not None and len(self.targets) != self.coef.shape[1]:
+            raise ValueError("targets must have one name per target.")
+
+    @property
+    def n_features_in(self) -> int:
+        """
+        Number of wavenumbers of the raw spectra.
+        """
+        return len(self.wavenumbers)
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predicts the concentrations of the spectra.
+        @param X raw spectra, a dataframe or array with one spectrum per row, or a single 1-D spectrum.
+        @return predictions: array of shape (n_samples, n_targets), or (n_targets,) for a single spectrum.
+        """
+        x = X.to_numpy() if hasattr(X, "to_numpy") else np.asarray(X)
+        if x.shape[-1] != self.n_features_in:
+            raise ValueError(
+                f"X has {x.shape[-1]} wavenumbers, the model expects {self.n_features_in}."
+            )
+        return x[..., self.start : self.stop] @ self.coef + self.intercept
+
+    def save(self, path: str) -> None:
+        """
+        Saves the predictor to a .npz file.
+        @param path destination file.
+        """
+        arrays = {
+            "coef": self.coef,
+            "intercept": self.intercept,
+            "wavenumbers": self.wavenumbers,
+            "start": np.array(self.start),
+        }
+        if self.targets is not None:
+            arrays["targets"] = np.array(self.targets, dtype=str)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "LinearSpectralPredictor":
+        """
+        Loads a predictor saved with save.
+        @param path .npz file.
+        @return predictor: LinearSpectralPredictor
+        """
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                coef=data["coef"],
+                intercept=data["intercept"],
+                wavenumbers=data["wavenumbers"],
+                start=int(data["start"]),
+                targets=data["targets"].tolist() if "targets" in data else None,
+            )
@@ -1,12 +1,15 @@
-from mbpls.mbpls import MBPLS
+from typing import TYPE_CHECKING
 
-import joblib
-import os
+from .model_registry import get_model_registry
 
-MODEL_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+if TYPE_CHECKING:
+    from mbpls.mbpls import MBPLS
 
-def load_pls_glucose_model() -> MBPLS:
-    with open(
-            os.path.join(MODEL_DIRECTORY, "./pls_glucose.joblib"), "rb"
-        ) as f:
-            return joblib.load(f)
+
+def load_pls_glucose_model() -> "MBPLS":
+    """
+    Returns the bundled PLS glucose model. It is loaded on the first call and
+    shared by the following ones, so it must not be modified.
+    @return model: fitted MBPLS model
+    """
+    return get_model_registry().get("pls_glucose")
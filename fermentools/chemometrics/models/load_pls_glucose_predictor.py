@@ -0,0 +1,13 @@
+from .linear_spectral_predictor import LinearSpectralPredictor
+from .model_registry import get_model_registry
+
+
+def load_pls_glucose_predictor() -> LinearSpectralPredictor:
+    """
+    Loads the bundled PLS glucose model compiled to a LinearSpectralPredictor.
+    It predicts from the raw spectra, the RangeCut(950, 1550) and
+    Derivative(1, 15, 1) preprocessing being folded into its coefficients.
+    The predictor is loaded once and shared by the following calls.
+    @return predictor: LinearSpectralPredictor
+    """
+    return get_model_registry().get("pls_glucose_predictor")
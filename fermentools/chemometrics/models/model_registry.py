@@ -0,0 +1,239 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import os
+import threading
+import weakref
+
+from .linear_spectral_predictor import LinearSpectralPredictor
+
+MODEL_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+LATEST = "latest"
+
+# mmap_mode of a registration that uses the one of the registry
+_DEFAULT = object()
+
+_REGISTRIES: "weakref.WeakSet[ModelRegistry]" = weakref.WeakSet()
+
+
+def _load_file(path: str, mmap_mode: Optional[str]):
+    if path.endswith(".npz"):
+        return LinearSpectralPredictor.load(path)
+
+    import joblib
+
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+
+def _model_nbytes(model, depth: int = 3) -> int:
+    """
+    Estimates the memory held by a model as the size of the arrays reachable
+    from its attributes. Memory-mapped arrays are shared between processes
+    and page cache backed, so they are not counted.
+    """
+    if isinstance(model, np.memmap):
+        return 0
+    if isinstance(model, np.ndarray):
+        return model.nbytes
+    if depth == 0:
+        return 0
+    if isinstance(model, dict):
+        values = model.values()
+    elif isinstance(model, (list, tuple)):
+        values = model
+    elif hasattr(model, "__dict__"):
+        values = vars(model).values()
+    else:
+        return 0
+    return sum(_model_nbytes(value, depth - 1) for value in values)
+
+
+class ModelRegistry:
+    """
+    Process-wide store of calibration models keyed by name and version. Models
+    are loaded lazily on first use and the least recently used ones are
+    evicted when the number of loaded models or their size exceeds the bounds.
+    Joblib models are memory-mapped read-only, so processes forked after a
+    model is loaded share one copy of its arrays.
+    """
+
+    def __init__(
+        self,
+        max_models: Optional[int] = 8,
+        max_bytes: Optional[int] = None,
+        mmap_mode: Optional[str] = "r",
+    ):
+        """
+        Constructor.
+        @param max_models maximum number of models kept in memory, None for no bound.
+        @param max_bytes maximum size of the arrays of the loaded models that are not memory-mapped, None for no bound.
+        @param mmap_mode memory-map mode passed to joblib.load.
+        """
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.mmap_mode = mmap_mode
+        self._loaders: Dict[Tuple[str, str], Callable[[], Any]] = {}
+        self._latest: Dict[str, str] = {}
+        self._models: "OrderedDict[Tuple[str, str], Tuple[Any, int]]" = OrderedDict()
+        self._loading: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _REGISTRIES.add(self)
+
+    def register(
+        self,
+        name: str,
+        path: Optional[str] = None,
+        version: str = "1",
+        loader: Optional[Callable[[], Any]] = None,
+        mmap_mode: Any = _DEFAULT,
+    ) -> None:
+        """
+        Registers a model without loading it. The last registered version of a
+        name is the one returned when no version is requested.
+        @param name model name.
+        @param path .joblib or .npz file with the model.
+        @param version model version.
+        @param loader function returning the model, instead of a path.
+        @param mmap_mode memory-map mode of this model, e.g. None for a file written before joblib 1.2 whose arrays are
+        not aligned; the mmap_mode of the registry by default.
+        """
+        if (path is None) == (loader is None):
+            raise ValueError("Pass either a path or a loader.")
+        if loader is None:
+            loader = lambda: _load_file(path, self.mmap_mode if mmap_mode is _DEFAULT else mmap_mode)
+
+        key = (name, str(version))
+        with self._lock:
+            self._loaders[key] = loader
+            self._latest[name] = key[1]
+            # a new registration replaces the model loaded for the same key
+            self._models.pop(key, None)
+
+    def get(self, name: str, version: Optional[str] = None):
+        """
+        Returns a model, loading it on first use. The model is shared by every
+        caller and must not be modified.
+        @param name model name.
+        @param version model version, None or "latest" for the last registered one.
+        @return model
+        """
+        key = self._resolve(name, version)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key][0]
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        # load outside the registry lock, so other models stay available, but
+        # only once per key when several threads ask for it at the same time
+        with loading:
+            try:
+                with self._lock:
+                    if key in self._models:
+                        self._models.move_to_end(key)
+                        self.hits += 1
+                        return self._models[key][0]
+                    loader = self._loaders[key]
+                model = loader()
+                with self._lock:
+                    self.misses += 1
+                    self._models[key] = (model, _model_nbytes(model))
+                    self._evict()
+                return model
+            finally:
+                # also when the loader raises, so that the next get tries again
+                with self._lock:
+                    if self._loading.get(key) is loading:
+                        del self._loading[key]
+
+    def evict(self, name: str, version: Optional[str] = None) -> None:
+        """
+        Removes a model from memory; it is loaded again on the next get.
+        @param name model name.
+        @param version model version, None or "latest" for the last registered one.
+        """
+        key = self._resolve(name, version)
+        with self._lock:
+            self._models.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Removes every loaded model from memory, keeping the registrations.
+        """
+        with self._lock:
+            self._models.clear()
+
+    @property
+    def loaded(self) -> List[Tuple[str, str]]:
+        """
+        (name, version) of the loaded models, from the least to the most recently used.
+        """
+        with self._lock:
+            return list(self._models)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Size of the arrays of the loaded models that are not memory-mapped.
+        """
+        with self._lock:
+            return sum(nbytes for _, nbytes in self._models.values())
+
+    def _resolve(self, name: str, version: Optional[str]) -> Tuple[str, str]:
+        with self._lock:
+            if name not in self._latest:
+                raise KeyError(f"Model '{name}' is not registered.")
+            version = self._latest[name] if version in (None, LATEST) else str(version)
+            if (name, version) not in self._loaders:
+                raise KeyError(f"Model '{name}' has no version '{version}'.")
+        return name, version
+
+    def _evict(self) -> None:
+        # the most recently loaded model is always kept
+        while len(self._models) > 1 and (
+            (self.max_models is not None and len(self._models) > self.max_models)
+            or (
+                self.max_bytes is not None
+                and sum(nbytes for _, nbytes in self._models.values()) > self.max_bytes
+            )
+        ):
+            self._models.popitem(last=False)
+            self.evictions += 1
+
+    def _after_fork(self) -> None:
+        # a lock held by another thread at fork time would never be released
+        self._lock = threading.Lock()
+        self._loading = {}
+
+
+def _after_fork() -> None:
+    for registry in list(_REGISTRIES):
+        registry._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+_REGISTRY = ModelRegistry()
+# the bundled model was written before joblib 1.2, so its arrays are not
+# aligned for memory-mapping; it is small and loaded into memory instead
+_REGISTRY.register("pls_glucose", os.path.join(MODEL_DIRECTORY, "pls_glucose.joblib"), mmap_mode=None)
+_REGISTRY.register(
+    "pls_glucose_predictor", os.path.join(MODEL_DIRECTORY, "pls_glucose.npz")
+)
+
+
+def get_model_registry() -> ModelRegistry:
+    """
+    Returns the process-wide model registry, with the bundled models registered
+    as "pls_glucose" (MBPLS) and "pls_glucose_predictor" (LinearSpectralPredictor).
+    @return registry: ModelRegistry
+    """
+    return _REGISTRY
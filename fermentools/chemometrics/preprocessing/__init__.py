@@ -1,2 +1,9 @@
 from .preprocessing import RangeCut
 from .preprocessing import Derivative
+from .preprocessing import FusedPreprocessing
+from .preprocessing import Smoothing
+from .preprocessing import StandardNormalVariate
+from .preprocessing import MultiplicativeScatterCorrection
+from .preprocessing import MeanCentering
+from .preprocessing import PolynomialBaseline
+from .preprocessing import AsymmetricLeastSquaresBaseline
@@ -1,57 +1,613 @@
-from scipy.signal import savgol_filter
+from functools import lru_cache
+from typing import List, Optional, Union
 
+from numpy.typing import ArrayLike
+from scipy.linalg import solveh_banded
+from scipy.ndimage import correlate1d
+from scipy.signal import savgol_coeffs
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.utils.validation import check_is_fitted
+
+import numpy as np
 import pandas as pd
 
 
-class RangeCut:
+class RangeCut(TransformerMixin, BaseEstimator):
     """
     Cuts a dataframe selecting the wavenumbers between start and end.
     """
 
-    def __init__(self, start: int, end: int):
+    def __init__(self, start: int, end: int, wavenumbers: Optional[ArrayLike] = None):
         """
         Constructor.
         @param start start wavenumber
         @param end end wavenumber
+        @param wavenumbers wavenumber axis of the spectra, needed to cut arrays without column labels
         """
         self.start = start
         self.end = end
+        self.wavenumbers = wavenumbers
 
-    def apply_to(self, x: pd.DataFrame) -> pd.DataFrame:
+    def fit(self, x: Union[pd.DataFrame, np.ndarray], y=None) -> "RangeCut":
+        """
+        Resolves the start and end wavenumbers to a column slice.
+        @param x dataframe containing the spectra with the wavenumbers as columns, or an array.
+        @return self
         """
-        Applies the cut to the dataframe.
-        @param x dataframe containing the spectra with the wavenumbers as columns.
-        @return range cut dataframe
+        self._resolve(self._get_axis(x))
+        return self
+
+    def apply_to(
+        self, x: Union[pd.DataFrame, np.ndarray]
+    ) -> Union[pd.DataFrame, np.ndarray]:
         """
-        return x.loc[:, self.start : self.end]
+        Applies the cut to the dataframe. The column slice is computed once per
+        wavenumber axis and the result is a view of the input.
+        @param x dataframe containing the spectra with the wavenumbers as columns, or an array.
+        @return range cut dataframe, or array if x is an array
+        """
+        columns = self._get_slice(x)
+
+        if isinstance(x, pd.DataFrame):
+            return x.iloc[:, columns]
+        return np.asarray(x)[..., columns]
+
+    def transform(self, x: Union[pd.DataFrame, np.ndarray]) -> Union[pd.DataFrame, np.ndarray]:
+        """
+        Applies the cut, see apply_to.
+        @param x dataframe containing the spectra with the wavenumbers as columns, or an array.
+        @return range cut dataframe, or array if x is an array
+        """
+        return self.apply_to(x)
+
+    def _get_slice(self, x: Union[pd.DataFrame, np.ndarray]) -> slice:
+        axis = self._get_axis(x)
+        if not self._is_resolved_for(axis):
+            self._resolve(axis)
+        return self.slice_
 
+    def _get_axis(self, x: Union[pd.DataFrame, np.ndarray]):
+        if isinstance(x, pd.DataFrame):
+            return x.columns
+        if self.wavenumbers is not None:
+            return self.wavenumbers
+        if hasattr(self, "axis_"):
+            return self.axis_
+        raise ValueError(
+            "Wavenumbers are needed to cut an array: pass a dataframe or set wavenumbers."
+        )
 
-class Derivative:
+    def _is_resolved_for(self, axis) -> bool:
+        if not hasattr(self, "axis_"):
+            return False
+        if axis is self._axis_source:
+            return True
+        axis = np.asarray(axis, dtype=float)
+        return axis.shape == self.axis_.shape and np.array_equal(axis, self.axis_)
+
+    def _resolve(self, axis) -> None:
+        wavenumbers = np.asarray(axis, dtype=float)
+        n_wavenumbers = len(wavenumbers)
+        if n_wavenumbers > 1 and wavenumbers[0] > wavenumbers[-1]:
+            reversed_wavenumbers = wavenumbers[::-1]
+            first = n_wavenumbers - np.searchsorted(reversed_wavenumbers, self.end, "right")
+            last = n_wavenumbers - np.searchsorted(reversed_wavenumbers, self.start, "left")
+        else:
+            first = np.searchsorted(wavenumbers, self.start, "left")
+            last = np.searchsorted(wavenumbers, self.end, "right")
+
+        self._axis_source = axis
+        self.axis_ = wavenumbers
+        self.slice_ = slice(int(first), int(max(first, last)))
+        self.wavenumbers_ = wavenumbers[self.slice_]
+
+
+@lru_cache(maxsize=None)
+def _savgol_kernels(
+    window_length: int, polynomial_order: int, derivative_order: int, dtype: str
+):
+    """
+    Computes the Savitzky-Golay coefficients for the centre of the window and
+    for the edge positions fitted by savgol_filter in "interp" mode.
+    @return coefficients: interior correlation kernel, shape (window_length,)
+    @return left: edge kernels for the first window_length // 2 points
+    @return right: edge kernels for the last window_length // 2 points
+    """
+    half_window = window_length // 2
+    edges = np.array(
+        [
+            savgol_coeffs(
+                window_length, polynomial_order, deriv=derivative_order, pos=position, use="dot"
+            )
+            for position in range(window_length)
+        ],
+        dtype=dtype,
+    )
+    kernels = (edges[half_window], edges[:half_window], edges[half_window + 1 :])
+    for kernel in kernels:
+        kernel.setflags(write=False)
+    return kernels
+
+
+class Derivative(TransformerMixin, BaseEstimator):
     """
     Calculates the derivative of a each row in a dataframe using the Savitzky-Golay filter.
     """
 
     def __init__(
-        self, derivative_order: int, window_length: int = 15, polynomial_order: int = 1
+        self,
+        derivative_order: int,
+        window_length: int = 15,
+        polynomial_order: int = 1,
+        dtype: np.dtype = np.float64,
     ):
         """
         Constructor.
         @param derivative_order derivative order
-        @param window_length window length
+        @param window_length window length, must be odd
         @param polynomial_order polynomial order
+        @param dtype floating point type used for the computation (np.float64 or np.float32)
         """
         self.derivative_order = derivative_order
         self.window_length = window_length
         self.polynomial_order = polynomial_order
+        self.dtype = dtype
+
+    def _get_kernels(self):
+        if self.window_length % 2 == 0:
+            raise ValueError("window_length must be odd.")
+        if self.polynomial_order >= self.window_length:
+            raise ValueError("polynomial_order must be less than window_length.")
+        return _savgol_kernels(
+            self.window_length,
+            self.polynomial_order,
+            self.derivative_order,
+            np.dtype(self.dtype).name,
+        )
+
+    def fit(self, x: Union[pd.DataFrame, np.ndarray], y=None) -> "Derivative":
+        """
+        Validates the filter parameters. The derivative is stateless.
+        @param x dataframe containing the spectra with the wavenumbers as columns, or an array.
+        @return self
+        """
+        self._get_kernels()
+        return self
+
+    def __sklearn_is_fitted__(self) -> bool:
+        return True
+
+    def apply_to(
+        self, x: Union[pd.DataFrame, np.ndarray], out: Optional[np.ndarray] = None
+    ) -> Union[pd.DataFrame, np.ndarray]:
+        """
+        Applies the derivative to the dataframe. The result is identical to
+        savgol_filter in "interp" mode, but the kernel is computed once and
+        applied as a single correlation along the wavenumber axis.
+        @param x dataframe containing the spectra with the wavenumbers as columns, or an array
+        with one spectrum per row (or a single 1-D spectrum).
+        @param out optional array of the same shape as x to write the derivative into.
+        @return dataframe with derivative, or array if x is an array
+        """
+        return self._apply(x, out, slice(None))
+
+    def transform(self, x: Union[pd.DataFrame, np.ndarray]) -> Union[pd.DataFrame, np.ndarray]:
+        """
+        Applies the derivative, see apply_to.
+        @param x dataframe containing the spectra with the wavenumbers as columns, or an array.
+        @return dataframe with derivative, or array if x is an array
+        """
+        return self.apply_to(x)
+
+    def _apply(
+        self,
+        x: Union[pd.DataFrame, np.ndarray],
+        out: Optional[np.ndarray],
+        columns: slice,
+    ) -> Union[pd.DataFrame, np.ndarray]:
+        if isinstance(x, pd.DataFrame):
+            values = x.to_numpy(dtype=self.dtype)
+            derivate = self._apply_to_array(values, out, columns)
+            return pd.DataFrame(
+                derivate, index=x.index, columns=x.columns[columns], copy=False
+            )
+
+        return self._apply_to_array(np.asarray(x, dtype=self.dtype), out, columns)
+
+    def _apply_to_array(
+        self, x: np.ndarray, out: Optional[np.ndarray], columns: slice
+    ) -> np.ndarray:
+        """
+        Computes the derivative of the full spectra restricted to the given
+        columns, convolving only the columns plus half a window on each side.
+        """
+        coefficients, left, right = self._get_kernels()
+        window_length = len(coefficients)
+        half_window = window_length // 2
+        n_wavenumbers = x.shape[-1]
+        first, last, step = columns.indices(n_wavenumbers)
+        last = max(first, last)
+
+        if step != 1:
+            raise ValueError("Only contiguous column slices are supported.")
+        if n_wavenumbers < window_length:
+            raise ValueError("window_length must be less than or equal to the number of wavenumbers.")
+        shape = x.shape[:-1] + (last - first,)
+        if out is None:
+            out = np.empty(shape, dtype=self.dtype)
+        elif out.shape != shape:
+            raise ValueError(f"out has shape {out.shape}, expected {shape}.")
+
+        # edges first so that out may be x itself: the interior correlation
+        # overwrites x, the edges only read the first and last windows
+        right_start = n_wavenumbers - half_window
+        left_edge = right_edge = None
+        if first < half_window:
+            left_edge = x[..., :window_length] @ left[first : min(half_window, last)].T
+        if last > right_start:
+            rows = slice(max(first, right_start) - right_start, last - right_start)
+            right_edge = x[..., n_wavenumbers - window_length :] @ right[rows].T
+
+        interior_first = max(first, half_window)
+        interior_last = min(last, right_start)
+        if first == 0 and last == n_wavenumbers:
+            correlate1d(x, coefficients, axis=-1, output=out, mode="constant")
+        elif interior_last > interior_first:
+            segment = correlate1d(
+                x[..., interior_first - half_window : interior_last + half_window],
+                coefficients,
+                axis=-1,
+                mode="constant",
+            )
+            out[..., interior_first - first : interior_last - first] = segment[
+                ..., half_window : segment.shape[-1] - half_window
+            ]
+
+        if left_edge is not None:
+            out[..., : left_edge.shape[-1]] = left_edge
+        if right_edge is not None:
+            out[..., out.shape[-1] - right_edge.shape[-1] :] = right_edge
+
+        return out
+
+
+class FusedPreprocessing(TransformerMixin, BaseEstimator):
+    """
+    Applies a sequence of preprocessing steps, fusing a Derivative followed by a
+    RangeCut so that the derivative is only computed over the cut region.
+    """
+
+    def __init__(self, steps: List[TransformerMixin]):
+        """
+        Constructor.
+        @param steps list of preprocessing steps (e.g. RangeCut, Derivative) applied in order
+        """
+        self.steps = steps
+
+    def fit(self, x: Union[pd.DataFrame, np.ndarray], y=None) -> "FusedPreprocessing":
+        """
+        Fits every step on the output of the previous ones.
+        @param x dataframe containing the spectra with the wavenumbers as columns, or an array.
+        @return self
+        """
+        self._run(x, y, fit=True)
+        return self
+
+    def fit_transform(self, x: Union[pd.DataFrame, np.ndarray], y=None, **fit_params):
+        """
+        Fits every step and returns the preprocessed spectra.
+        @param x dataframe containing the spectra with the wavenumbers as columns, or an array.
+        @return preprocessed dataframe, or array if x is an array
+        """
+        return self._run(x, y, fit=True)
+
+    def transform(self, x: Union[pd.DataFrame, np.ndarray]) -> Union[pd.DataFrame, np.ndarray]:
+        """
+        Applies the steps to the spectra.
+        @param x dataframe containing the spectra with the wavenumbers as columns, or an array.
+        @return preprocessed dataframe, or array if x is an array
+        """
+        return self._run(x, None, fit=False)
+
+    def apply_to(self, x: Union[pd.DataFrame, np.ndarray]) -> Union[pd.DataFrame, np.ndarray]:
+        """
+        Applies the steps to the spectra, see transform.
+        @param x dataframe containing the spectra with the wavenumbers as columns, or an array.
+        @return preprocessed dataframe, or array if x is an array
+        """
+        return self.transform(x)
+
+    @property
+    def wavenumbers_(self) -> np.ndarray:
+        """
+        Wavenumbers of the last fitted RangeCut step.
+        """
+        for step in reversed(self.steps):
+            if hasattr(step, "wavenumbers_"):
+                return step.wavenumbers_
+        raise AttributeError("No fitted RangeCut step.")
+
+    def _run(self, x, y, fit: bool):
+        if fit:
+            self.n_features_in_ = np.shape(x)[-1]
+        n_steps = len(self.steps)
+        i = 0
+        while i < n_steps:
+            step = self.steps[i]
+            following = self.steps[i + 1] if i + 1 < n_steps else None
+            if isinstance(step, Derivative) and isinstance(following, RangeCut):
+                if fit:
+                    following.fit(x)
+                x = step._apply(x, None, following._get_slice(x))
+                i += 2
+                continue
+
+            if fit:
+                step.fit(x, y)
+            x = step.transform(x)
+            i += 1
+
+        return x
+
+
+class Smoothing(Derivative):
+    """
+    Smooths each row in a dataframe using the Savitzky-Golay filter.
+    """
+
+    def __init__(
+        self,
+        window_length: int = 15,
+        polynomial_order: int = 2,
+        dtype: np.dtype = np.float64,
+    ):
+        """
+        Constructor.
+        @param window_length window length, must be odd
+        @param polynomial_order polynomial order
+        @param dtype floating point type used for the computation (np.float64 or np.float32)
+        """
+        super().__init__(0, window_length, polynomial_order, dtype)
+
+
+class _RowTransformer(TransformerMixin, BaseEstimator):
+    """
+    Base class for the operators that transform a block of spectra at once,
+    with one spectrum per row. Subclasses implement _apply_to_array.
+    """
+
+    def fit(self, x: Union[pd.DataFrame, np.ndarray], y=None):
+        """
+        The operator is stateless.
+        @param x dataframe containing the spectra with the wavenumbers as columns, or an array.
+        @return self
+        """
+        return self
+
+    def __sklearn_is_fitted__(self) -> bool:
+        return True
+
+    def apply_to(
+        self, x: Union[pd.DataFrame, np.ndarray], out: Optional[np.ndarray] = None
+    ) -> Union[pd.DataFrame, np.ndarray]:
+        """
+        Applies the operator to the dataframe.
+        @param x dataframe containing the spectra with the wavenumbers as columns, or an array
+        with one spectrum per row (or a single 1-D spectrum).
+        @param out optional array of the same shape as x to write the result into; pass x
+        itself to transform in place.
+        @return transformed dataframe, or array if x is an array
+        """
+        if isinstance(x, pd.DataFrame):
+            values = self._apply_to_array(x.to_numpy(dtype=float), out)
+            return pd.DataFrame(values, index=x.index, columns=x.columns, copy=False)
+
+        x = np.asarray(x, dtype=float)
+        return self._apply_to_array(x, out)
+
+    def transform(self, x: Union[pd.DataFrame, np.ndarray]) -> Union[pd.DataFrame, np.ndarray]:
+        """
+        Applies the operator, see apply_to.
+        @param x dataframe containing the spectra with the wavenumbers as columns, or an array.
+        @return transformed dataframe, or array if x is an array
+        """
+        return self.apply_to(x)
+
+    @staticmethod
+    def _get_out(x: np.ndarray, out: Optional[np.ndarray]) -> np.ndarray:
+        if out is None:
+            return np.empty_like(x)
+        if out.shape != x.shape:
+            raise ValueError(f"out has shape {out.shape}, expected {x.shape}.")
+        return out
+
+    def _apply_to_array(self, x: np.ndarray, out: Optional[np.ndarray]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class StandardNormalVariate(_RowTransformer):
+    """
+    Centers each spectrum on its mean and scales it by its standard deviation.
+    """
+
+    def _apply_to_array(self, x: np.ndarray, out: Optional[np.ndarray]) -> np.ndarray:
+        mean = x.mean(axis=-1, keepdims=True)
+        std = x.std(axis=-1, keepdims=True)
+        out = self._get_out(x, out)
+        np.subtract(x, mean, out=out)
+        np.divide(out, std, out=out)
+        return out
+
+
+class MeanCentering(_RowTransformer):
+    """
+    Subtracts the mean spectrum of the training data from every spectrum.
+    """
+
+    def fit(self, x: Union[pd.DataFrame, np.ndarray], y=None) -> "MeanCentering":
+        """
+        Computes the mean spectrum.
+        @param x dataframe containing the spectra with the wavenumbers as columns, or an array.
+        @return self
+        """
+        self.mean_ = np.asarray(x, dtype=float).mean(axis=0)
+        return self
+
+    def __sklearn_is_fitted__(self) -> bool:
+        return hasattr(self, "mean_")
+
+    def _apply_to_array(self, x: np.ndarray, out: Optional[np.ndarray]) -> np.ndarray:
+        # fitting here would learn the mean of the data being transformed
+        check_is_fitted(self)
+        return np.subtract(x, self.mean_, out=self._get_out(x, out))
+
+
+class MultiplicativeScatterCorrection(_RowTransformer):
+    """
+    Corrects each spectrum for additive and multiplicative scatter effects by
+    regressing it on a reference spectrum.
+    """
+
+    def __init__(self, reference: Optional[ArrayLike] = None):
+        """
+        Constructor.
+        @param reference reference spectrum; defaults to the mean spectrum of the training data
+        """
+        self.reference = reference
+
+    def fit(
+        self, x: Union[pd.DataFrame, np.ndarray], y=None
+    ) -> "MultiplicativeScatterCorrection":
+        """
+        Computes the reference spectrum.
+        @param x dataframe containing the spectra with the wavenumbers as columns, or an array.
+        @return self
+        """
+        if self.reference is None:
+            self.reference_ = np.asarray(x, dtype=float).mean(axis=0)
+        else:
+            self.reference_ = np.asarray(self.reference, dtype=float)
+        return self
+
+    def __sklearn_is_fitted__(self) -> bool:
+        return hasattr(self, "reference_")
+
+    def _apply_to_array(self, x: np.ndarray, out: Optional[np.ndarray]) -> np.ndarray:
+        check_is_fitted(self)
+        reference = self.reference_
+        centered_reference = reference - reference.mean()
+        spectra = x.reshape(-1, x.shape[-1])
+        mean = spectra.mean(axis=1, keepdims=True)
+        # least-squares fit x = intercept + slope * reference for every row
+        slope = (spectra @ centered_reference)[:, np.newaxis] / (
+            centered_reference @ centered_reference
+        )
+        intercept = mean - slope * reference.mean()
+        out = self._get_out(x, out)
+        np.subtract(x, intercept.reshape(x.shape[:-1] + (1,)), out=out)
+        np.divide(out, slope.reshape(x.shape[:-1] + (1,)), out=out)
+        return out
+
+
+@lru_cache(maxsize=None)
+def _polynomial_projection(n_wavenumbers: int, degree: int):
+    positions = np.linspace(-1.0, 1.0, n_wavenumbers)
+    vandermonde = np.vander(positions, degree + 1)
+    projection = np.linalg.pinv(vandermonde)
+    vandermonde.setflags(write=False)
+    projection.setflags(write=False)
+    return vandermonde, projection
+
+
+class PolynomialBaseline(_RowTransformer):
+    """
+    Removes a polynomial baseline from each spectrum. With max_iter > 0 the
+    modified polyfit method is used: the spectrum is clipped to the fitted
+    polynomial and refitted so that peaks do not pull the baseline up.
+    """
+
+    def __init__(self, degree: int = 2, max_iter: int = 100, tol: float = 1e-3):
+        """
+        Constructor.
+        @param degree polynomial degree
+        @param max_iter maximum number of modified polyfit iterations; 0 fits the polynomial once
+        @param tol relative change of the baseline below which the iterations stop
+        """
+        self.degree = degree
+        self.max_iter = max_iter
+        self.tol = tol
+
+    def _apply_to_array(self, x: np.ndarray, out: Optional[np.ndarray]) -> np.ndarray:
+        vandermonde, projection = _polynomial_projection(x.shape[-1], self.degree)
+        baseline = (x @ projection.T) @ vandermonde.T
+
+        if self.max_iter > 0:
+            clipped = np.minimum(x, baseline)
+            for _ in range(self.max_iter):
+                previous = baseline
+                baseline = (clipped @ projection.T) @ vandermonde.T
+                np.minimum(clipped, baseline, out=clipped)
+                change = np.abs(baseline - previous).max()
+                if change <= self.tol * max(np.abs(baseline).max(), np.finfo(float).tiny):
+                    break
+
+        return np.subtract(x, baseline, out=self._get_out(x, out))
+
+
+@lru_cache(maxsize=None)
+def _second_difference_penalty(n_wavenumbers: int):
+    """
+    Diagonals of D'D for the second difference matrix D, in the upper banded
+    layout used by scipy.linalg.solveh_banded.
+    """
+    # every row of D is [1, -2, 1], so each diagonal of D'D is a sum of
+    # products of those coefficients over the rows that overlap
+    rows = np.ones(n_wavenumbers - 2)
+    banded = np.zeros((3, n_wavenumbers))
+    banded[0, 2:] = rows
+    banded[1, 1:] = np.convolve(rows, [-2.0, -2.0])
+    banded[2] = np.convolve(rows, [1.0, 4.0, 1.0])
+    banded.setflags(write=False)
+    return banded
+
+
+class AsymmetricLeastSquaresBaseline(_RowTransformer):
+    """
+    Removes the baseline estimated by asymmetric least squares smoothing
+    (Eilers and Boelens). All spectra are solved together as one banded
+    system per iteration.
+    """
 
-    def apply_to(self, x: pd.DataFrame) -> pd.DataFrame:
+    def __init__(self, lam: float = 1e5, p: float = 0.01, max_iter: int = 10):
         """
-        Applies the derivative to the dataframe.
-        @param x dataframe containing the spectra with the wavenumbers as columns.
-        @return dataframe with derivative
+        Constructor.
+        @param lam smoothness penalty of the baseline
+        @param p asymmetry: weight of the points above the baseline
+        @param max_iter number of reweighting iterations
         """
-        derivate = pd.DataFrame(savgol_filter(
-            x, self.window_length, self.polynomial_order, deriv=self.derivative_order
-        ))
-        derivate.columns = x.columns
-        return derivate
+        self.lam = lam
+        self.p = p
+        self.max_iter = max_iter
+
+    def _apply_to_array(self, x: np.ndarray, out: Optional[np.ndarray]) -> np.ndarray:
+        n_wavenumbers = x.shape[-1]
+        if n_wavenumbers < 3:
+            raise ValueError("At least 3 wavenumbers are needed to estimate the baseline.")
+        spectra = x.reshape(-1, n_wavenumbers)
+        n_spectra = spectra.shape[0]
+
+        # block diagonal system: the couplings between consecutive spectra are
+        # zero because the penalty diagonals start with zeros
+        penalty = np.tile(self.lam * _second_difference_penalty(n_wavenumbers), n_spectra)
+        weights = np.ones(spectra.shape)
+        for _ in range(max(1, self.max_iter)):
+            banded = penalty.copy()
+            banded[2] += weights.ravel()
+            baseline = solveh_banded(
+                banded, (weights * spectra).ravel(), check_finite=False
+            ).reshape(spectra.shape)
+            weights = np.where(spectra > baseline, self.p, 1.0 - self.p)
+
+        out = self._get_out(x, out)
+        np.subtract(x, baseline.reshape(x.shape), out=out)
+        return out
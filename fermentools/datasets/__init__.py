@@ -0,0 +1 @@
+from ._cache import clear_cache, get_cache_directory
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+CACHE_DIRECTORY_VARIABLE = "FERMENTOOLS_CACHE_DIR"
+DISABLE_CACHE_VARIABLE = "FERMENTOOLS_NO_CACHE"
+
+_METADATA_FILE = "metadata.json"
+
+
+def get_cache_directory() -> str:
+    """
+    Returns the directory where the binary dataset cache is stored. It can be
+    overridden with the FERMENTOOLS_CACHE_DIR environment variable.
+    @return cache_directory: path to the cache directory.
+    """
+    directory = os.environ.get(CACHE_DIRECTORY_VARIABLE)
+    if directory:
+        return directory
+
+    base_directory = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base_directory, "fermentools")
+
+
+def cache_enabled(cache: bool = True) -> bool:
+    """
+    Checks whether the cache should be used, honouring the FERMENTOOLS_NO_CACHE
+    environment variable.
+    @param cache whether the caller asked for the cache.
+    @return enabled: True if the cache should be used.
+    """
+    return cache and os.environ.get(DISABLE_CACHE_VARIABLE, "") in ("", "0")
+
+
+def clear_cache() -> None:
+    """
+    Removes every cached dataset. The caches are rebuilt on the next load.
+    """
+    shutil.rmtree(get_cache_directory(), ignore_errors=True)
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _entry_directory(source: str) -> str:
+    source = os.path.abspath(source)
+    key = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(get_cache_directory(), f"{name}-{key}")
+
+
+def _read_metadata(directory: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(directory, _METADATA_FILE), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_entry(directory: str, arrays: Dict[str, np.ndarray], metadata: dict) -> None:
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), array, allow_pickle=False)
+        with open(os.path.join(staging, _METADATA_FILE), "w") as f:
+            json.dump(metadata, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(staging, directory)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def _load_entry(directory: str, names, mmap_mode: Optional[str]) -> Dict[str, np.ndarray]:
+    return {
+        name: np.load(
+            os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False
+        )
+        for name in names
+    }
+
+
+def load_cached(
+    source: str,
+    parser: Callable[[str], Dict[str, np.ndarray]],
+    cache: bool = True,
+    rebuild_cache: bool = False,
+    mmap_mode: Optional[str] = "r",
+) -> Dict[str, np.ndarray]:
+    """
+    Loads the arrays parsed from a source file through an on-disk binary cache.
+    The cache entry is keyed by the size, modification time and content hash of
+    the source: if the modification time changed but the content did not, the
+    entry is reused. The arrays are served memory-mapped from .npy files.
+    @param source path to the source file.
+    @param parser function that parses the source into a dictionary of arrays.
+    @param cache whether to use the cache; if False the source is always parsed.
+    @param rebuild_cache whether to discard the cache entry and parse the source again.
+    @param mmap_mode memory-map mode passed to np.load.
+    @return arrays: dictionary with the parsed arrays.
+    """
+    if not cache_enabled(cache):
+        return parser(source)
+
+    stat = os.stat(source)
+    directory = _entry_directory(source)
+    metadata = None if rebuild_cache else _read_metadata(directory)
+
+    if metadata is not None:
+        unchanged = (
+            metadata["size"] == stat.st_size and metadata["mtime_ns"] == stat.st_mtime_ns
+        )
+        if not unchanged and metadata["size"] == stat.st_size:
+            unchanged = metadata["sha256"] == _file_hash(source)
+            if unchanged:
+                metadata["mtime_ns"] = stat.st_mtime_ns
+                try:
+                    with open(os.path.join(directory, _METADATA_FILE), "w") as f:
+                        json.dump(metadata, f)
+                except OSError:
+                    pass
+        if unchanged:
+            try:
+                return _load_entry(directory, metadata["arrays"], mmap_mode)
+            except (OSError, ValueError):
+                pass
+
+    arrays = parser(source)
+    metadata = {
+        "source": os.path.abspath(source),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": _file_hash(source),
+        "arrays": list(arrays),
+    }
+    try:
+        _write_entry(directory, arrays, metadata)
+        return _load_entry(directory, metadata["arrays"], mmap_mode)
+    except OSError:
+        # read-only or full cache directory, serve the parsed arrays directly
+        return arrays
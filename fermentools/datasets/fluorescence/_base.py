@@ -1,37 +1,85 @@
 import numpy as np
 import os
 
+from .._cache import load_cached
+
 PACKAGE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
 
-def load_filtered_fluorescence_data():
+_EXCITATION_EMISSION_DATA = {}
+
+
+def _parse_array(path: str) -> dict:
+    return {"values": np.loadtxt(path, delimiter=",")}
+
+
+def _load_array(filename: str, cache: bool, rebuild_cache: bool) -> np.ndarray:
+    return load_cached(
+        PACKAGE_DIRECTORY + "/data/" + filename,
+        _parse_array,
+        cache=cache,
+        rebuild_cache=rebuild_cache,
+        mmap_mode="r",
+    )["values"]
+
+
+def _load_excitation_emission_data(cache: bool = True, rebuild_cache: bool = False) -> dict:
+    """
+    Loads the full emission - excitation tensor once per process. The arrays are
+    read-only and memory-mapped from the binary cache when it is enabled.
+    @param cache whether to serve the data from the binary on-disk cache.
+    @param rebuild_cache whether to parse the csv files again and rebuild the cache.
+    @return data: dictionary with the tensor and the wavelength axes.
+    """
+    if rebuild_cache or cache not in _EXCITATION_EMISSION_DATA:
+        data = {
+            "fluorescence_spectra": _load_array(
+                "excitation_emission_matrix.csv", cache, rebuild_cache
+            ).reshape(20, 43, 91),
+            "emission_wavenumbers": _load_array(
+                "emission_wavenumbers.csv", cache, rebuild_cache
+            ),
+            "excitation_wavenumbers": _load_array(
+                "excitation_wavenumbers.csv", cache, rebuild_cache
+            ),
+        }
+        for array in data.values():
+            array.setflags(write=False)
+        _EXCITATION_EMISSION_DATA[cache] = data
+
+    return _EXCITATION_EMISSION_DATA[cache]
+
+
+def load_filtered_fluorescence_data(cache: bool = True, rebuild_cache: bool = False):
     """
     returns the emission - excitation matrix for the filtered data
-    @return fluorescence_spectra: tensor with the filtered data (sample x excitation x emission)
+    @param cache whether to serve the data from the binary on-disk cache.
+    @param rebuild_cache whether to parse the csv files again and rebuild the cache.
+    @return fluorescence_spectra: read-only tensor view with the filtered data (sample x excitation x emission)
     @return emission_wavelengths: array with the emission wavelengths
     @return excitation_wavelengths: array with the excitation wavelengths
     """
+    data = _load_excitation_emission_data(cache, rebuild_cache)
 
-    fluorescence_spectra = np.genfromtxt(PACKAGE_DIRECTORY + "/data/excitation_emission_matrix.csv", delimiter=",")
-    emission_wavenumbers = np.genfromtxt(PACKAGE_DIRECTORY + "/data/emission_wavenumbers.csv", delimiter=",")
-    excitation_wavenumbers = np.genfromtxt(PACKAGE_DIRECTORY + "/data/excitation_wavenumbers.csv", delimiter=",")
+    return (
+        data["fluorescence_spectra"][0:10, :, :],
+        data["emission_wavenumbers"],
+        data["excitation_wavenumbers"],
+    )
 
-    fluorescence_spectra = fluorescence_spectra.reshape(20, 43, 91)
 
-    return fluorescence_spectra[0:10,:,:], emission_wavenumbers, excitation_wavenumbers
-
-
-def load_unfiltered_fluorescence_data():
+def load_unfiltered_fluorescence_data(cache: bool = True, rebuild_cache: bool = False):
     """
     returns the emission - excitation matrix for the filtered data
-    @return fluorescence_spectra: tensor with the unfiltered data (sample x excitation x emission)
+    @param cache whether to serve the data from the binary on-disk cache.
+    @param rebuild_cache whether to parse the csv files again and rebuild the cache.
+    @return fluorescence_spectra: read-only tensor view with the unfiltered data (sample x excitation x emission)
     @return emission_wavelengths: array with the emission wavelengths
     @return excitation_wavelengths: array with the excitation wavelengths
     """
-    
-    fluorescence_spectra = np.genfromtxt(PACKAGE_DIRECTORY + "/data/excitation_emission_matrix.csv", delimiter=",")
-    emission_wavenumbers = np.genfromtxt(PACKAGE_DIRECTORY + "/data/emission_wavenumbers.csv", delimiter=",")
-    excitation_wavenumbers = np.genfromtxt(PACKAGE_DIRECTORY + "/data/excitation_wavenumbers.csv", delimiter=",")
-
-    fluorescence_spectra = fluorescence_spectra.reshape(20, 43, 91)
+    data = _load_excitation_emission_data(cache, rebuild_cache)
 
-    return fluorescence_spectra[10:20,:,:], emission_wavenumbers, excitation_wavenumbers
\ No newline at end of file
+    return (
+        data["fluorescence_spectra"][10:20, :, :],
+        data["emission_wavenumbers"],
+        data["excitation_wavenumbers"],
+    )
@@ -1 +1,21 @@
-from ._base import load_training_data, load_fermentation_spectra_data, load_fermentation_hplc_data
+from typing import TYPE_CHECKING
+
+from ..._lazy import attach
+
+# pandas is only imported when the data are first loaded
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    {
+        "._base": [
+            "load_training_data",
+            "load_fermentation_spectra_data",
+            "load_fermentation_hplc_data",
+            "iter_fermentation_spectra",
+            "SpectraChunk",
+        ]
+    },
+)
+
+if TYPE_CHECKING:
+    from ._base import load_training_data, load_fermentation_spectra_data, load_fermentation_hplc_data
+    from ._base import iter_fermentation_spectra, SpectraChunk
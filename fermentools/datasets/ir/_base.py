@@ -1,39 +1,140 @@
+from functools import partial
+from typing import Iterator, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
 import pandas as pd
 import os
 
+from .._cache import load_cached
+from ._constants import SAMPLING_INTERVAL
+
 PACKAGE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
 
-def load_training_data():
+
+class SpectraChunk(NamedTuple):
+    """
+    Block of consecutive spectra yielded by iter_fermentation_spectra.
+    """
+
+    time: np.ndarray
+    spectra: np.ndarray
+    wavenumbers: np.ndarray
+
+
+def _parse_csv(path: str, float_columns: bool) -> dict:
+    data = pd.read_csv(path)
+    columns = data.columns.to_numpy(dtype=float if float_columns else str)
+    return {"values": data.to_numpy(dtype=float), "columns": columns}
+
+
+def _load_csv(
+    filename: str, float_columns: bool, cache: bool, rebuild_cache: bool
+) -> pd.DataFrame:
+    arrays = load_cached(
+        os.path.join(PACKAGE_DIRECTORY, "data", filename),
+        partial(_parse_csv, float_columns=float_columns),
+        cache=cache,
+        rebuild_cache=rebuild_cache,
+        mmap_mode="c",
+    )
+    return pd.DataFrame(arrays["values"], columns=arrays["columns"], copy=False)
+
+
+def load_training_data(cache: bool = True, rebuild_cache: bool = False):
     """
     Loads the training data.
+    @param cache whether to serve the data from the binary on-disk cache.
+    @param rebuild_cache whether to parse the csv files again and rebuild the cache.
     @return train_spectra: spectra in the training data.
     @return train_hplc: hplc in the training data.
     """
-    train_spectra = pd.read_csv(PACKAGE_DIRECTORY + "/data/train_spectra.csv")
-    train_spectra.columns = train_spectra.columns.astype(float)
-    train_hplc = pd.read_csv(PACKAGE_DIRECTORY + "/data/train_hplc.csv")
+    train_spectra = _load_csv("train_spectra.csv", True, cache, rebuild_cache)
+    train_hplc = _load_csv("train_hplc.csv", False, cache, rebuild_cache)
 
     return train_spectra, train_hplc
 
 
-def load_fermentation_spectra_data():
+def load_fermentation_spectra_data(cache: bool = True, rebuild_cache: bool = False):
     """
     Loads the fermentation data.
+    @param cache whether to serve the data from the binary on-disk cache.
+    @param rebuild_cache whether to parse the csv file again and rebuild the cache.
     @return fermentation_spectra: spectra measured during the fermentation.
     """
-    fermentation_spectra = pd.read_csv(
-            PACKAGE_DIRECTORY + "/data/fermentation_spectra.csv"
+    fermentation_spectra = _load_csv(
+        "fermentation_spectra.csv", True, cache, rebuild_cache
     )
-    fermentation_spectra.columns = fermentation_spectra.columns.astype(float)
 
     return fermentation_spectra
 
 
-def load_fermentation_hplc_data():
+def load_fermentation_hplc_data(cache: bool = True, rebuild_cache: bool = False):
     """
     Loads the fermentation data.
+    @param cache whether to serve the data from the binary on-disk cache.
+    @param rebuild_cache whether to parse the csv file again and rebuild the cache.
     @return fermentation_hplc: hplc measured during the fermentation.
     """
-    fermentation_hplc = pd.read_csv(PACKAGE_DIRECTORY + "/data/fermentation_hplc.csv")
+    fermentation_hplc = _load_csv("fermentation_hplc.csv", False, cache, rebuild_cache)
+
+    return fermentation_hplc
+
+
+def _select_columns(
+    wavenumbers: np.ndarray,
+    columns: Optional[Union[Tuple[float, float], Sequence[float]]],
+) -> np.ndarray:
+    if columns is None:
+        return np.arange(len(wavenumbers))
+    if isinstance(columns, tuple) and len(columns) == 2:
+        start, end = columns
+        return np.flatnonzero((wavenumbers >= start) & (wavenumbers <= end))
+
+    positions = {wavenumber: i for i, wavenumber in enumerate(wavenumbers)}
+    try:
+        return np.array(sorted(positions[float(w)] for w in columns), dtype=int)
+    except KeyError as e:
+        raise ValueError(f"Wavenumber {e.args[0]} is not in the spectra file.") from e
+
 
-    return fermentation_hplc
\ No newline at end of file
+def iter_fermentation_spectra(
+    chunksize: int = 1024,
+    columns: Optional[Union[Tuple[float, float], Sequence[float]]] = None,
+    dtype: np.dtype = np.float64,
+    sampling_interval: float = SAMPLING_INTERVAL,
+    path: Optional[str] = None,
+) -> Iterator[SpectraChunk]:
+    """
+    Streams the fermentation spectra in blocks of rows so that the memory used
+    does not grow with the length of the fermentation. Only the selected
+    wavenumber columns are parsed.
+    @param chunksize number of spectra in each block; the last block may be shorter.
+    @param columns (start, end) wavenumber range, a list of wavenumbers or None for all columns.
+    @param dtype floating point type of the yielded blocks.
+    @param sampling_interval time between consecutive spectra in hours.
+    @param path csv file with the spectra; defaults to the bundled fermentation spectra.
+    @return chunks: iterator of SpectraChunk(time, spectra, wavenumbers) tuples.
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be a positive integer.")
+    if path is None:
+        path = os.path.join(PACKAGE_DIRECTORY, "data", "fermentation_spectra.csv")
+
+    wavenumbers = pd.read_csv(path, nrows=0).columns.to_numpy(dtype=float)
+    usecols = _select_columns(wavenumbers, columns)
+    wavenumbers = wavenumbers[usecols]
+
+    reader = pd.read_csv(
+        path,
+        usecols=usecols.tolist(),
+        dtype=dtype,
+        chunksize=chunksize,
+        engine="c",
+    )
+    first_row = 0
+    with reader:
+        for chunk in reader:
+            spectra = chunk.to_numpy(dtype=dtype, copy=False)
+            time = (first_row + np.arange(len(spectra))) * sampling_interval
+            first_row += len(spectra)
+            yield SpectraChunk(time, spectra, wavenumbers)
@@ -0,0 +1,2 @@
+# time between two spectra of the fermentation, in hours
+SAMPLING_INTERVAL = 1.28 / 60
@@ -1,2 +1,19 @@
+from typing import TYPE_CHECKING
+
 from .yeast_model import YeastModel
-from .mass_balance import MassBalance
\ No newline at end of file
+from .mass_balance import MassBalance
+from .._lazy import attach
+
+# joblib and pandas are only imported when the parameter estimation or the ensembles are first used
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    {
+        ".parameter_estimation": ["ParameterEstimationResult", "estimate_parameters"],
+        ".ensemble": ["EnsembleResult", "simulate_ensemble"],
+    },
+)
+__all__ = ["YeastModel", "MassBalance"] + __all__
+
+if TYPE_CHECKING:
+    from .parameter_estimation import ParameterEstimationResult, estimate_parameters
+    from .ensemble import EnsembleResult, simulate_ensemble
@@ -0,0 +1,254 @@
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import copy
+import os
+import time as timer
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from .mass_balance import MassBalance
+
+_YIELDS = ("substrate_biomass_yield", "substrate_product_yield")
+
+
+@dataclass
+class EnsembleResult:
+    """
+    Result of an ensemble simulation.
+    @param time times of the trajectories
+    @param trajectories array of shape (n_members, n_times, n_states) with every trajectory, None when they were not kept
+    @param quantile_levels levels of the quantile envelopes
+    @param quantiles array of shape (n_quantiles, n_times, n_states) with the quantile envelopes
+    @param mean mean trajectory, shape (n_times, n_states)
+    @param std standard deviation of the trajectories, shape (n_times, n_states)
+    @param n_members number of members
+    @param exact_quantiles whether the quantiles were computed from every member or from a random sample of them
+    @param simulation_time wall time of the simulation in seconds
+    """
+
+    time: np.ndarray
+    trajectories: Optional[np.ndarray]
+    quantile_levels: np.ndarray
+    quantiles: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+    n_members: int
+    exact_quantiles: bool
+    simulation_time: float
+
+
+def _set_parameters(mass_balance: MassBalance, parameters: Dict[str, np.ndarray]) -> MassBalance:
+    mass_balance = copy.deepcopy(mass_balance)
+    yeast_model = mass_balance.microbial_kinetics
+    for name, values in parameters.items():
+        target = yeast_model if name in _YIELDS else yeast_model.model
+        if not hasattr(target, name):
+            raise ValueError(f"'{name}' is not a parameter of the {yeast_model.model_type} model.")
+        setattr(target, name, values)
+    return mass_balance
+
+
+def _simulate_chunk(
+    mass_balance: MassBalance,
+    parameters: Dict[str, np.ndarray],
+    initial_states: np.ndarray,
+    time: np.ndarray,
+    method: str,
+    rtol: float,
+    atol: float,
+) -> np.ndarray:
+    """
+    Integrates a chunk of members as one stacked system; run in the worker
+    processes when the chunks are spread over a process pool.
+    @return trajectories: array of shape (n_members, n_times, n_states)
+    """
+    mass_balance = _set_parameters(mass_balance, parameters)
+    _, states = mass_balance.simulate(
+        (time[0], time[-1]), initial_states.T, t_eval=time, method=method, rtol=rtol, atol=atol
+    )
+    return states.transpose(2, 0, 1)
+
+
+def _member_parameters(
+    parameters: Optional[Dict[str, ArrayLike]], n_members: int
+) -> Dict[str, np.ndarray]:
+    member_parameters = {}
+    for name, values in (parameters or {}).items():
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 0:
+            values = np.full(n_members, float(values))
+        if values.shape != (n_members,):
+            raise ValueError(f"Parameter '{name}' must be a scalar or have one value per member.")
+        member_parameters[name] = values
+    return member_parameters
+
+
+def simulate_ensemble(
+    mass_balance: MassBalance,
+    initial_states: ArrayLike,
+    time: ArrayLike,
+    parameters: Optional[Dict[str, ArrayLike]] = None,
+    n_members: Optional[int] = None,
+    chunk_size: Optional[int] = 1024,
+    n_jobs: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    keep_trajectories: bool = True,
+    quantile_levels: Sequence[float] = (0.05, 0.5, 0.95),
+    max_quantile_members: int = 1000,
+    random_state=None,
+    dtype=np.float64,
+    out: Optional[np.ndarray] = None,
+    method: str = "BDF",
+    rtol: float = 1e-6,
+    atol: float = 1e-8,
+) -> EnsembleResult:
+    """
+    Simulates an ensemble of fermentations with sampled kinetic parameters
+    and initial states, e.g. for a Monte Carlo risk analysis. The members are
+    integrated in chunks, every chunk as one stacked system, either in this
+    process or spread over a process pool, and streamed into a preallocated
+    (members x time x states) array as the chunks finish. When the trajectories
+    are not kept, only the running mean and variance and a uniform random
+    sample of at most max_quantile_members trajectories for the quantile
+    envelopes are held in memory.
+    @param mass_balance MassBalance with the kinetic model; its parameters are the defaults of every member.
+    @param initial_states initial state of every member, shape (n_members, n_states), or one shared state.
+    @param time times at which the trajectories are stored, starting at the initial time.
+    @param parameters values of the yields and kinetic constants of the members, each a scalar or an array of one
+    value per member, e.g. {"max_uptake_rate": rng.normal(0.55, 0.05, 1000)}.
+    @param n_members number of members when it is not given by the initial states or the parameters.
+    @param chunk_size number of members integrated together as one system, None for all of them.
+    @param n_jobs number of worker processes; the chunks are integrated in this process when None or 1.
+    @param executor executor to spread the chunks over, instead of a process pool created for the call.
+    @param keep_trajectories whether to store every trajectory.
+    @param quantile_levels levels of the quantile envelopes.
+    @param max_quantile_members largest number of trajectories kept for the quantiles when the trajectories are not kept.
+    @param random_state seed of the sample of trajectories for the quantiles.
+    @param dtype data type of the stored trajectories, e.g. np.float32 for a compact array.
+    @param out optional array of shape (n_members, n_times, n_states) to write the trajectories into.
+    @param method solve_ivp method.
+    @param rtol relative tolerance.
+    @param atol absolute tolerance.
+    @return result: EnsembleResult
+    """
+    start = timer.perf_counter()
+    time = np.asarray(time, dtype=float)
+    initial_states = np.asarray(initial_states, dtype=float)
+    if n_members is None:
+        if initial_states.ndim == 2:
+            n_members = len(initial_states)
+        else:
+            sizes = [np.size(values) for values in (parameters or {}).values() if np.ndim(values) > 0]
+            if not sizes:
+                raise ValueError("Pass n_members, or initial states or parameters with one row per member.")
+            n_members = sizes[0]
+    if initial_states.ndim == 1:
+        initial_states = np.broadcast_to(initial_states, (n_members, len(initial_states)))
+    if len(initial_states) != n_members:
+        raise ValueError("initial_states must have one row per member.")
+    member_parameters = _member_parameters(parameters, n_members)
+    # fail before any integration, not in a worker
+    _set_parameters(mass_balance, {name: values[:1] for name, values in member_parameters.items()})
+
+    n_states = initial_states.shape[1]
+    shape = (n_members, len(time), n_states)
+    if keep_trajectories:
+        if out is None:
+            out = np.empty(shape, dtype=dtype)
+        elif out.shape != shape:
+            raise ValueError(f"out has shape {out.shape}, expected {shape}.")
+        sample = out
+    else:
+        sample = np.empty((min(n_members, max_quantile_members),) + shape[1:], dtype=dtype)
+
+    rng = np.random.default_rng(random_state)
+    total = np.zeros(shape[1:])
+    total_squares = np.zeros(shape[1:])
+    chunk_size = n_members if chunk_size is None else chunk_size
+
+    for first, trajectories in _simulate_chunks(
+        mass_balance, member_parameters, initial_states, time, chunk_size, n_jobs, executor, method, rtol, atol
+    ):
+        total += trajectories.sum(axis=0)
+        total_squares += np.square(trajectories).sum(axis=0)
+        if keep_trajectories:
+            out[first : first + len(trajectories)] = trajectories
+            continue
+        # reservoir sampling keeps a uniform random sample of the members seen so far
+        for i, trajectory in enumerate(trajectories, start=first):
+            j = i if i < len(sample) else rng.integers(i + 1)
+            if j < len(sample):
+                sample[j] = trajectory
+
+    mean = total / n_members
+    std = np.sqrt(np.maximum(total_squares / n_members - np.square(mean), 0))
+    quantile_levels = np.asarray(quantile_levels, dtype=float)
+    return EnsembleResult(
+        time=time,
+        trajectories=out if keep_trajectories else None,
+        quantile_levels=quantile_levels,
+        quantiles=np.quantile(sample, quantile_levels, axis=0),
+        mean=mean,
+        std=std,
+        n_members=n_members,
+        exact_quantiles=len(sample) == n_members,
+        simulation_time=timer.perf_counter() - start,
+    )
+
+
+def _simulate_chunks(
+    mass_balance: MassBalance,
+    parameters: Dict[str, np.ndarray],
+    initial_states: np.ndarray,
+    time: np.ndarray,
+    chunk_size: int,
+    n_jobs: Optional[int],
+    executor: Optional[Executor],
+    method: str,
+    rtol: float,
+    atol: float,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Yields the first member and the trajectories of every chunk, in order.
+    At most two chunks per worker are in flight, so that finished chunks do
+    not pile up in memory while an earlier one is still running.
+    """
+    firsts = range(0, len(initial_states), chunk_size)
+    chunks = [
+        (
+            mass_balance,
+            {name: values[first : first + chunk_size] for name, values in parameters.items()},
+            initial_states[first : first + chunk_size],
+            time,
+            method,
+            rtol,
+            atol,
+        )
+        for first in firsts
+    ]
+    if executor is None and (n_jobs is None or n_jobs == 1):
+        for first, chunk in zip(firsts, chunks):
+            yield first, _simulate_chunk(*chunk)
+        return
+
+    pool = executor or ProcessPoolExecutor(n_jobs if n_jobs and n_jobs > 0 else None)
+    n_workers = getattr(pool, "_max_workers", None) or os.cpu_count() or 1
+    pending = iter(zip(firsts, chunks))
+    try:
+        in_flight = deque(
+            (first, pool.submit(_simulate_chunk, *chunk)) for first, chunk in islice(pending, 2 * n_workers)
+        )
+        while in_flight:
+            first, future = in_flight.popleft()
+            trajectories = future.result()
+            # the next chunk is only submitted once one has been consumed
+            in_flight.extend((next_first, pool.submit(_simulate_chunk, *chunk)) for next_first, chunk in islice(pending, 1))
+            yield first, trajectories
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
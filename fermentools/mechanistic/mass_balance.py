@@ -1,15 +1,174 @@
+from typing import Callable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from numpy.typing import ArrayLike
+from scipy.integrate import solve_ivp
+from scipy.sparse import csc_matrix
+
 from . import YeastModel
 
+N_SPECIES = 3
+
+Flow = Union[float, Callable[[float], float]]
+
+
+def _flow(flow: Flow, time: float) -> float:
+    return flow(time) if callable(flow) else flow
+
+
 class MassBalance:
-    def __init__(self, microbial_kinetics: YeastModel, inlet: float, outlet: float):
+    """
+    Mass balance of a stirred reactor with the substrate, biomass and product
+    as (S, X, P) or, for a fed-batch, (S, X, P, V) with the volume V:
+
+        dC/dt = r(S, X) + F_in / V * (C_in - C)
+        dV/dt = F_in - F_out
+
+    With three states the volume is constant, as in a batch (no flows) or a
+    chemostat (F_in = F_out). States may be stored as columns, shape (n, ...),
+    to evaluate many states at once.
+    """
+
+    def __init__(
+        self,
+        microbial_kinetics: YeastModel,
+        inlet: Flow = 0.0,
+        outlet: Flow = 0.0,
+        feed_concentrations: Sequence[float] = (0.0, 0.0, 0.0),
+        volume: float = 1.0,
+    ):
+        """
+        Constructor.
+        @param microbial_kinetics YeastModel with the substrate, biomass and product rates.
+        @param inlet feed flow rate, or a function of time returning it.
+        @param outlet outlet flow rate, or a function of time returning it.
+        @param feed_concentrations substrate, biomass and product concentrations of the feed.
+        @param volume reactor volume, used when the state has no volume.
+        """
         self.microbial_kinetics = microbial_kinetics
         self.inlet = inlet
         self.outlet = outlet
+        self.feed_concentrations = np.asarray(feed_concentrations, dtype=float)
+        self.volume = volume
 
+    def calculate(self, concentrations: ArrayLike, time: float) -> np.ndarray:
+        """
+        Calculates the time derivative of the state, e.g. as the right-hand side of odeint.
+        @param concentrations state (S, X, P) or (S, X, P, V), or states stored as columns, shape (n, ...).
+        @param time time of the state.
+        @return derivative: array with the shape of the state.
+        """
+        concentrations = np.asarray(concentrations)
+        rates = self.microbial_kinetics.calculate_rates(concentrations[0], concentrations[1])
+        inlet = _flow(self.inlet, time)
+        if len(concentrations) == N_SPECIES:
+            if not inlet:
+                return rates
+            return rates + inlet / self.volume * (self._feed(concentrations.ndim) - concentrations)
+
+        derivative = np.empty(concentrations.shape, dtype=np.result_type(concentrations, rates))
+        derivative[:N_SPECIES] = rates
+        if inlet:
+            derivative[:N_SPECIES] += (
+                inlet / concentrations[N_SPECIES] * (self._feed(concentrations.ndim) - concentrations[:N_SPECIES])
+            )
+        derivative[N_SPECIES] = inlet - _flow(self.outlet, time)
+        return derivative
+
+    def jacobian(self, concentrations: ArrayLike, time: float) -> np.ndarray:
+        """
+        Calculates the derivative of calculate with respect to the state.
+        @param concentrations state (S, X, P) or (S, X, P, V), or states stored as columns, shape (n, ...).
+        @param time time of the state.
+        @return jacobian: array of shape (n, n, ...), where jacobian[i, j] is the derivative of the time
+        derivative of state i with respect to state j.
+        """
+        concentrations = np.asarray(concentrations)
+        n = len(concentrations)
+        rate_jacobian = self.microbial_kinetics.calculate_rate_jacobian(concentrations[0], concentrations[1])
+        shape = np.broadcast_shapes(rate_jacobian.shape[2:], concentrations.shape[1:])
+        jacobian = np.zeros((n, n) + shape, dtype=np.result_type(concentrations, rate_jacobian))
+        jacobian[:N_SPECIES, :2] = rate_jacobian
 
+        inlet = _flow(self.inlet, time)
+        if inlet:
+            volume = self.volume if n == N_SPECIES else concentrations[N_SPECIES]
+            for i in range(N_SPECIES):
+                jacobian[i, i] -= inlet / volume
+            if n > N_SPECIES:
+                jacobian[:N_SPECIES, N_SPECIES] = (
+                    -inlet / volume**2 * (self._feed(concentrations.ndim) - concentrations[:N_SPECIES])
+                )
+        return jacobian
 
-    def calculate(self, concentrations: list, time: float) -> list:
+    def simulate(
+        self,
+        t_span: Tuple[float, float],
+        y0: ArrayLike,
+        t_eval: Optional[ArrayLike] = None,
+        method: str = "BDF",
+        rtol: float = 1e-6,
+        atol: float = 1e-8,
+        out: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Calculates the mass balance for a given kinetic rate list.
+        Integrates the mass balance with scipy.integrate.solve_ivp and the
+        analytic jacobian. Many initial states stored as columns, shape (n, k),
+        are integrated together as one system with a sparse block diagonal
+        jacobian.
+        @param t_span initial and final time.
+        @param y0 initial state (S, X, P) or (S, X, P, V), or initial states stored as columns, shape (n, k).
+        @param t_eval times at which the state is stored; the solver steps when None.
+        @param method solve_ivp method; a stiff one (BDF, Radau, LSODA) uses the jacobian.
+        @param rtol relative tolerance.
+        @param atol absolute tolerance.
+        @param out optional array of shape (len(t_eval), *y0.shape) the states are copied into, e.g. a slice of a
+        larger array; solve_ivp still allocates its own solution, so it saves no memory.
+        @return time: array with the times of the states.
+        @return concentrations: array of shape (len(time), *y0.shape), as returned by odeint for a single state.
         """
-        return self.microbial_kinetics.calculate_rates(concentrations[0], concentrations[1])
+        y0 = np.asarray(y0, dtype=float)
+        if y0.ndim == 1:
+            fun, jac = self.calculate, self.jacobian
+        elif y0.ndim == 2:
+            fun, jac = self._stacked_system(y0.shape)
+        else:
+            raise ValueError("y0 must be a state or states stored as columns, shape (n, k).")
+
+        solution = solve_ivp(
+            lambda t, y: fun(y, t),
+            t_span,
+            y0.ravel(),
+            method=method,
+            t_eval=t_eval,
+            rtol=rtol,
+            atol=atol,
+            jac=lambda t, y: jac(y, t),
+        )
+        if not solution.success:
+            raise RuntimeError(f"The integration failed: {solution.message}")
+
+        shape = (len(solution.t),) + y0.shape
+        if out is None:
+            out = np.empty(shape)
+        elif out.shape != shape:
+            raise ValueError(f"out has shape {out.shape}, expected {shape}.")
+        out[...] = solution.y.T.reshape(shape)
+        return solution.t, out
+
+    def _stacked_system(self, shape: Tuple[int, int]):
+        n, k = shape
+        # the flattened state holds state i of column m at i * k + m
+        i, j, m = np.meshgrid(np.arange(n), np.arange(n), np.arange(k), indexing="ij")
+        rows, columns = (i * k + m).ravel(), (j * k + m).ravel()
+
+        def fun(y, t):
+            return self.calculate(y.reshape(shape), t).ravel()
+
+        def jac(y, t):
+            return csc_matrix((self.jacobian(y.reshape(shape), t).ravel(), (rows, columns)), shape=(n * k, n * k))
+
+        return fun, jac
+
+    def _feed(self, ndim: int) -> np.ndarray:
+        return self.feed_concentrations.reshape((N_SPECIES,) + (1,) * (ndim - 1))
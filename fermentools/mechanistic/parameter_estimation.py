@@ -0,0 +1,269 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from joblib import Parallel, delayed
+from scipy.optimize import least_squares
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from .mass_balance import MassBalance
+from .yeast_model import YeastModel
+
+# hplc columns of the states of the mass balance
+HPLC_STATES = {"glucose": 0, "ethanol": 2}
+
+_YIELDS = ("substrate_biomass_yield", "substrate_product_yield")
+
+
+@dataclass
+class ParameterEstimationResult:
+    """
+    Result of a multistart least-squares fit of a YeastModel.
+    @param parameters fitted value of every estimated parameter
+    @param standard_errors standard error of every estimated parameter
+    @param covariance covariance of the estimated parameters, s^2 (J^T J)^-1, in the order of parameters
+    @param cost half the sum of squared residuals of the best start
+    @param residual_variance s^2, the sum of squared residuals over the degrees of freedom
+    @param starts one row per start with its initial and fitted parameters, cost, success and number of evaluations
+    @param fit_time wall time of the fit in seconds
+    """
+
+    parameters: Dict[str, float]
+    standard_errors: Dict[str, float]
+    covariance: np.ndarray
+    cost: float
+    residual_variance: float
+    starts: pd.DataFrame
+    fit_time: float
+
+
+class _Objective:
+    """
+    Residuals and their jacobian for one worker. The model holds every
+    parameter as an array with one entry per stacked column: column 0 is the
+    nominal parameter set and column k + 1 has parameter k perturbed, so one
+    stacked integration gives the residuals and the finite differences with the
+    same solver steps. The model, its parameter arrays, the initial states and
+    the array the states are copied into are allocated once and reused by
+    every evaluation.
+    """
+
+    def __init__(
+        self,
+        model_type: str,
+        names: List[str],
+        fixed_parameters: Dict[str, float],
+        initial_state: np.ndarray,
+        times: np.ndarray,
+        measurements: np.ndarray,
+        measured_states: List[int],
+        relative_step: float,
+        rtol: float,
+        atol: float,
+    ):
+        k = len(names) + 1
+        parameters = {name: np.full(k, value, dtype=float) for name, value in fixed_parameters.items()}
+        parameters.update({name: np.ones(k) for name in names})
+        self.yeast_model = YeastModel(model_type, **parameters)
+        self.mass_balance = MassBalance(self.yeast_model, 0, 0)
+        self.names = names
+        self.initial_states = np.repeat(np.asarray(initial_state, dtype=float)[:, np.newaxis], k, axis=1)
+        self.times = times
+        self.measurements = measurements
+        self.measured_states = measured_states
+        self.observed = ~np.isnan(measurements)
+        self.relative_step = relative_step
+        self.rtol = rtol
+        self.atol = atol
+        self._out = np.empty((len(times), len(initial_state), k))
+        self._cache: Tuple[Optional[np.ndarray], Optional[Tuple[np.ndarray, np.ndarray]]] = (None, None)
+        self.n_evaluations = 0
+
+    def _set_parameters(self, x: np.ndarray) -> np.ndarray:
+        steps = self.relative_step * np.maximum(np.abs(x), 1e-8)
+        for i, name in enumerate(self.names):
+            values = self._parameter_array(name)
+            values[:] = x[i]
+            values[i + 1] += steps[i]
+        return steps
+
+    def _parameter_array(self, name: str) -> np.ndarray:
+        if name in _YIELDS:
+            return getattr(self.yeast_model, name)
+        return getattr(self.yeast_model.model, name)
+
+    def _simulate(self, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # least_squares asks for the residuals and the jacobian at the same point
+        cached_x, cached = self._cache
+        if cached_x is not None and np.array_equal(cached_x, x):
+            return cached
+        steps = self._set_parameters(x)
+        _, states = self.mass_balance.simulate(
+            (self.times[0], self.times[-1]),
+            self.initial_states,
+            t_eval=self.times,
+            rtol=self.rtol,
+            atol=self.atol,
+            out=self._out,
+        )
+        self.n_evaluations += 1
+        # predictions[column, time, measured state]
+        predictions = states[:, self.measured_states, :].transpose(2, 0, 1)
+        residuals = predictions[0][self.observed] - self.measurements[self.observed]
+        jacobian = ((predictions[1:] - predictions[0])[:, self.observed] / steps[:, np.newaxis]).T
+        self._cache = (x.copy(), (residuals, jacobian))
+        return residuals, jacobian
+
+    def residuals(self, x: np.ndarray) -> np.ndarray:
+        return self._simulate(x)[0]
+
+    def jacobian(self, x: np.ndarray) -> np.ndarray:
+        return self._simulate(x)[1]
+
+
+def _fit_start(objective_arguments: Tuple, x0: np.ndarray, bounds: Tuple[np.ndarray, np.ndarray]) -> Dict:
+    objective = _Objective(*objective_arguments)
+    try:
+        solution = least_squares(
+            objective.residuals, x0, jac=objective.jacobian, bounds=bounds, x_scale="jac"
+        )
+    except (RuntimeError, ValueError, np.linalg.LinAlgError):
+        return dict(
+            x=np.full(len(x0), np.nan),
+            cost=np.inf,
+            success=False,
+            jacobian=None,
+            n_residuals=0,
+            n_evaluations=objective.n_evaluations,
+        )
+    return dict(
+        x=solution.x,
+        cost=solution.cost,
+        success=bool(solution.success),
+        jacobian=solution.jac,
+        n_residuals=len(solution.fun),
+        n_evaluations=objective.n_evaluations,
+    )
+
+
+def _get_starts(
+    initial_parameters: np.ndarray, lower: np.ndarray, upper: np.ndarray, n_starts: int, random_state
+) -> np.ndarray:
+    rng = np.random.default_rng(random_state)
+    starts = np.empty((n_starts, len(initial_parameters)))
+    starts[0] = initial_parameters
+    # positive ranges spanning orders of magnitude are sampled log-uniformly
+    logarithmic = (lower > 0) & np.isfinite(upper)
+    uniform = ~logarithmic & np.isfinite(lower) & np.isfinite(upper)
+    for start in starts[1:]:
+        start[:] = initial_parameters
+        start[logarithmic] = np.exp(rng.uniform(np.log(lower[logarithmic]), np.log(upper[logarithmic])))
+        start[uniform] = rng.uniform(lower[uniform], upper[uniform])
+    return starts
+
+
+def estimate_parameters(
+    initial_parameters: Dict[str, float],
+    bounds: Dict[str, Tuple[float, float]],
+    initial_state: Sequence[float],
+    hplc: Optional[pd.DataFrame] = None,
+    model_type: str = "monod_non_competitive",
+    fixed_parameters: Optional[Dict[str, float]] = None,
+    measured_states: Optional[Dict[str, int]] = None,
+    n_starts: int = 8,
+    random_state=None,
+    n_jobs: Optional[int] = -1,
+    relative_step: float = 1e-6,
+    rtol: float = 1e-6,
+    atol: float = 1e-8,
+) -> ParameterEstimationResult:
+    """
+    Fits the yields and kinetic constants of a YeastModel in a batch
+    MassBalance to HPLC time courses by multistart least squares. The starts
+    are the initial parameters and random points within the bounds, fitted in
+    parallel worker processes. The jacobian of the residuals is computed by
+    finite differences, integrating the nominal and all perturbed parameter
+    sets together as one stacked system.
+    @param initial_parameters initial value of every estimated parameter, e.g. {"max_uptake_rate": 0.5}.
+    @param bounds (lower, upper) bounds of every estimated parameter.
+    @param initial_state substrate, biomass and product concentrations at the first HPLC time.
+    @param hplc dataframe with a time column and one column per measured state; defaults to the fermentation HPLC data.
+    @param model_type kinetic model of the YeastModel.
+    @param fixed_parameters values of the yields and kinetic constants that are not estimated.
+    @param measured_states dictionary mapping the HPLC columns to the states of the mass balance; defaults to glucose and ethanol.
+    @param n_starts number of starts, including the initial parameters.
+    @param random_state seed of the random starts.
+    @param n_jobs number of worker processes (joblib semantics); every core by default.
+    @param relative_step relative perturbation of the parameters for the finite differences.
+    @param rtol relative tolerance of the integration.
+    @param atol absolute tolerance of the integration.
+    @return result: ParameterEstimationResult
+    """
+    start_time = time.perf_counter()
+    if hplc is None:
+        from ..datasets.ir import load_fermentation_hplc_data
+
+        hplc = load_fermentation_hplc_data()
+    measured_states = HPLC_STATES if measured_states is None else measured_states
+    fixed_parameters = {} if fixed_parameters is None else dict(fixed_parameters)
+    names = list(initial_parameters)
+    if set(names) != set(bounds):
+        raise ValueError("bounds must have an entry for every estimated parameter.")
+    if set(names) & set(fixed_parameters):
+        raise ValueError("A parameter cannot be both estimated and fixed.")
+    if n_starts < 1:
+        raise ValueError("n_starts must be a positive integer.")
+
+    hplc = hplc.sort_values("time")
+    times = hplc["time"].to_numpy(dtype=float)
+    measurements = hplc[list(measured_states)].to_numpy(dtype=float)
+    x0 = np.array([initial_parameters[name] for name in names], dtype=float)
+    lower = np.array([bounds[name][0] for name in names], dtype=float)
+    upper = np.array([bounds[name][1] for name in names], dtype=float)
+    starts = _get_starts(x0, lower, upper, n_starts, random_state)
+
+    objective_arguments = (
+        model_type,
+        names,
+        fixed_parameters,
+        np.asarray(initial_state, dtype=float),
+        times,
+        measurements,
+        list(measured_states.values()),
+        relative_step,
+        rtol,
+        atol,
+    )
+    fits = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_start)(objective_arguments, x, (lower, upper)) for x in starts
+    )
+
+    best = min(range(n_starts), key=lambda i: fits[i]["cost"])
+    fit = fits[best]
+    if not np.isfinite(fit["cost"]):
+        raise RuntimeError("None of the starts could be fitted.")
+    degrees_of_freedom = max(fit["n_residuals"] - len(names), 1)
+    residual_variance = 2 * fit["cost"] / degrees_of_freedom
+    jacobian = fit["jacobian"]
+    covariance = residual_variance * np.linalg.pinv(jacobian.T @ jacobian)
+    standard_errors = np.sqrt(np.diag(covariance))
+
+    rows = []
+    for x, result in zip(starts, fits):
+        row = {f"initial_{name}": value for name, value in zip(names, x)}
+        row.update(zip(names, result["x"]))
+        row.update(cost=result["cost"], success=result["success"], n_evaluations=result["n_evaluations"])
+        rows.append(row)
+
+    return ParameterEstimationResult(
+        parameters=dict(zip(names, fit["x"].tolist())),
+        standard_errors=dict(zip(names, standard_errors.tolist())),
+        covariance=covariance,
+        cost=float(fit["cost"]),
+        residual_variance=float(residual_variance),
+        starts=pd.DataFrame(rows),
+        fit_time=time.perf_counter() - start_time,
+    )
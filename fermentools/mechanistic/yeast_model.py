@@ -1,5 +1,10 @@
 from kineticmodels.uptake_models import Monod, MonodSubstrateInhibition, MonodSubstrateCompetitiveInhibition, MonodSubstrateNonCompetitiveInhibition
 
+from typing import Optional
+
+import numpy as np
+from numpy.typing import ArrayLike
+
 
 class YeastModel:
     def __init__(
@@ -25,12 +30,98 @@ class YeastModel:
 
     def calculate_rates(
         self,
-        substrate_concentration: float,
-        biomass_concentration: float,
-    ):
-        substrate_rate = - self.model.rate(substrate_concentration) * biomass_concentration
-        biomass_rate = - substrate_rate * self.substrate_biomass_yield
-        product_rate = - substrate_rate * self.substrate_product_yield
+        substrate_concentration: ArrayLike,
+        biomass_concentration: ArrayLike,
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Calculates the substrate, biomass and product rates. The concentrations,
+        the yields and the kinetic parameters can be arrays of any broadcastable
+        shapes, e.g. many states, time points or parameter sets.
+        @param substrate_concentration substrate concentration(s)
+        @param biomass_concentration biomass concentration(s)
+        @param out optional array of shape (3, *shape) to write the rates into
+        @return rates: array of shape (3, *shape) with the substrate, biomass and product rates, where shape is the
+        broadcast shape of the concentrations and parameters
+        """
+        uptake_rate = self.model.rate(substrate_concentration) * biomass_concentration
+        if (
+            out is None
+            and np.ndim(uptake_rate) == 0
+            and np.ndim(self.substrate_biomass_yield) == 0
+            and np.ndim(self.substrate_product_yield) == 0
+        ):
+            # a single state, e.g. an odeint right-hand side, is faster with scalar arithmetic
+            return np.array(
+                [
+                    -uptake_rate,
+                    uptake_rate * self.substrate_biomass_yield,
+                    uptake_rate * self.substrate_product_yield,
+                ]
+            )
+        if out is None:
+            shape = np.broadcast_shapes(
+                np.shape(uptake_rate),
+                np.shape(self.substrate_biomass_yield),
+                np.shape(self.substrate_product_yield),
+            )
+            dtype = np.result_type(
+                uptake_rate, self.substrate_biomass_yield, self.substrate_product_yield
+            )
+            out = np.empty((3,) + shape, dtype=dtype)
 
+        np.negative(uptake_rate, out=out[0, ...])
+        np.multiply(uptake_rate, self.substrate_biomass_yield, out=out[1, ...])
+        np.multiply(uptake_rate, self.substrate_product_yield, out=out[2, ...])
+        return out
+
+    def calculate_rate_jacobian(
+        self,
+        substrate_concentration: ArrayLike,
+        biomass_concentration: ArrayLike,
+    ) -> np.ndarray:
+        """
+        Calculates the derivatives of the substrate, biomass and product rates
+        with respect to the substrate and biomass concentrations.
+        @param substrate_concentration substrate concentration(s)
+        @param biomass_concentration biomass concentration(s)
+        @return jacobian: array of shape (3, 2, *shape), where jacobian[i, 0] is the derivative of rate i with
+        respect to the substrate and jacobian[i, 1] with respect to the biomass
+        """
+        uptake_rate = self.model.rate(substrate_concentration)
+        uptake_rate_derivative = self._uptake_rate_derivative(substrate_concentration)
+        yields = (-1.0, self.substrate_biomass_yield, self.substrate_product_yield)
+        substrate_derivative = uptake_rate_derivative * biomass_concentration
+        if all(np.ndim(value) == 0 for value in (substrate_derivative, *yields)):
+            return np.array([[rate_yield * substrate_derivative, rate_yield * uptake_rate] for rate_yield in yields])
+        shape = np.broadcast_shapes(
+            np.shape(uptake_rate),
+            np.shape(biomass_concentration),
+            np.shape(self.substrate_biomass_yield),
+            np.shape(self.substrate_product_yield),
+        )
+        dtype = np.result_type(
+            uptake_rate, biomass_concentration, self.substrate_biomass_yield, self.substrate_product_yield
+        )
+        jacobian = np.empty((3, 2) + shape, dtype=dtype)
+        for i, rate_yield in enumerate(yields):
+            jacobian[i, 0, ...] = rate_yield * substrate_derivative
+            jacobian[i, 1, ...] = rate_yield * uptake_rate
+        return jacobian
 
-        return [substrate_rate, biomass_rate, product_rate]
\ No newline at end of file
+    def _uptake_rate_derivative(self, substrate_concentration: ArrayLike):
+        """
+        Derivative of the specific uptake rate with respect to the substrate concentration.
+        """
+        s = substrate_concentration
+        mu_max = self.model.max_uptake_rate
+        k_s = self.model.affinity_constant
+        if self.model_type == "monod":
+            return mu_max * k_s / (k_s + s) ** 2
+        k_i = self.model.substrate_inhibition_constant
+        if self.model_type == "monod_substrate_inhibition":
+            return mu_max * (k_s - s**2 / k_i) / (k_s + s + s**2 / k_i) ** 2
+        if self.model_type == "monod_non_competitive":
+            return mu_max * k_i * (k_s * k_i - s**2) / ((k_s + s) * (k_i + s)) ** 2
+        # monod_competitive
+        return mu_max * k_s / (k_s * (1.0 + s / k_i) + s) ** 2
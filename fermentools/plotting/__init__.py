@@ -1,2 +1,12 @@
-from .plot_chemometrics import plot_spectra, plot_pls_training, plot_pls_fermentation
+from typing import TYPE_CHECKING
 
+from .._lazy import attach
+
+# matplotlib is only imported when a plot function is first used
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    {".plot_chemometrics": ["plot_spectra", "plot_pls_training", "plot_pls_fermentation"]},
+)
+
+if TYPE_CHECKING:
+    from .plot_chemometrics import plot_spectra, plot_pls_training, plot_pls_fermentation
@@ -0,0 +1,175 @@
+from typing import Optional, Sequence, Tuple, Union
+
+import matplotlib
+from matplotlib.axes import Axes
+from matplotlib.collections import LineCollection
+from matplotlib.colors import Colormap, Normalize
+
+import numpy as np
+
+LEVELS_OF_DETAIL = ("auto", "density", "none")
+# levels of a few long series, which cannot be shaded as a density
+SERIES_LEVELS_OF_DETAIL = ("auto", "none")
+
+
+def check_level_of_detail(level_of_detail: str, levels: Tuple[str, ...] = LEVELS_OF_DETAIL) -> None:
+    """
+    Raises a ValueError for an unknown level of detail.
+    @param level_of_detail level of detail to check.
+    @param levels supported levels of detail.
+    """
+    if level_of_detail not in levels:
+        raise ValueError(f"level_of_detail must be one of {levels}, got {level_of_detail!r}.")
+
+
+def pixel_columns(ax: Axes) -> int:
+    """
+    Number of pixel columns of the axes, the most points a line can show.
+    @param ax matplotlib axes.
+    @return width: width of the axes in pixels.
+    """
+    return max(int(np.ceil(ax.bbox.width)), 1)
+
+
+def min_max_envelope(x: np.ndarray, y: np.ndarray, n_columns: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduces lines along their x axis to the minimum and maximum of every one
+    of n_columns bins, in the order they occur, so that the drawn lines look
+    the same at a width of n_columns pixels. Lines with no more than
+    2 * n_columns points are returned unchanged.
+    @param x x values, shape (n_points,).
+    @param y lines, shape (n_lines, n_points) or (n_points,).
+    @param n_columns number of bins, e.g. the pixel columns of the axes.
+    @return x: x values of the envelope, shape (n_lines, 2 * n_columns) or (2 * n_columns,) for a single line.
+    @return y: envelope of the lines, same shape as x.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n_points = y.shape[-1]
+    if n_points <= 2 * n_columns:
+        return np.broadcast_to(x, y.shape), y
+
+    # pad with the last point so that the bins have the same size
+    bin_size = -(-n_points // n_columns)
+    n_bins = -(-n_points // bin_size)
+    padding = n_bins * bin_size - n_points
+    y_bins = np.pad(y, [(0, 0)] * (y.ndim - 1) + [(0, padding)], mode="edge")
+    x_bins = np.pad(x, (0, padding), mode="edge")
+    y_bins = y_bins.reshape(y.shape[:-1] + (n_bins, bin_size))
+    x_bins = np.broadcast_to(x_bins.reshape(n_bins, bin_size), y_bins.shape)
+
+    lowest = y_bins.argmin(axis=-1)[..., np.newaxis]
+    highest = y_bins.argmax(axis=-1)[..., np.newaxis]
+    # the extreme that occurs first in the bin is drawn first
+    first = np.minimum(lowest, highest)
+    last = np.maximum(lowest, highest)
+    order = np.concatenate([first, last], axis=-1)
+    envelope_x = np.take_along_axis(x_bins, order, axis=-1).reshape(y.shape[:-1] + (2 * n_bins,))
+    envelope_y = np.take_along_axis(y_bins, order, axis=-1).reshape(y.shape[:-1] + (2 * n_bins,))
+    return envelope_x, envelope_y
+
+
+def sample_lines(n_lines: int, max_lines: int) -> np.ndarray:
+    """
+    Indices of at most max_lines evenly spaced lines, e.g. spectra spread
+    over the whole fermentation.
+    @param n_lines number of lines.
+    @param max_lines largest number of lines to keep.
+    @return indices: sorted indices of the kept lines.
+    """
+    if n_lines <= max_lines:
+        return np.arange(n_lines)
+    return np.unique(np.linspace(0, n_lines - 1, max_lines).round().astype(int))
+
+
+def add_lines(
+    ax: Axes,
+    x: np.ndarray,
+    y: np.ndarray,
+    color_by: Optional[np.ndarray] = None,
+    colors: Optional[Union[str, Sequence]] = None,
+    cmap: Union[str, Colormap] = "viridis",
+    norm: Optional[Normalize] = None,
+    level_of_detail: str = "auto",
+    max_lines: int = 500,
+    **kwargs,
+):
+    """
+    Draws many lines sharing one x axis as a single LineCollection, coloured
+    by a scalar per line through a colormap, or with fixed colours. With
+    level_of_detail "auto", at most max_lines evenly spaced lines are drawn and
+    every line is reduced to its min/max envelope per pixel column; with
+    "density", a 2-D histogram of all the lines is shaded instead of drawing
+    them; with "none", every point of every line is drawn.
+    @param ax matplotlib axes.
+    @param x x values, shape (n_points,).
+    @param y lines, shape (n_lines, n_points).
+    @param color_by scalar per line mapped through cmap and norm.
+    @param colors colour, or colours cycled over the lines, used when color_by is None.
+    @param cmap colormap of color_by or of the density.
+    @param norm normalisation of color_by; from its range when None.
+    @param level_of_detail "auto", "density" or "none".
+    @param max_lines largest number of lines drawn in "auto" mode.
+    @param kwargs keyword arguments of LineCollection, e.g. alpha or linewidths.
+    @return artist: the LineCollection, or the image of the density.
+    """
+    check_level_of_detail(level_of_detail)
+    x = np.asarray(x, dtype=float)
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    cmap = matplotlib.colormaps[cmap] if isinstance(cmap, str) else cmap
+    if level_of_detail == "density":
+        return _add_density(ax, x, y, cmap)
+
+    if level_of_detail == "auto":
+        lines = sample_lines(len(y), max_lines)
+        y = y[lines]
+        if color_by is not None:
+            color_by = np.asarray(color_by)[lines]
+        elif colors is not None and not isinstance(colors, str):
+            colors = [colors[i % len(colors)] for i in lines]
+        x_lines, y_lines = min_max_envelope(x, y, pixel_columns(ax))
+    else:
+        x_lines, y_lines = np.broadcast_to(x, y.shape), y
+
+    segments = np.stack([x_lines, y_lines], axis=-1)
+    if color_by is not None:
+        color_by = np.asarray(color_by, dtype=float)
+        if norm is None:
+            norm = Normalize(vmin=color_by.min(), vmax=color_by.max())
+        collection = LineCollection(segments, cmap=cmap, norm=norm, **kwargs)
+        collection.set_array(color_by)
+    else:
+        collection = LineCollection(segments, colors=colors, **kwargs)
+    ax.add_collection(collection)
+    ax.update_datalim(np.column_stack([x[[0, -1]], [np.nanmin(y), np.nanmax(y)]]))
+    ax.autoscale_view()
+    return collection
+
+
+def _add_density(ax: Axes, x: np.ndarray, y: np.ndarray, cmap: Colormap):
+    """
+    Shades the number of lines crossing every pixel of the axes.
+    """
+    n_columns = pixel_columns(ax)
+    n_rows = max(int(np.ceil(ax.bbox.height)), 1)
+    x_range = (x.min(), x.max())
+    y_range = (np.nanmin(y), np.nanmax(y))
+    # every line contributes its min/max envelope per pixel column
+    x_lines, y_lines = min_max_envelope(x, y, n_columns)
+    finite = np.isfinite(y_lines)
+    density, x_edges, y_edges = np.histogram2d(
+        x_lines[finite], y_lines[finite], bins=(n_columns, n_rows), range=(x_range, y_range)
+    )
+    masked = np.ma.masked_equal(density.T, 0)
+    image = ax.imshow(
+        masked,
+        origin="lower",
+        aspect="auto",
+        extent=(x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]),
+        cmap=cmap,
+        interpolation="nearest",
+    )
+    # descending wavenumber axes stay descending
+    if x[0] > x[-1]:
+        ax.invert_xaxis()
+    return image
@@ -2,21 +2,31 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
+from ._lod import SERIES_LEVELS_OF_DETAIL, add_lines, check_level_of_detail, min_max_envelope, pixel_columns
 
-def plot_pls_fermentation(prediction: np.ndarray, fermentation_hplc: pd.DataFrame) -> None:
+
+def plot_pls_fermentation(
+    prediction: np.ndarray, fermentation_hplc: pd.DataFrame, level_of_detail: str = "auto"
+) -> None:
     """
     Plots the predicted concentration and the reference hplc measurements.
     @param prediction load the predictions.
     @param fermentation_hplc load the reference hplc measurements.
+    @param level_of_detail "auto" draws the min/max envelope of the predictions per pixel column, "none" every point.
     """
-
+    check_level_of_detail(level_of_detail, SERIES_LEVELS_OF_DETAIL)
     time = np.linspace(0, len(prediction), len(prediction))
 
     plt.figure(figsize=(10, 3))
     plt.title("Fermentation frofile")
     plt.xlabel("Time (h)")
     plt.ylabel("Glucose concentration (g/l)")
-    plt.plot(time * 1.28 / 60, prediction, color="blue")
+    # one line per predicted variable
+    lines = np.asarray(prediction, dtype=float).reshape(len(prediction), -1).T
+    time = np.broadcast_to(time, lines.shape)
+    if level_of_detail == "auto":
+        time, lines = min_max_envelope(time[0], lines, pixel_columns(plt.gca()))
+    plt.plot(time.T * 1.28 / 60, lines.T, color="blue")
     plt.plot(fermentation_hplc["time"], fermentation_hplc["glucose"], "o", color="red")
     return None
 
@@ -40,18 +50,35 @@ def plot_pls_training(predictions: np.ndarray, reference: np.ndarray) -> None:
 
     return None
 
-def plot_spectra(spectra: pd.DataFrame, title: str, xlabel: str, ylabel: str):
+def plot_spectra(
+    spectra: pd.DataFrame,
+    title: str,
+    xlabel: str,
+    ylabel: str,
+    level_of_detail: str = "auto",
+    max_lines: int = 500,
+):
     """
-    Plots spectra.
+    Plots spectra as a single line collection in the colours of the property cycle.
     @param spectra dataframe containing the spectra with the wavenumbers as columns.
     @param title title of plot
     @param xlabel x-axis label
     @param ylabel y-axis label
+    @param level_of_detail "auto" draws at most max_lines evenly spaced spectra reduced to their min/max envelope per
+    pixel column, "density" shades how many spectra cross every pixel and "none" draws every point.
+    @param max_lines largest number of spectra drawn in "auto" mode.
     """
 
     plt.figure(figsize=(10, 3))
     plt.title(title)
     plt.xlabel(xlabel)
     plt.ylabel(ylabel)
-    plt.plot(spectra.columns, spectra.T.values)
+    add_lines(
+        plt.gca(),
+        spectra.columns.to_numpy(dtype=float),
+        spectra.to_numpy(dtype=float),
+        colors=plt.rcParams["axes.prop_cycle"].by_key()["color"],
+        level_of_detail=level_of_detail,
+        max_lines=max_lines,
+    )
     return None
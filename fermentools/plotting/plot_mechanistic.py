@@ -1,17 +1,27 @@
 import matplotlib.pyplot as plt
 import numpy as np
 
+from ._lod import SERIES_LEVELS_OF_DETAIL, check_level_of_detail, min_max_envelope, pixel_columns
 
-def plot_mechanistic_fermentation(time: np.ndarray, concentrations: np.ndarray) -> None:
+
+def plot_mechanistic_fermentation(
+    time: np.ndarray, concentrations: np.ndarray, level_of_detail: str = "auto"
+) -> None:
     """
     Plots the predicted concentration and the reference hplc measurements.
     @param prediction load the predictions.
     @param fermentation_hplc load the reference hplc measurements.
+    @param level_of_detail "auto" draws the min/max envelope of the concentrations per pixel column, "none" every point.
     """
+    check_level_of_detail(level_of_detail, SERIES_LEVELS_OF_DETAIL)
     plt.figure(figsize=(10, 3))
-    plt.plot(time, concentrations[:,0], color="blue", label="Glucose [g/L]")
-    plt.plot(time, concentrations[:,1], color="red", label="Biomass [g/L]")
-    plt.plot(time, concentrations[:,2], color="black", label="Ethanol [g/L]")
+    time = np.broadcast_to(np.asarray(time, dtype=float), (3, len(time)))
+    concentrations = np.asarray(concentrations, dtype=float)[:, :3].T
+    if level_of_detail == "auto":
+        time, concentrations = min_max_envelope(time[0], concentrations, pixel_columns(plt.gca()))
+    plt.plot(time[0], concentrations[0], color="blue", label="Glucose [g/L]")
+    plt.plot(time[1], concentrations[1], color="red", label="Biomass [g/L]")
+    plt.plot(time[2], concentrations[2], color="black", label="Ethanol [g/L]")
     plt.legend()
     plt.title("Fermentation profile")
     plt.ylabel("Concentration")
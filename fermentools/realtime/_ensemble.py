@@ -0,0 +1,192 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional, Union
+
+import numpy as np
+
+from ..datasets.ir._constants import SAMPLING_INTERVAL
+from ._kalman import _KalmanFilter, _get_rhs, _matrix_square_root, _runge_kutta
+
+
+def _integrate_members(process_model, members: np.ndarray, time: float, dt: float, n_substeps: int) -> np.ndarray:
+    """
+    Integrates the ensemble members stored as columns; run in the worker
+    processes for large ensembles.
+    """
+    rhs = _get_rhs(process_model)
+    _runge_kutta(
+        members,
+        np.empty_like(members),
+        np.empty_like(members),
+        lambda states, time: np.asarray(rhs(states, time)),
+        time,
+        dt,
+        n_substeps,
+    )
+    return members
+
+
+class EnsembleKalmanFilter(_KalmanFilter):
+    """
+    Stochastic ensemble Kalman filter. The members are the columns of one
+    array and are propagated together through the process model, one
+    vectorised call per Runge-Kutta stage, or split in chunks over a process
+    pool for large ensembles. The update uses perturbed observations, and the
+    state and covariance are the mean and covariance of the ensemble.
+    """
+
+    def __init__(
+        self,
+        measurement_covariance: np.ndarray,
+        model_covariance: np.ndarray,
+        process_model=None,
+        initial_state: Optional[np.ndarray] = None,
+        initial_covariance: Optional[np.ndarray] = None,
+        measurement_matrix: Optional[np.ndarray] = None,
+        time_step: float = SAMPLING_INTERVAL,
+        n_substeps: int = 4,
+        initial_time: float = 0.0,
+        n_members: int = 100,
+        random_state=None,
+        n_jobs: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        Constructor.
+        @param measurement_covariance covariance R of the default measurement, e.g. the PLS glucose prediction, shape (m, m)
+        @param model_covariance process noise covariance Q added every time_step, shape (n, n)
+        @param process_model object with a calculate(state, time) method returning the time derivative of the
+        states stored as columns (e.g. MassBalance), or such a function; None for a random walk. It must be
+        picklable when the members are propagated in a process pool.
+        @param initial_state initial state, shape (n,); zeros by default
+        @param initial_covariance initial state covariance, shape (n, n); model_covariance by default
+        @param measurement_matrix matrix H of the default measurement, shape (m, n); selects the first m states by default
+        @param time_step time between consecutive measurements in hours
+        @param n_substeps number of Runge-Kutta steps per time_step
+        @param initial_time time of the initial state in hours
+        @param n_members number of ensemble members
+        @param random_state seed of the initial ensemble, the process noise and the perturbed observations
+        @param n_jobs number of worker processes propagating the members; None or 1 propagates them in this process
+        @param executor process pool to propagate the members in, instead of one created for n_jobs
+        """
+        super().__init__(
+            measurement_covariance,
+            model_covariance,
+            process_model,
+            initial_state,
+            initial_covariance,
+            measurement_matrix,
+            time_step,
+            n_substeps,
+            initial_time,
+        )
+        if n_members < 2:
+            raise ValueError("The ensemble needs at least two members.")
+        self.n_members = n_members
+        self.n_jobs = n_jobs
+        self.executor = executor
+        self._owns_executor = False
+        self._rng = np.random.default_rng(random_state)
+        self.members = self.state[:, np.newaxis] + self._noise(self.covariance)
+        self._stage = np.empty_like(self.members)
+        self._increment = np.empty_like(self.members)
+        self._deviations = np.empty_like(self.members)
+        self._summarise()
+
+    def __enter__(self) -> "EnsembleKalmanFilter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Shuts down the process pool created for n_jobs.
+        """
+        if self._owns_executor:
+            self.executor.shutdown()
+            self.executor = None
+            self._owns_executor = False
+
+    def predict(self, dt: Optional[float] = None) -> np.ndarray:
+        """
+        Propagates the members with the process model and adds the process noise.
+        @param dt time to propagate in hours; time_step by default
+        @return state: predicted state, the ensemble mean
+        """
+        dt = self.time_step if dt is None else dt
+        executor = self._get_executor()
+        if executor is None:
+            _runge_kutta(
+                self.members,
+                self._stage,
+                self._increment,
+                lambda states, time: np.asarray(self._rhs(states, time)),
+                self.time,
+                dt,
+                self.n_substeps,
+            )
+        else:
+            chunks = np.array_split(self.members, self._n_chunks(), axis=1)
+            futures = [
+                executor.submit(_integrate_members, self.process_model, chunk, self.time, dt, self.n_substeps)
+                for chunk in chunks
+            ]
+            np.concatenate([future.result() for future in futures], axis=1, out=self.members)
+
+        self.members += self._noise(self.model_covariance * (dt / self.time_step))
+        self.time += dt
+        return self._summarise()
+
+    def update(
+        self,
+        measurement: Union[float, np.ndarray],
+        measurement_matrix: Optional[np.ndarray] = None,
+        measurement_covariance: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Corrects every member with a perturbed copy of the measurement. Missing
+        (NaN) entries are ignored.
+        @param measurement measurement vector, shape (m,)
+        @param measurement_matrix matrix H of the measurement; the default measurement matrix when None
+        @param measurement_covariance covariance R of the measurement; the default measurement covariance when None
+        @return state: corrected state, the ensemble mean
+        """
+        z = np.atleast_1d(np.asarray(measurement, dtype=float))
+        H = self.measurement_matrix if measurement_matrix is None else np.atleast_2d(measurement_matrix)
+        R = (
+            self.measurement_covariance
+            if measurement_covariance is None
+            else np.atleast_2d(measurement_covariance)
+        )
+        observed = ~np.isnan(z)
+        if not observed.any():
+            return self.state
+        if not observed.all():
+            z, H, R = z[observed], H[observed], R[np.ix_(observed, observed)]
+
+        # the gain from the ensemble covariance, K = P H' (H P H' + R)^-1
+        observation = H @ self.covariance
+        gain = np.linalg.solve(observation @ H.T + R, observation).T
+        innovations = z[:, np.newaxis] + self._noise(R) - H @ self.members
+        self.members += gain @ innovations
+        return self._summarise()
+
+    def _noise(self, covariance: np.ndarray) -> np.ndarray:
+        noise = self._rng.standard_normal((covariance.shape[0], self.n_members))
+        return _matrix_square_root(covariance) @ noise
+
+    def _summarise(self) -> np.ndarray:
+        np.mean(self.members, axis=1, out=self.state)
+        np.subtract(self.members, self.state[:, np.newaxis], out=self._deviations)
+        np.matmul(self._deviations, self._deviations.T, out=self.covariance)
+        self.covariance /= self.n_members - 1
+        return self.state
+
+    def _n_chunks(self) -> int:
+        return min(self.n_members, getattr(self.executor, "_max_workers", None) or self.n_jobs or 1)
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.executor is None and self.n_jobs is not None and self.n_jobs > 1:
+            self.executor = ProcessPoolExecutor(self.n_jobs)
+            self._owns_executor = True
+        return self.executor
@@ -0,0 +1,328 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, Hashable, List, NamedTuple, Optional
+
+import asyncio
+import inspect
+import logging
+import numpy as np
+
+from ..datasets.ir._constants import SAMPLING_INTERVAL
+
+_END = object()
+
+_logger = logging.getLogger(__name__)
+
+
+class SpectrumMessage(NamedTuple):
+    """
+    Spectrum received from a stream.
+    """
+
+    stream_id: Hashable
+    time: float
+    spectrum: np.ndarray
+
+
+def _parse_line(line: str) -> Optional[np.ndarray]:
+    line = line.strip()
+    if not line:
+        return None
+    return np.array(line.split(","), dtype=float)
+
+
+class SimulatorSource:
+    """
+    Replays a set of spectra as a live stream, e.g. the fermentation spectra
+    at a chosen speed-up of the real sampling rate.
+    """
+
+    def __init__(
+        self,
+        stream_id: Hashable,
+        spectra: Optional[np.ndarray] = None,
+        speedup: float = 60.0,
+        sampling_interval: float = SAMPLING_INTERVAL,
+        noise: float = 0.0,
+        random_state=None,
+    ):
+        """
+        Constructor.
+        @param stream_id identifier of the simulated reactor.
+        @param spectra array with one spectrum per row; defaults to the fermentation spectra.
+        @param speedup factor by which the replay is faster than the sampling rate; np.inf replays without waiting.
+        @param sampling_interval time between consecutive spectra in hours.
+        @param noise standard deviation of the gaussian noise added to every spectrum.
+        @param random_state seed of the noise.
+        """
+        if spectra is None:
+            from ..datasets.ir import load_fermentation_spectra_data
+
+            spectra = load_fermentation_spectra_data()
+        self.stream_id = stream_id
+        self.spectra = np.asarray(spectra, dtype=float)
+        self.speedup = speedup
+        self.sampling_interval = sampling_interval
+        self.noise = noise
+        self.random_state = random_state
+
+    async def __aiter__(self) -> AsyncIterator[SpectrumMessage]:
+        loop = asyncio.get_running_loop()
+        rng = np.random.default_rng(self.random_state)
+        period = self.sampling_interval * 3600 / self.speedup
+        start = loop.time()
+        for i, spectrum in enumerate(self.spectra):
+            # wait for the scheduled time of the spectrum so that the replay does not drift
+            await asyncio.sleep(max(start + i * period - loop.time(), 0))
+            if self.noise:
+                spectrum = spectrum + rng.normal(0, self.noise, spectrum.shape)
+            yield SpectrumMessage(self.stream_id, i * self.sampling_interval, spectrum)
+
+
+class FileTailSource:
+    """
+    Follows a csv file that an instrument appends spectra to, one spectrum per
+    line, yielding every complete line as it is written.
+    """
+
+    def __init__(
+        self,
+        stream_id: Hashable,
+        path: str,
+        header: bool = True,
+        poll_interval: float = 0.5,
+        idle_timeout: Optional[float] = None,
+        sampling_interval: float = SAMPLING_INTERVAL,
+    ):
+        """
+        Constructor.
+        @param stream_id identifier of the reactor.
+        @param path csv file with the spectra.
+        @param header whether the first line of the file is a header with the wavenumbers.
+        @param poll_interval time in seconds between checks for new lines.
+        @param idle_timeout time in seconds without new lines after which the stream ends; None to follow the file forever.
+        @param sampling_interval time between consecutive spectra in hours.
+        """
+        self.stream_id = stream_id
+        self.path = path
+        self.header = header
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.sampling_interval = sampling_interval
+
+    async def __aiter__(self) -> AsyncIterator[SpectrumMessage]:
+        loop = asyncio.get_running_loop()
+        skip_header = self.header
+        pending = ""
+        i = 0
+        last_line = loop.time()
+        with open(self.path, "r") as f:
+            while True:
+                pending += f.readline()
+                if not pending.endswith("\n"):
+                    # no complete line yet, the writer may be in the middle of one
+                    if self.idle_timeout is not None and loop.time() - last_line > self.idle_timeout:
+                        return
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                line, pending = pending, ""
+                last_line = loop.time()
+                if skip_header:
+                    skip_header = False
+                    continue
+                spectrum = _parse_line(line)
+                if spectrum is not None:
+                    yield SpectrumMessage(self.stream_id, i * self.sampling_interval, spectrum)
+                    i += 1
+
+
+class SocketSource:
+    """
+    Reads spectra sent over a TCP or Unix socket as comma separated lines, one
+    spectrum per line, until the connection is closed.
+    """
+
+    def __init__(
+        self,
+        stream_id: Hashable,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        path: Optional[str] = None,
+        sampling_interval: float = SAMPLING_INTERVAL,
+    ):
+        """
+        Constructor.
+        @param stream_id identifier of the reactor.
+        @param host host of a TCP connection.
+        @param port port of a TCP connection.
+        @param path path of a Unix socket, instead of host and port.
+        @param sampling_interval time between consecutive spectra in hours.
+        """
+        if (path is None) == (port is None):
+            raise ValueError("Pass either a port or the path of a Unix socket.")
+        self.stream_id = stream_id
+        self.host = host
+        self.port = port
+        self.path = path
+        self.sampling_interval = sampling_interval
+
+    async def __aiter__(self) -> AsyncIterator[SpectrumMessage]:
+        if self.path is not None:
+            reader, writer = await asyncio.open_unix_connection(self.path)
+        else:
+            reader, writer = await asyncio.open_connection(self.host or "127.0.0.1", self.port)
+        try:
+            i = 0
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                spectrum = _parse_line(line.decode())
+                if spectrum is not None:
+                    yield SpectrumMessage(self.stream_id, i * self.sampling_interval, spectrum)
+                    i += 1
+        finally:
+            writer.close()
+
+
+@dataclass
+class IngestionMetrics:
+    """
+    Counters of an IngestionPipeline.
+    @param received number of spectra read from the sources
+    @param processed number of spectra handled
+    @param errors number of spectra whose preprocessing or handler raised an exception, and of failed sources
+    @param max_queue_depth largest number of spectra waiting in the queue of a stream
+    @param per_stream number of spectra handled per stream
+    @param last_error representation of the last exception counted in errors, None when there was none
+    """
+
+    received: int = 0
+    processed: int = 0
+    errors: int = 0
+    max_queue_depth: int = 0
+    per_stream: Dict[Hashable, int] = field(default_factory=dict)
+    last_error: Optional[str] = None
+
+
+class IngestionPipeline:
+    """
+    Reads spectra from many sources concurrently on an asyncio event loop and
+    hands them to a handler, e.g. MicroBatchPredictor.predict_async. Every
+    stream has a bounded queue: when its handler falls behind, the source is
+    no longer read, which gives backpressure up to the instrument. The spectra
+    of a stream are handled in order; different streams are handled
+    concurrently. Preprocessing and synchronous handlers run in a thread pool
+    so that they do not block the event loop.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[SpectrumMessage], object],
+        preprocess: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+        max_queue_size: int = 64,
+        executor: Optional[Executor] = None,
+        max_workers: Optional[int] = None,
+    ):
+        """
+        Constructor.
+        @param handler function or coroutine function called with every SpectrumMessage.
+        @param preprocess function applied to every spectrum in the thread pool before the handler.
+        @param max_queue_size bound of the queue of every stream.
+        @param executor thread pool for the preprocessing and synchronous handlers; one is created when None.
+        @param max_workers number of threads of the created pool.
+        """
+        if max_queue_size < 1:
+            raise ValueError("max_queue_size must be a positive integer.")
+        self.handler = handler
+        self.preprocess = preprocess
+        self.max_queue_size = max_queue_size
+        self.executor = executor
+        self.max_workers = max_workers
+        self.metrics = IngestionMetrics()
+        self._sources: List = []
+        self._producers: List[asyncio.Task] = []
+
+    def add_source(self, source) -> None:
+        """
+        Adds a source, an async iterable of SpectrumMessage.
+        @param source SimulatorSource, FileTailSource, SocketSource or any async iterable of SpectrumMessage.
+        """
+        self._sources.append(source)
+
+    async def run(self) -> IngestionMetrics:
+        """
+        Reads every source until it ends, or until stop is called, and waits
+        for the queued spectra to be handled.
+        @return metrics: IngestionMetrics
+        """
+        executor = self.executor or ThreadPoolExecutor(
+            self.max_workers, thread_name_prefix="fermentools-ingestion"
+        )
+        try:
+            queues = [asyncio.Queue(self.max_queue_size) for _ in self._sources]
+            consumers = [
+                asyncio.create_task(self._consume(queue, executor)) for queue in queues
+            ]
+            self._producers = [
+                asyncio.create_task(self._produce(source, queue))
+                for source, queue in zip(self._sources, queues)
+            ]
+            await asyncio.gather(*self._producers, return_exceptions=True)
+            for queue in queues:
+                await queue.put(_END)
+            await asyncio.gather(*consumers)
+        finally:
+            self._producers = []
+            if self.executor is None:
+                executor.shutdown(wait=False)
+        return self.metrics
+
+    def stop(self) -> None:
+        """
+        Stops reading the sources; the spectra already queued are still handled.
+        """
+        for producer in self._producers:
+            producer.cancel()
+
+    async def _produce(self, source, queue: asyncio.Queue) -> None:
+        try:
+            async for message in source:
+                self.metrics.received += 1
+                await queue.put(message)
+                self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, queue.qsize())
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            _logger.exception("The source %r failed.", source)
+            self._count_error(e)
+
+    async def _consume(self, queue: asyncio.Queue, executor: Executor) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await queue.get()
+            if message is _END:
+                return
+            try:
+                if self.preprocess is not None:
+                    spectrum = await loop.run_in_executor(executor, self.preprocess, message.spectrum)
+                    message = message._replace(spectrum=spectrum)
+                if inspect.iscoroutinefunction(self.handler):
+                    await self.handler(message)
+                else:
+                    result = await loop.run_in_executor(executor, self.handler, message)
+                    if inspect.isawaitable(result):
+                        await result
+            except Exception as e:
+                _logger.exception("Handling a spectrum of stream %r failed.", message.stream_id)
+                self._count_error(e)
+                continue
+            self.metrics.processed += 1
+            per_stream = self.metrics.per_stream
+            per_stream[message.stream_id] = per_stream.get(message.stream_id, 0) + 1
+
+    def _count_error(self, error: Exception) -> None:
+        self.metrics.errors += 1
+        # the representation, not the exception, so that its traceback and frames are released
+        self.metrics.last_error = repr(error)
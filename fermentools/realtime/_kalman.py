@@ -0,0 +1,622 @@
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from ..datasets.ir._constants import SAMPLING_INTERVAL
+
+# rows of the HPLC measurements fused by default: glucose and ethanol, which
+# are the substrate (state 0) and the product (state 2) of the MassBalance
+HPLC_STATES = {"glucose": 0, "ethanol": 2}
+
+# imaginary step of the complex-step derivatives, which have no cancellation
+# error so the step can be far below the square root of the machine epsilon
+_COMPLEX_STEP = 1e-20
+
+
+def _get_rhs(process_model) -> Callable:
+    if process_model is None:
+        return lambda state, time: np.zeros_like(state)
+    if hasattr(process_model, "calculate"):
+        return process_model.calculate
+    return process_model
+
+
+def _matrix_square_root(matrix: np.ndarray) -> np.ndarray:
+    """
+    Lower triangular square root of a covariance matrix, falling back to the
+    symmetric square root when it is only positive semi-definite.
+    """
+    try:
+        return np.linalg.cholesky(matrix)
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh(matrix)
+        return vectors * np.sqrt(np.clip(values, 0, None))
+
+
+def _runge_kutta(
+    columns: np.ndarray,
+    stage: np.ndarray,
+    increment: np.ndarray,
+    derivative: Callable[[np.ndarray, float], np.ndarray],
+    time: float,
+    dt: float,
+    n_substeps: int,
+) -> None:
+    """
+    Integrates columns in place over dt with n_substeps classic Runge-Kutta
+    steps, using stage and increment as work arrays of the same shape.
+    """
+    h = dt / n_substeps
+    for _ in range(n_substeps):
+        k = derivative(columns, time)
+        np.multiply(k, h / 6, out=increment)
+        np.multiply(k, h / 2, out=stage)
+        stage += columns
+        k = derivative(stage, time + h / 2)
+        np.multiply(k, h / 2, out=stage)
+        stage += columns
+        increment += np.multiply(k, h / 3, out=k)
+        k = derivative(stage, time + h / 2)
+        np.multiply(k, h, out=stage)
+        stage += columns
+        increment += np.multiply(k, h / 3, out=k)
+        k = derivative(stage, time + h)
+        increment += np.multiply(k, h / 6, out=k)
+        columns += increment
+        time += h
+
+
+class _KalmanFilter:
+    """
+    Base class of the Kalman filters of a single reactor with an ODE process
+    model and linear measurements. Subclasses implement predict; the update
+    is the Kalman update in Joseph form with preallocated matrices.
+    """
+
+    def __init__(
+        self,
+        measurement_covariance: np.ndarray,
+        model_covariance: np.ndarray,
+        process_model=None,
+        initial_state: Optional[np.ndarray] = None,
+        initial_covariance: Optional[np.ndarray] = None,
+        measurement_matrix: Optional[np.ndarray] = None,
+        time_step: float = SAMPLING_INTERVAL,
+        n_substeps: int = 4,
+        initial_time: float = 0.0,
+    ):
+        """
+        Constructor.
+        @param measurement_covariance covariance R of the default measurement, e.g. the PLS glucose prediction, shape (m, m)
+        @param model_covariance process noise covariance Q added every time_step, shape (n, n)
+        @param process_model object with a calculate(state, time) method returning the time derivative of the
+        state (e.g. MassBalance), or such a function; None for a random walk.
+        @param initial_state initial state, shape (n,); zeros by default
+        @param initial_covariance initial state covariance, shape (n, n); model_covariance by default
+        @param measurement_matrix matrix H of the default measurement, shape (m, n); selects the first m states by default
+        @param time_step time between consecutive measurements in hours
+        @param n_substeps number of Runge-Kutta steps per time_step
+        @param initial_time time of the initial state in hours
+        """
+        self.measurement_covariance = np.atleast_2d(np.asarray(measurement_covariance, dtype=float))
+        self.model_covariance = np.atleast_2d(np.asarray(model_covariance, dtype=float))
+        n_states = self.model_covariance.shape[0]
+        n_measurements = self.measurement_covariance.shape[0]
+
+        self.process_model = process_model
+        self.measurement_matrix = (
+            np.eye(n_measurements, n_states)
+            if measurement_matrix is None
+            else np.atleast_2d(np.asarray(measurement_matrix, dtype=float))
+        )
+        if self.measurement_matrix.shape != (n_measurements, n_states):
+            raise ValueError(
+                f"measurement_matrix must have shape {(n_measurements, n_states)}."
+            )
+        self.time_step = time_step
+        self.n_substeps = n_substeps
+        self.time = initial_time
+        self.state = (
+            np.zeros(n_states) if initial_state is None else np.array(initial_state, dtype=float)
+        )
+        self.covariance = (
+            self.model_covariance.copy()
+            if initial_covariance is None
+            else np.array(np.atleast_2d(initial_covariance), dtype=float)
+        )
+
+        self._rhs = _get_rhs(process_model)
+        self._scratch = np.empty((n_states, n_states))
+        self._identity = np.eye(n_states)
+        self._correction = np.empty(n_states)
+        self._buffers: Dict[int, Tuple[np.ndarray, ...]] = {}
+
+    @property
+    def n_states(self) -> int:
+        """
+        Number of states.
+        """
+        return len(self.state)
+
+    def predict(self, dt: Optional[float] = None) -> np.ndarray:
+        """
+        Propagates the state and its covariance with the process model.
+        @param dt time to propagate in hours; time_step by default
+        @return state: predicted state
+        """
+        raise NotImplementedError
+
+    def update(
+        self,
+        measurement: Union[float, np.ndarray],
+        measurement_matrix: Optional[np.ndarray] = None,
+        measurement_covariance: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Corrects the state with a measurement. Missing (NaN) entries are ignored.
+        @param measurement measurement vector, shape (m,)
+        @param measurement_matrix matrix H of the measurement; the default measurement matrix when None
+        @param measurement_covariance covariance R of the measurement; the default measurement covariance when None
+        @return state: corrected state
+        """
+        z = np.atleast_1d(np.asarray(measurement, dtype=float))
+        H = self.measurement_matrix if measurement_matrix is None else np.atleast_2d(measurement_matrix)
+        R = (
+            self.measurement_covariance
+            if measurement_covariance is None
+            else np.atleast_2d(measurement_covariance)
+        )
+        observed = ~np.isnan(z)
+        if not observed.any():
+            return self.state
+        if not observed.all():
+            z, H, R = z[observed], H[observed], R[np.ix_(observed, observed)]
+
+        innovation, innovation_covariance, observation, gain, joseph, gain_covariance = (
+            self._get_buffers(len(z))
+        )
+        P = self.covariance
+        # innovation y = z - H x and its covariance S = H P H' + R
+        np.matmul(H, self.state, out=innovation)
+        np.subtract(z, innovation, out=innovation)
+        np.matmul(H, P, out=observation)
+        np.matmul(observation, H.T, out=innovation_covariance)
+        innovation_covariance += R
+        # gain K = P H' S^-1, computed as (S^-1 H P)' since P and S are symmetric
+        gain[:] = np.linalg.solve(innovation_covariance, observation).T
+        np.matmul(gain, innovation, out=self._correction)
+        self.state += self._correction
+
+        # Joseph form P = (I - K H) P (I - K H)' + K R K', symmetric and positive
+        # semi-definite for any gain
+        np.matmul(gain, H, out=joseph)
+        np.subtract(self._identity, joseph, out=joseph)
+        np.matmul(joseph, P, out=self._scratch)
+        np.matmul(self._scratch, joseph.T, out=P)
+        np.matmul(gain, R, out=gain_covariance)
+        np.matmul(gain_covariance, gain.T, out=self._scratch)
+        P += self._scratch
+        np.add(P, P.T, out=self._scratch)
+        np.multiply(self._scratch, 0.5, out=P)
+        return self.state
+
+    def step(
+        self, measurement: Optional[Union[float, np.ndarray]] = None, dt: Optional[float] = None
+    ) -> np.ndarray:
+        """
+        Predicts the state one time step ahead and corrects it with the measurement.
+        @param measurement default measurement at the new time, None to only predict
+        @param dt time to propagate in hours; time_step by default
+        @return state: estimated state
+        """
+        self.predict(dt)
+        if measurement is not None:
+            self.update(measurement)
+        return self.state
+
+    def filter(
+        self,
+        measurements: np.ndarray,
+        times: Optional[np.ndarray] = None,
+        hplc=None,
+        hplc_covariance: Optional[np.ndarray] = None,
+        hplc_states: Dict[str, int] = HPLC_STATES,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Runs the filter over a sequence of measurements, e.g. the PLS glucose
+        predictions of the fermentation spectra, fusing the sparse HPLC samples
+        at the first measurement time at or after they were taken. The first
+        measurement is taken at the current time of the filter.
+        @param measurements default measurements, shape (n_times,) or (n_times, m); NaN for missing values
+        @param times measurement times in hours; every time_step from the current time by default
+        @param hplc dataframe with a time column and the HPLC concentrations, e.g. load_fermentation_hplc_data()
+        @param hplc_covariance covariance of the HPLC measurements, shape (len(hplc_states), len(hplc_states))
+        @param hplc_states mapping of the HPLC columns to the states they measure
+        @return states: estimated states, shape (n_times, n)
+        @return covariances: state covariances, shape (n_times, n, n)
+        """
+        measurements = np.asarray(measurements, dtype=float)
+        n_times = len(measurements)
+        if times is None:
+            times = self.time + np.arange(n_times) * self.time_step
+        times = np.asarray(times, dtype=float)
+
+        if hplc is not None:
+            hplc_times = np.asarray(hplc["time"], dtype=float)
+            hplc_values = np.column_stack([np.asarray(hplc[column], dtype=float) for column in hplc_states])
+            hplc_matrix = np.zeros((len(hplc_states), self.n_states))
+            hplc_matrix[np.arange(len(hplc_states)), list(hplc_states.values())] = 1.0
+            if hplc_covariance is None:
+                raise ValueError("hplc_covariance is needed to fuse the HPLC measurements.")
+            # index of the first measurement time at or after every HPLC sample
+            hplc_steps = np.searchsorted(times, hplc_times, "left")
+
+        states = np.empty((n_times, self.n_states))
+        covariances = np.empty((n_times, self.n_states, self.n_states))
+        for i in range(n_times):
+            if i > 0 or times[0] != self.time:
+                self.predict(times[i] - self.time)
+            self.update(measurements[i])
+            if hplc is not None:
+                for sample in np.flatnonzero(hplc_steps == i):
+                    self.update(hplc_values[sample], hplc_matrix, hplc_covariance)
+            states[i] = self.state
+            covariances[i] = self.covariance
+        return states, covariances
+
+    def _get_buffers(self, n_measurements: int) -> Tuple[np.ndarray, ...]:
+        if n_measurements not in self._buffers:
+            n = self.n_states
+            m = n_measurements
+            self._buffers[n_measurements] = (
+                np.empty(m),
+                np.empty((m, m)),
+                np.empty((m, n)),
+                np.empty((n, m)),
+                np.empty((n, n)),
+                np.empty((n, m)),
+            )
+        return self._buffers[n_measurements]
+
+
+class ExtendedKalmanFilter(_KalmanFilter):
+    """
+    Extended Kalman filter for a fermentation described by an ODE process
+    model, e.g. a MassBalance, whose state is (substrate, biomass, product).
+    The model is integrated with a fixed-step Runge-Kutta scheme and the
+    Jacobian of the discrete transition is computed together with the state:
+    with the complex-step method by default, or with the variational
+    equations when the process model has a jacobian(state, time) method.
+    The covariance is updated in Joseph form and the matrices of a step are
+    preallocated.
+    """
+
+    def __init__(
+        self,
+        measurement_covariance: np.ndarray,
+        model_covariance: np.ndarray,
+        process_model=None,
+        initial_state: Optional[np.ndarray] = None,
+        initial_covariance: Optional[np.ndarray] = None,
+        measurement_matrix: Optional[np.ndarray] = None,
+        time_step: float = SAMPLING_INTERVAL,
+        n_substeps: int = 4,
+        initial_time: float = 0.0,
+    ):
+        """
+        Constructor.
+        @param measurement_covariance covariance R of the default measurement, e.g. the PLS glucose prediction, shape (m, m)
+        @param model_covariance process noise covariance Q added every time_step, shape (n, n)
+        @param process_model object with a calculate(state, time) method returning the time derivative of the
+        state (e.g. MassBalance), or such a function; None for a random walk.
+        @param initial_state initial state, shape (n,); zeros by default
+        @param initial_covariance initial state covariance, shape (n, n); model_covariance by default
+        @param measurement_matrix matrix H of the default measurement, shape (m, n); selects the first m states by default
+        @param time_step time between consecutive measurements in hours
+        @param n_substeps number of Runge-Kutta steps per time_step
+        @param initial_time time of the initial state in hours
+        """
+        super().__init__(
+            measurement_covariance,
+            model_covariance,
+            process_model,
+            initial_state,
+            initial_covariance,
+            measurement_matrix,
+            time_step,
+            n_substeps,
+            initial_time,
+        )
+        n_states = self.n_states
+
+        self._jacobian = getattr(process_model, "jacobian", None)
+        # the state and its tangents are integrated together as the columns of
+        # one (n, n + 1) array: complex-step perturbations or variational equations
+        dtype = float if self._jacobian is not None else complex
+        self._columns = np.empty((n_states, n_states + 1), dtype=dtype)
+        self._stage = np.empty_like(self._columns)
+        self._increment = np.empty_like(self._columns)
+        self._perturbation = np.eye(n_states) * (1j * _COMPLEX_STEP)
+        self._transition = np.empty((n_states, n_states))
+
+    def predict(self, dt: Optional[float] = None) -> np.ndarray:
+        """
+        Propagates the state and its covariance with the process model.
+        @param dt time to propagate in hours; time_step by default
+        @return state: predicted state
+        """
+        dt = self.time_step if dt is None else dt
+        transition = self._propagate(dt)
+
+        np.matmul(transition, self.covariance, out=self._scratch)
+        np.matmul(self._scratch, transition.T, out=self.covariance)
+        np.multiply(self.model_covariance, dt / self.time_step, out=self._scratch)
+        self.covariance += self._scratch
+        self.time += dt
+        return self.state
+
+    def _derivative(self, columns: np.ndarray, time: float) -> np.ndarray:
+        if self._jacobian is None:
+            # every column is a (complex-perturbed) state
+            return np.asarray(self._rhs(columns, time))
+        # state derivative and variational equations dS/dt = J S
+        state = columns[:, 0]
+        derivative = np.empty_like(columns)
+        derivative[:, 0] = self._rhs(state, time)
+        np.matmul(self._jacobian(state, time), columns[:, 1:], out=derivative[:, 1:])
+        return derivative
+
+    def _propagate(self, dt: float) -> np.ndarray:
+        columns, stage, increment = self._columns, self._stage, self._increment
+        columns[:, 0] = self.state
+        if self._jacobian is None:
+            columns[:, 1:] = self.state[:, np.newaxis]
+            columns[:, 1:] += self._perturbation
+        else:
+            columns[:, 1:] = self._identity
+
+        _runge_kutta(columns, stage, increment, self._derivative, self.time, dt, self.n_substeps)
+
+        self.state[:] = columns[:, 0].real
+        if self._jacobian is None:
+            np.divide(columns[:, 1:].imag, _COMPLEX_STEP, out=self._transition)
+        else:
+            self._transition[:] = columns[:, 1:]
+        return self._transition
+
+
+class BatchedExtendedKalmanFilter:
+    """
+    Extended Kalman filter for N reactors sharing one process model. The
+    states and covariances are stacked in (N, n) and (N, n, n) arrays and
+    every predict and update step advances all the reactors at once: the
+    process model is evaluated once per Runge-Kutta stage for every reactor
+    and every complex-step perturbation, and the covariance algebra uses
+    batched matrix products and solves. Missing measurements are masked,
+    so every reactor goes through the same arithmetic.
+    """
+
+    def __init__(
+        self,
+        measurement_covariance: np.ndarray,
+        model_covariance: np.ndarray,
+        process_model=None,
+        initial_states: Optional[np.ndarray] = None,
+        initial_covariances: Optional[np.ndarray] = None,
+        measurement_matrix: Optional[np.ndarray] = None,
+        time_step: float = SAMPLING_INTERVAL,
+        n_substeps: int = 4,
+        initial_time: float = 0.0,
+        n_reactors: Optional[int] = None,
+    ):
+        """
+        Constructor.
+        @param measurement_covariance covariance R of the default measurement, shape (m, m), or (N, m, m) per reactor
+        @param model_covariance process noise covariance Q added every time_step, shape (n, n), or (N, n, n) per reactor
+        @param process_model object with a calculate(state, time) method returning the time derivative of the
+        states stored as columns, shape (n, ...) (e.g. MassBalance), or such a function; None for a random walk.
+        With a jacobian(state, time) method returning shape (n, n, ...), the variational equations are used.
+        @param initial_states initial states, shape (N, n); zeros by default
+        @param initial_covariances initial state covariances, shape (N, n, n) or (n, n); model_covariance by default
+        @param measurement_matrix matrix H of the default measurement, shape (m, n); selects the first m states by default
+        @param time_step time between consecutive measurements in hours
+        @param n_substeps number of Runge-Kutta steps per time_step
+        @param initial_time time of the initial states in hours
+        @param n_reactors number of reactors, needed when initial_states is None
+        """
+        self.measurement_covariance = np.asarray(measurement_covariance, dtype=float)
+        self.model_covariance = np.asarray(model_covariance, dtype=float)
+        n_states = self.model_covariance.shape[-1]
+        n_measurements = self.measurement_covariance.shape[-1]
+
+        if initial_states is None:
+            if n_reactors is None:
+                raise ValueError("Pass the initial states or the number of reactors.")
+            initial_states = np.zeros((n_reactors, n_states))
+        self.states = np.array(initial_states, dtype=float)
+        n_reactors = len(self.states)
+        self.covariances = np.empty((n_reactors, n_states, n_states))
+        self.covariances[:] = self.model_covariance if initial_covariances is None else initial_covariances
+
+        self.process_model = process_model
+        self.measurement_matrix = (
+            np.eye(n_measurements, n_states)
+            if measurement_matrix is None
+            else np.atleast_2d(np.asarray(measurement_matrix, dtype=float))
+        )
+        self.time_step = time_step
+        self.n_substeps = n_substeps
+        self.time = initial_time
+
+        self._rhs = _get_rhs(process_model)
+        self._jacobian = getattr(process_model, "jacobian", None)
+        # the states and their tangents are integrated together as the columns
+        # of one (n, N, n + 1) array
+        dtype = float if self._jacobian is not None else complex
+        self._columns = np.empty((n_states, n_reactors, n_states + 1), dtype=dtype)
+        self._stage = np.empty_like(self._columns)
+        self._increment = np.empty_like(self._columns)
+        self._perturbation = np.eye(n_states)[:, np.newaxis, :] * (1j * _COMPLEX_STEP)
+        self._transitions = np.empty((n_reactors, n_states, n_states))
+        self._scratch = np.empty((n_reactors, n_states, n_states))
+        self._identity = np.eye(n_states)
+        self._correction = np.empty((n_reactors, n_states, 1))
+        self._buffers: Dict[int, Tuple[np.ndarray, ...]] = {}
+
+    @property
+    def n_reactors(self) -> int:
+        """
+        Number of reactors.
+        """
+        return self.states.shape[0]
+
+    @property
+    def n_states(self) -> int:
+        """
+        Number of states of every reactor.
+        """
+        return self.states.shape[1]
+
+    def predict(self, dt: Optional[float] = None) -> np.ndarray:
+        """
+        Propagates the states and their covariances with the process model.
+        @param dt time to propagate in hours; time_step by default
+        @return states: predicted states, shape (N, n)
+        """
+        dt = self.time_step if dt is None else dt
+        transitions = self._propagate(dt)
+
+        np.matmul(transitions, self.covariances, out=self._scratch)
+        np.matmul(self._scratch, transitions.transpose(0, 2, 1), out=self.covariances)
+        np.multiply(self.model_covariance, dt / self.time_step, out=self._scratch)
+        self.covariances += self._scratch
+        self.time += dt
+        return self.states
+
+    def update(
+        self,
+        measurements: np.ndarray,
+        measurement_matrix: Optional[np.ndarray] = None,
+        measurement_covariance: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Corrects the states with the measurements of every reactor. Missing
+        (NaN) entries are masked: their rows of H are zeroed, their variance
+        set to one and their innovation to zero, so they do not change the
+        state or the covariance of their reactor.
+        @param measurements measurements, shape (N, m) or (N,) for a single measured quantity
+        @param measurement_matrix matrix H of the measurements, shape (m, n); the default measurement matrix when None
+        @param measurement_covariance covariance R of the measurements, shape (m, m) or (N, m, m); the default
+        measurement covariance when None
+        @return states: corrected states, shape (N, n)
+        """
+        z = np.asarray(measurements, dtype=float).reshape(self.n_reactors, -1)
+        H = self.measurement_matrix if measurement_matrix is None else np.atleast_2d(measurement_matrix)
+        R = (
+            self.measurement_covariance
+            if measurement_covariance is None
+            else np.asarray(measurement_covariance, dtype=float)
+        )
+        (
+            observed,
+            masked_matrix,
+            masked_covariance,
+            innovations,
+            innovation_covariances,
+            observations,
+            gains,
+            joseph,
+            gain_covariances,
+        ) = self._get_buffers(z.shape[1])
+
+        np.logical_not(np.isnan(z), out=observed)
+        np.multiply(H, observed[:, :, np.newaxis], out=masked_matrix)
+        # R restricted to the observed pairs, with unit variance for the masked entries
+        np.multiply(R, observed[:, :, np.newaxis] & observed[:, np.newaxis, :], out=masked_covariance)
+        masked_covariance += np.eye(z.shape[1]) * ~observed[:, :, np.newaxis]
+
+        P = self.covariances
+        # innovations y = z - H x and their covariances S = H P H' + R
+        np.matmul(masked_matrix, self.states[:, :, np.newaxis], out=innovations)
+        np.subtract(z[:, :, np.newaxis], innovations, out=innovations)
+        innovations[~observed] = 0.0
+        np.matmul(masked_matrix, P, out=observations)
+        np.matmul(observations, masked_matrix.transpose(0, 2, 1), out=innovation_covariances)
+        innovation_covariances += masked_covariance
+        # gains K = P H' S^-1, computed as (S^-1 H P)' since P and S are symmetric
+        gains[:] = np.linalg.solve(innovation_covariances, observations).transpose(0, 2, 1)
+        np.matmul(gains, innovations, out=self._correction)
+        self.states += self._correction[:, :, 0]
+
+        # Joseph form P = (I - K H) P (I - K H)' + K R K'
+        np.matmul(gains, masked_matrix, out=joseph)
+        np.subtract(self._identity, joseph, out=joseph)
+        np.matmul(joseph, P, out=self._scratch)
+        np.matmul(self._scratch, joseph.transpose(0, 2, 1), out=P)
+        np.matmul(gains, masked_covariance, out=gain_covariances)
+        np.matmul(gain_covariances, gains.transpose(0, 2, 1), out=self._scratch)
+        P += self._scratch
+        np.add(P, P.transpose(0, 2, 1), out=self._scratch)
+        np.multiply(self._scratch, 0.5, out=P)
+        return self.states
+
+    def step(self, measurements: Optional[np.ndarray] = None, dt: Optional[float] = None) -> np.ndarray:
+        """
+        Predicts the states one time step ahead and corrects them with the measurements.
+        @param measurements default measurements at the new time, shape (N, m) or (N,); None to only predict
+        @param dt time to propagate in hours; time_step by default
+        @return states: estimated states, shape (N, n)
+        """
+        self.predict(dt)
+        if measurements is not None:
+            self.update(measurements)
+        return self.states
+
+    def _get_buffers(self, n_measurements: int) -> Tuple[np.ndarray, ...]:
+        if n_measurements not in self._buffers:
+            N, n, m = self.n_reactors, self.n_states, n_measurements
+            self._buffers[n_measurements] = (
+                np.empty((N, m), dtype=bool),
+                np.empty((N, m, n)),
+                np.empty((N, m, m)),
+                np.empty((N, m, 1)),
+                np.empty((N, m, m)),
+                np.empty((N, m, n)),
+                np.empty((N, n, m)),
+                np.empty((N, n, n)),
+                np.empty((N, n, m)),
+            )
+        return self._buffers[n_measurements]
+
+    def _derivative(self, columns: np.ndarray, time: float) -> np.ndarray:
+        if self._jacobian is None:
+            # every column of every reactor is a (complex-perturbed) state
+            return np.asarray(self._rhs(columns, time))
+        # state derivatives and variational equations dS/dt = J S
+        states = columns[:, :, 0]
+        derivative = np.empty_like(columns)
+        derivative[:, :, 0] = self._rhs(states, time)
+        derivative[:, :, 1:] = np.einsum("ijr,jrk->irk", self._jacobian(states, time), columns[:, :, 1:])
+        return derivative
+
+    def _propagate(self, dt: float) -> np.ndarray:
+        columns = self._columns
+        states = self.states.T
+        columns[:, :, 0] = states
+        if self._jacobian is None:
+            columns[:, :, 1:] = states[:, :, np.newaxis]
+            columns[:, :, 1:] += self._perturbation
+        else:
+            columns[:, :, 1:] = self._identity[:, np.newaxis, :]
+
+        _runge_kutta(
+            columns, self._stage, self._increment, self._derivative, self.time, dt, self.n_substeps
+        )
+
+        self.states[:] = columns[:, :, 0].real.T
+        # transitions[r, i, j] is the derivative of state i of reactor r with respect to its state j
+        if self._jacobian is None:
+            np.divide(columns[:, :, 1:].imag.transpose(1, 0, 2), _COMPLEX_STEP, out=self._transitions)
+        else:
+            self._transitions[:] = columns[:, :, 1:].transpose(1, 0, 2)
+        return self._transitions
@@ -0,0 +1,290 @@
+from concurrent.futures import Future, InvalidStateError
+from dataclasses import dataclass
+from typing import Callable, Hashable, List, NamedTuple, Optional, Sequence
+
+import asyncio
+import logging
+import numpy as np
+import queue
+import threading
+import time
+
+_STOP = object()
+
+_logger = logging.getLogger(__name__)
+
+
+class _Request(NamedTuple):
+    stream_id: Hashable
+    spectrum: np.ndarray
+    future: Future
+    submitted: float
+
+
+@dataclass
+class PredictorMetrics:
+    """
+    Snapshot of the counters of a MicroBatchPredictor.
+    @param queue_depth number of spectra waiting to be batched
+    @param n_predictions number of spectra predicted
+    @param n_batches number of batches predicted
+    @param last_batch_size size of the last batch
+    @param mean_batch_size mean number of spectra per batch
+    @param mean_latency mean time from submit to result in seconds
+    @param max_latency largest time from submit to result in seconds
+    """
+
+    queue_depth: int
+    n_predictions: int
+    n_batches: int
+    last_batch_size: int
+    mean_batch_size: float
+    mean_latency: float
+    max_latency: float
+
+
+class MicroBatchPredictor:
+    """
+    Serves predictions for single spectra arriving from many streams. The
+    spectra are gathered in a worker thread into micro-batches, closed when
+    max_batch_size spectra are waiting or the oldest one has waited
+    max_latency seconds, and predicted with one vectorised call. Every
+    spectrum gets its own Future with its prediction.
+    """
+
+    def __init__(
+        self,
+        model=None,
+        preprocessing: Optional[Sequence] = None,
+        n_features: Optional[int] = None,
+        max_batch_size: int = 64,
+        max_latency: float = 0.05,
+        max_queue_size: int = 0,
+        callback: Optional[Callable[[Hashable, np.ndarray], None]] = None,
+    ):
+        """
+        Constructor.
+        @param model model with a predict method; defaults to the bundled glucose LinearSpectralPredictor, which
+        folds RangeCut -> Derivative -> PLS into one matrix product.
+        @param preprocessing fitted preprocessing steps applied to every batch before model.predict.
+        @param n_features number of wavenumbers of the spectra; read from the model when it has n_features_in.
+        @param max_batch_size largest number of spectra predicted at once.
+        @param max_latency longest time in seconds a spectrum waits for its batch to fill.
+        @param max_queue_size bound of the queue of pending spectra, 0 for no bound; submit blocks when it is full.
+        @param callback function called with (stream_id, prediction) for every prediction, from the worker thread.
+        """
+        if model is None:
+            from ..chemometrics.models.load_pls_glucose_predictor import (
+                load_pls_glucose_predictor,
+            )
+
+            model = load_pls_glucose_predictor()
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be a positive integer.")
+        if max_latency < 0:
+            raise ValueError("max_latency must not be negative.")
+
+        self.model = model
+        self.preprocessing = list(preprocessing) if preprocessing is not None else []
+        self.n_features = n_features if n_features is not None else getattr(model, "n_features_in", None)
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.callback = callback
+
+        self._queue: "queue.Queue" = queue.Queue(max_queue_size)
+        self._buffer: Optional[np.ndarray] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # held while a spectrum is queued, so that none is queued after the stop signal
+        self._submit_lock = threading.Lock()
+        self._closed = False
+
+        self._n_predictions = 0
+        self._n_batches = 0
+        self._last_batch_size = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    def __enter__(self) -> "MicroBatchPredictor":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def start(self) -> None:
+        """
+        Starts the worker thread. It is started by the first submit otherwise.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The predictor is closed.")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="MicroBatchPredictor", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, stream_id: Hashable, spectrum, timeout: Optional[float] = None) -> Future:
+        """
+        Queues a spectrum for prediction.
+        @param stream_id identifier of the stream (e.g. the reactor) the spectrum comes from.
+        @param spectrum 1-D array with the spectrum.
+        @param timeout longest time in seconds to wait for room in a bounded queue.
+        @return future: Future whose result is the prediction of the spectrum, shape (n_targets,).
+        """
+        spectrum = np.asarray(spectrum, dtype=float)
+        if spectrum.ndim != 1:
+            raise ValueError("submit expects a single 1-D spectrum.")
+        if self.n_features is None:
+            self.n_features = len(spectrum)
+        elif len(spectrum) != self.n_features:
+            raise ValueError(
+                f"The spectrum has {len(spectrum)} wavenumbers, expected {self.n_features}."
+            )
+        if self._thread is None:
+            self.start()
+
+        future: Future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("The predictor is closed.")
+            self._queue.put(_Request(stream_id, spectrum, future, time.monotonic()), timeout=timeout)
+        return future
+
+    def predict(self, stream_id: Hashable, spectrum, timeout: Optional[float] = None) -> np.ndarray:
+        """
+        Predicts a spectrum, waiting for the result.
+        @param stream_id identifier of the stream the spectrum comes from.
+        @param spectrum 1-D array with the spectrum.
+        @param timeout longest time in seconds to wait for the result.
+        @return prediction: array of shape (n_targets,).
+        """
+        return self.submit(stream_id, spectrum).result(timeout)
+
+    async def predict_async(self, message) -> np.ndarray:
+        """
+        Predicts a spectrum from an asyncio event loop, e.g. as the handler of
+        an IngestionPipeline. The queue of the predictor should be unbounded so
+        that submitting never blocks the event loop.
+        @param message SpectrumMessage with the stream identifier and the spectrum.
+        @return prediction: array of shape (n_targets,).
+        """
+        return await asyncio.wrap_future(self.submit(message.stream_id, message.spectrum))
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Stops accepting spectra.
+        @param wait whether to predict the spectra already queued and wait for the worker thread to finish; otherwise
+        the futures of the queued spectra are cancelled and close returns at once.
+        """
+        with self._submit_lock:
+            with self._lock:
+                if self._closed:
+                    return
+                self._closed = True
+                thread = self._thread
+            if thread is None:
+                return
+            if not wait:
+                self._cancel_pending()
+            self._queue.put(_STOP)
+        if wait:
+            thread.join()
+
+    def _cancel_pending(self) -> None:
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            request.future.cancel()
+
+    @property
+    def metrics(self) -> PredictorMetrics:
+        """
+        Current counters of the predictor.
+        """
+        with self._lock:
+            n_batches = self._n_batches
+            n_predictions = self._n_predictions
+            return PredictorMetrics(
+                queue_depth=self._queue.qsize(),
+                n_predictions=n_predictions,
+                n_batches=n_batches,
+                last_batch_size=self._last_batch_size,
+                mean_batch_size=n_predictions / n_batches if n_batches else 0.0,
+                mean_latency=self._total_latency / n_predictions if n_predictions else 0.0,
+                max_latency=self._max_latency,
+            )
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if batch:
+                self._predict_batch(batch)
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        if not first.future.set_running_or_notify_cancel():
+            # cancelled while it was queued
+            return [], False
+
+        batch: List[_Request] = [first]
+        deadline = first.submitted + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is _STOP:
+                return batch, True
+            if request.future.set_running_or_notify_cancel():
+                batch.append(request)
+        return batch, False
+
+    def _predict_batch(self, batch: List[_Request]) -> None:
+        if self._buffer is None:
+            self._buffer = np.empty((self.max_batch_size, self.n_features))
+        x = self._buffer[: len(batch)]
+        for row, request in zip(x, batch):
+            row[:] = request.spectrum
+
+        try:
+            for step in self.preprocessing:
+                x = step.transform(x)
+            predictions = np.asarray(self.model.predict(x), dtype=float).reshape(len(batch), -1)
+        except Exception as e:
+            for request in batch:
+                try:
+                    request.future.set_exception(e)
+                except InvalidStateError:
+                    pass
+            return
+
+        now = time.monotonic()
+        latencies = [now - request.submitted for request in batch]
+        with self._lock:
+            self._n_batches += 1
+            self._n_predictions += len(batch)
+            self._last_batch_size = len(batch)
+            self._total_latency += sum(latencies)
+            self._max_latency = max(self._max_latency, max(latencies))
+
+        for request, prediction in zip(batch, predictions):
+            # the predictions are copied so that every result owns its memory
+            prediction = prediction.copy()
+            try:
+                request.future.set_result(prediction)
+            except InvalidStateError:
+                pass
+            if self.callback is not None:
+                # an error of the callback must not stop the worker thread and the other streams
+                try:
+                    self.callback(request.stream_id, prediction)
+                except Exception:
+                    _logger.exception("The callback of stream %r failed.", request.stream_id)
@@ -0,0 +1,117 @@
+from typing import Optional
+
+import numpy as np
+
+from ..datasets.ir._constants import SAMPLING_INTERVAL
+from ._kalman import _KalmanFilter, _matrix_square_root, _runge_kutta
+
+
+class UnscentedKalmanFilter(_KalmanFilter):
+    """
+    Unscented Kalman filter with the scaled sigma points of van der Merwe.
+    The 2n + 1 sigma points are the columns of one array and are propagated
+    together through the process model, one vectorised call per Runge-Kutta
+    stage. The measurements are linear in the state, so the update is the
+    Kalman update of the propagated mean and covariance.
+    """
+
+    def __init__(
+        self,
+        measurement_covariance: np.ndarray,
+        model_covariance: np.ndarray,
+        process_model=None,
+        initial_state: Optional[np.ndarray] = None,
+        initial_covariance: Optional[np.ndarray] = None,
+        measurement_matrix: Optional[np.ndarray] = None,
+        time_step: float = SAMPLING_INTERVAL,
+        n_substeps: int = 4,
+        initial_time: float = 0.0,
+        alpha: float = 1.0,
+        beta: float = 2.0,
+        kappa: float = 0.0,
+    ):
+        """
+        Constructor.
+        @param measurement_covariance covariance R of the default measurement, e.g. the PLS glucose prediction, shape (m, m)
+        @param model_covariance process noise covariance Q added every time_step, shape (n, n)
+        @param process_model object with a calculate(state, time) method returning the time derivative of the
+        states stored as columns (e.g. MassBalance), or such a function; None for a random walk.
+        @param initial_state initial state, shape (n,); zeros by default
+        @param initial_covariance initial state covariance, shape (n, n); model_covariance by default
+        @param measurement_matrix matrix H of the default measurement, shape (m, n); selects the first m states by default
+        @param time_step time between consecutive measurements in hours
+        @param n_substeps number of Runge-Kutta steps per time_step
+        @param initial_time time of the initial state in hours
+        @param alpha spread of the sigma points around the mean
+        @param beta prior knowledge of the distribution, 2 is optimal for gaussian distributions
+        @param kappa secondary scaling parameter
+        """
+        super().__init__(
+            measurement_covariance,
+            model_covariance,
+            process_model,
+            initial_state,
+            initial_covariance,
+            measurement_matrix,
+            time_step,
+            n_substeps,
+            initial_time,
+        )
+        n_states = self.n_states
+        self.alpha = alpha
+        self.beta = beta
+        self.kappa = kappa
+
+        spread = alpha**2 * (n_states + kappa) - n_states
+        self._scale = n_states + spread
+        self._mean_weights = np.full(2 * n_states + 1, 0.5 / self._scale)
+        self._mean_weights[0] = spread / self._scale
+        self._covariance_weights = self._mean_weights.copy()
+        self._covariance_weights[0] += 1 - alpha**2 + beta
+
+        self._columns = np.empty((n_states, 2 * n_states + 1))
+        self._stage = np.empty_like(self._columns)
+        self._increment = np.empty_like(self._columns)
+        self._deviations = np.empty_like(self._columns)
+
+    @property
+    def sigma_points(self) -> np.ndarray:
+        """
+        Sigma points of the current state and covariance, shape (n, 2n + 1).
+        """
+        root = _matrix_square_root(self._scale * self.covariance)
+        n_states = self.n_states
+        points = np.empty((n_states, 2 * n_states + 1))
+        points[:] = self.state[:, np.newaxis]
+        points[:, 1 : n_states + 1] += root
+        points[:, n_states + 1 :] -= root
+        return points
+
+    def predict(self, dt: Optional[float] = None) -> np.ndarray:
+        """
+        Propagates the sigma points with the process model and recomputes the
+        state and its covariance from them.
+        @param dt time to propagate in hours; time_step by default
+        @return state: predicted state
+        """
+        dt = self.time_step if dt is None else dt
+        columns = self._columns
+        columns[:] = self.sigma_points
+        _runge_kutta(
+            columns,
+            self._stage,
+            self._increment,
+            lambda points, time: np.asarray(self._rhs(points, time)),
+            self.time,
+            dt,
+            self.n_substeps,
+        )
+
+        np.matmul(columns, self._mean_weights, out=self.state)
+        np.subtract(columns, self.state[:, np.newaxis], out=self._deviations)
+        np.multiply(self._deviations, self._covariance_weights, out=self._stage)
+        np.matmul(self._stage, self._deviations.T, out=self.covariance)
+        np.multiply(self.model_covariance, dt / self.time_step, out=self._scratch)
+        self.covariance += self._scratch
+        self.time += dt
+        return self.state
@@ -0,0 +1,18 @@
+from typing import TYPE_CHECKING
+
+from .._lazy import attach
+
+# matplotlib, scikit-learn and chemotools are only imported when a report is first used
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    {
+        "._pca_reporter": ["PCAReport"],
+        "._pls_reporter": ["PLSRegressionReport"],
+        "._render": ["render_report", "render_reports"],
+    },
+)
+
+if TYPE_CHECKING:
+    from ._pca_reporter import PCAReport
+    from ._pls_reporter import PLSRegressionReport
+    from ._render import render_report, render_reports
@@ -0,0 +1,238 @@
+from typing import Any, Callable, Dict, List, Literal, Tuple
+
+import numpy as np
+
+from chemotools.outliers import QResiduals, HotellingT2
+
+from ._utils import extract_and_validate_model, get_cut_wavenumbers_from_pipeline
+
+Dataset = Literal["train", "test"]
+
+
+def _fitted_token(model) -> Tuple:
+    """
+    Identifies the fitted state of a model or pipeline by the identity of its
+    fitted attributes, which are replaced whenever a step is fitted again.
+    """
+    steps = model.steps if hasattr(model, "steps") else [(None, model)]
+    return tuple(
+        (name, id(value))
+        for _, step in steps
+        for name, value in vars(step).items()
+        if name.endswith("_") and not name.startswith("_")
+    )
+
+
+class _Report:
+    """
+    Base of the reports. The preprocessed data, scores, predictions and Q and
+    T2 statistics are computed lazily once and cached on the report, so that
+    every plot method shares them. The cache is cleared when the model or the
+    data are assigned and when the model is fitted again.
+    """
+
+    _model_type: Literal["pca", "pls"]
+    _DATA_ATTRIBUTES = ("model", "X_train", "y_train", "X_test", "y_test")
+    # plot methods drawn by render_report, in order
+    _PLOTS: Tuple[str, ...] = ()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == "model":
+            transformer, estimator = extract_and_validate_model(value, model_type=self._model_type)
+            object.__setattr__(self, "transformer", transformer)
+            object.__setattr__(self, "estimator", estimator)
+            object.__setattr__(
+                self,
+                "cut_wavenumbers",
+                get_cut_wavenumbers_from_pipeline(transformer) if transformer is not None else None,
+            )
+        object.__setattr__(self, name, value)
+        if name in self._DATA_ATTRIBUTES:
+            self.clear_cache()
+
+    def clear_cache(self) -> None:
+        """
+        Remove every cached result. Call it after modifying the data in place.
+        """
+        object.__setattr__(self, "_cache", {})
+
+    def compute(self):
+        """
+        Compute every cached result of the train and test data at once.
+
+        The data are preprocessed once, and projected, reconstructed and
+        predicted in one call for both sets.
+
+        Returns
+        -------
+        self
+        """
+        self._q_and_t2_detectors()
+        cache = self._get_cache()
+        self._compute([dataset for dataset in self._datasets() if ("scores", dataset) not in cache])
+        return self
+
+    def preprocessed_data(self, dataset: Dataset = "train") -> np.ndarray:
+        """
+        Data transformed by the preprocessing steps of the pipeline.
+
+        Parameters
+        ----------
+        dataset : {'train', 'test'}
+            The data to preprocess.
+
+        Returns
+        -------
+        preprocessed_data : np.ndarray
+            Array of shape (n_samples, n_features), cached on the report.
+        """
+        return self._cached(("preprocessed", dataset), lambda: self._preprocess(dataset))
+
+    def scores(self, dataset: Dataset = "train") -> np.ndarray:
+        """
+        Scores of the data in the latent space of the model.
+
+        Parameters
+        ----------
+        dataset : {'train', 'test'}
+            The data to project.
+
+        Returns
+        -------
+        scores : np.ndarray
+            Array of shape (n_samples, n_components), cached on the report.
+        """
+        return self._cached(("scores", dataset), lambda: self._compute([dataset]))
+
+    def q_residuals(self, dataset: Dataset = "train") -> np.ndarray:
+        """
+        Q residuals (squared reconstruction error) of the data.
+
+        Parameters
+        ----------
+        dataset : {'train', 'test'}
+            The data to reconstruct.
+
+        Returns
+        -------
+        q_residuals : np.ndarray
+            Array of shape (n_samples,), cached on the report.
+        """
+        return self._cached(("q_residuals", dataset), lambda: self._compute([dataset]))
+
+    def hotelling_t2(self, dataset: Dataset = "train") -> np.ndarray:
+        """
+        Hotelling T2 statistics of the data.
+
+        Parameters
+        ----------
+        dataset : {'train', 'test'}
+            The data to project.
+
+        Returns
+        -------
+        hotelling_t2 : np.ndarray
+            Array of shape (n_samples,), cached on the report.
+        """
+        return self._cached(("hotelling_t2", dataset), lambda: self._compute([dataset]))
+
+    @property
+    def q_residuals_critical_value(self) -> float:
+        """
+        Critical value of the Q residuals, fitted on the train data.
+        """
+        return self._q_and_t2_detectors()[0].critical_value_
+
+    @property
+    def hotelling_t2_critical_value(self) -> float:
+        """
+        Critical value of the Hotelling T2 statistics, fitted on the train data.
+        """
+        return self._q_and_t2_detectors()[1].critical_value_
+
+    def _get_cache(self) -> Dict:
+        token = _fitted_token(self.model)
+        cache = self.__dict__.setdefault("_cache", {})
+        if cache.get("fitted") != token:
+            cache.clear()
+            cache["fitted"] = token
+        return cache
+
+    def _cached(self, key: Tuple, compute: Callable[[], Any]):
+        cache = self._get_cache()
+        if key not in cache:
+            result = compute()
+            # _compute fills several entries at once and returns None
+            if key not in cache:
+                cache[key] = result
+        return cache[key]
+
+    def _datasets(self) -> List[str]:
+        return ["train"] if self.X_test is None else ["train", "test"]
+
+    def _data(self, dataset: Dataset):
+        if dataset == "train":
+            return self.X_train
+        if dataset == "test":
+            if self.X_test is None:
+                raise ValueError("The report has no test data.")
+            return self.X_test
+        raise ValueError("dataset must be either 'train' or 'test'")
+
+    def _preprocess(self, dataset: Dataset) -> np.ndarray:
+        X = self._data(dataset)
+        if self.transformer is not None:
+            X = self.transformer.transform(X)
+        return np.asarray(X, dtype=float)
+
+    def _latent_variances(self) -> np.ndarray:
+        if self._model_type == "pca":
+            return self.estimator.explained_variance_
+        return np.var(self.estimator.x_scores_, axis=0)
+
+    def _compute(self, datasets: List[str]) -> None:
+        """
+        Projects, reconstructs and predicts the preprocessed data of the
+        datasets stacked in one array.
+        """
+        if not datasets:
+            return
+        cache = self._get_cache()
+        X = np.vstack([self.preprocessed_data(dataset) for dataset in datasets])
+        scores = self.estimator.transform(X)
+        # the same statistics as chemotools' QResiduals and HotellingT2
+        q_residuals = np.sum((X - self.estimator.inverse_transform(scores)) ** 2, axis=1)
+        hotelling_t2 = np.sum(scores**2 / self._latent_variances(), axis=1)
+        results = {"scores": scores, "q_residuals": q_residuals, "hotelling_t2": hotelling_t2}
+        if self._model_type == "pls":
+            results["predictions"] = self.estimator.predict(X)
+
+        splits = np.cumsum([len(self.preprocessed_data(dataset)) for dataset in datasets])[:-1]
+        for name, values in results.items():
+            for dataset, part in zip(datasets, np.split(values, splits)):
+                cache[(name, dataset)] = part
+
+    def _q_and_t2_detectors(self) -> Tuple[QResiduals, HotellingT2]:
+        def fit():
+            # fitted on the preprocessed train data, so the pipeline is not applied again
+            X = self.preprocessed_data("train")
+            return QResiduals(self.estimator).fit(X), HotellingT2(self.estimator).fit(X)
+
+        return self._cached(("detectors",), fit)
+
+    def _available_plots(self) -> List[str]:
+        """
+        Plot methods of _PLOTS that can be drawn with the data of the report.
+        """
+        wavenumbers = self.cut_wavenumbers if self.cut_wavenumbers is not None else self.wavenumbers
+        has_feature_axis = wavenumbers is not None and len(wavenumbers) == self.estimator.n_features_in_
+        plots = []
+        for plot in self._PLOTS:
+            if plot == "plot_data" and self.wavenumbers is None:
+                continue
+            if plot in ("plot_preprocessed_data", "plot_loadings") and not has_feature_axis:
+                continue
+            if plot == "plot_scores" and self.estimator.n_components_ < 2:
+                continue
+            plots.append(plot)
+        return plots
@@ -6,20 +6,26 @@ import numpy as np
 from sklearn.decomposition import PCA
 from sklearn.pipeline import Pipeline
 
-from chemotools.outliers import QResiduals, HotellingT2
-
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.patches import Ellipse
 import matplotlib.transforms as transforms
 
-from reporter.plot.plot_spectra import plot_spectra
-from reporter._utils import (
-    extract_and_validate_model,
-    get_cut_wavenumbers_from_pipeline,
-)
+from .plot._figure import finish_figure, get_figure
+from .plot.plot_spectra import plot_spectra
+from ._base import _Report
+
 
+class PCAReport(_Report):
+    _model_type = "pca"
+    _PLOTS = (
+        "plot_data",
+        "plot_preprocessed_data",
+        "plot_scores",
+        "plot_loadings",
+        "plot_scree",
+        "plot_residuals",
+    )
 
-class PCAReport:
     def __init__(
         self,
         model: Union[Pipeline, PCA],
@@ -35,10 +41,6 @@ class PCAReport:
         self.X_test = X_test
         self.y_test = y_test
         self.wavenumbers = wavenumbers
-        self.transformer, self.estimator = extract_and_validate_model(
-            model, model_type="pca"
-        )
-        self.cut_wavenumbers = get_cut_wavenumbers_from_pipeline(self.transformer)
 
     def plot_data(
         self,
@@ -46,6 +48,8 @@ class PCAReport:
         title: str = "Spectra",
         x_label: str = "Wavenumber",
         y_label: str = "Intensity",
+        show: bool = True,
+        fig: Optional[Figure] = None,
     ):
         """
         Plot spectra with optional color coding.
@@ -54,6 +58,10 @@ class PCAReport:
         ----------
         color_by : Optional[ArrayLike]
             Optional array for color coding the points.
+        show : bool
+            Whether to show the figure; False for headless rendering, which needs fig.
+        fig : Optional[Figure]
+            Figure to draw on, cleared first; a new figure is created when None.
         """
 
         if self.wavenumbers is None:
@@ -69,7 +77,10 @@ class PCAReport:
             title=title,
             x_label=x_label,
             y_label=y_label,
+            show=show,
+            fig=fig,
         )
+        return self
 
     def plot_preprocessed_data(
         self,
@@ -77,6 +88,8 @@ class PCAReport:
         title: str = "Spectra",
         x_label: str = "Wavenumber",
         y_label: str = "Intensity",
+        show: bool = True,
+        fig: Optional[Figure] = None,
     ):
         """
         Plot preprocessed spectra with optional color coding.
@@ -85,6 +98,10 @@ class PCAReport:
         ----------
         color_by : Optional[ArrayLike]
             Optional array for color coding the points.
+        show : bool
+            Whether to show the figure; False for headless rendering, which needs fig.
+        fig : Optional[Figure]
+            Figure to draw on, cleared first; a new figure is created when None.
         """
 
         if self.wavenumbers is None:
@@ -100,12 +117,15 @@ class PCAReport:
 
         plot_spectra(
             x=wavenumbers,
-            y=self.transformer.transform(self.X_train),
+            y=self.preprocessed_data("train"),
             color_by=color_by,
             title=title,
             x_label=x_label,
             y_label=y_label,
+            show=show,
+            fig=fig,
         )
+        return self
 
     def _get_ellipse(self, x, y, ax, n_std: int = 3, edgecolor: str = "red"):
         cov = np.cov(x, y)
@@ -137,14 +157,22 @@ class PCAReport:
         ax.add_patch(ellipse)
 
     def plot_scores(
-        self, color_by=None, title="PCA Scores", x_axis=1, y_axis=2, n_std=3
+        self,
+        color_by=None,
+        title="PCA Scores",
+        x_axis=1,
+        y_axis=2,
+        n_std=3,
+        show=True,
+        fig=None,
     ):
-        X_train_pca = self.model.transform(self.X_train)
+        X_train_pca = self.scores("train")
 
         if color_by is None:
             color_by = self.y_train
 
-        fig, ax = plt.subplots(figsize=(5, 4))
+        fig = get_figure(fig, (5, 4), show)
+        ax = fig.subplots()
 
         # Plot training data
         scatter = ax.scatter(
@@ -169,7 +197,7 @@ class PCAReport:
         if self.X_test is None:
             pass
         else:
-            X_test_pca = self.model.transform(self.X_test)
+            X_test_pca = self.scores("test")
             # Plot test data
             ax.scatter(
                 X_test_pca[:, x_axis - 1],
@@ -192,14 +220,13 @@ class PCAReport:
         ax.set_title(title)
         ax.set_xlabel(f"PC{x_axis}")
         ax.set_ylabel(f"PC{y_axis}")
-        plt.colorbar(scatter, ax=ax, label="Color by (train)")
+        fig.colorbar(scatter, ax=ax, label="Color by (train)")
         ax.legend()
         ax.grid()
-        plt.tight_layout()
-        plt.show()
+        finish_figure(fig, show)
         return self
 
-    def plot_loadings(self, title="PCA Loadings"):
+    def plot_loadings(self, title="PCA Loadings", show=True, fig=None):
         loadings = self.estimator.components_.T
 
         if self.cut_wavenumbers is not None:
@@ -207,22 +234,23 @@ class PCAReport:
         else:
             wavenumbers = self.wavenumbers
 
-        fig, ax = plt.subplots(figsize=(10, 4))
+        fig = get_figure(fig, (10, 4), show)
+        ax = fig.subplots()
         ax.plot(wavenumbers, loadings)
         ax.set_title(title)
         ax.set_xlabel("Features")
         ax.set_ylabel("Loadings")
         ax.legend([f"PC{i + 1}" for i in range(loadings.shape[1])])
         ax.grid()
-        plt.tight_layout()
-        plt.show()
+        finish_figure(fig, show)
         return self
 
-    def plot_scree(self, title="Cumulative Explained Variance"):
+    def plot_scree(self, title="Cumulative Explained Variance", show=True, fig=None):
         explained_variance = self.estimator.explained_variance_ratio_
         cumulative_variance = np.cumsum(explained_variance)
 
-        fig, ax = plt.subplots(figsize=(10, 4))
+        fig = get_figure(fig, (10, 4), show)
+        ax = fig.subplots()
         ax.plot(
             range(1, len(explained_variance) + 1),
             explained_variance,
@@ -239,8 +267,7 @@ class PCAReport:
         ax.set_xlabel("Principal Component")
         ax.set_ylabel("Cumulative Explained Variance Ratio")
         ax.grid()
-        plt.tight_layout()
-        plt.show()
+        finish_figure(fig, show)
         return self
 
     def plot_residuals(
@@ -248,17 +275,17 @@ class PCAReport:
         color_by=None,
         label_by=None,
         title="Residuals",
+        show=True,
+        fig=None,
     ):
-        q_residuals = QResiduals(self.model)
-        h_residuals = HotellingT2(self.model)
-
-        q_train = q_residuals.fit_predict_residuals(self.X_train)
-        h_train = h_residuals.fit_predict_residuals(self.X_train, y=None)
+        q_train = self.q_residuals("train")
+        h_train = self.hotelling_t2("train")
 
         if color_by is None:
             color_by = self.y_train
 
-        fig, ax = plt.subplots(figsize=(5, 4))
+        fig = get_figure(fig, (5, 4), show)
+        ax = fig.subplots()
         # Plot training data
         scatter = ax.scatter(
             h_train,
@@ -274,8 +301,8 @@ class PCAReport:
         if self.X_test is None:
             pass
         else:
-            q_test = q_residuals.predict_residuals(self.X_test)
-            h_test = h_residuals.predict_residuals(self.X_test, y=None)
+            q_test = self.q_residuals("test")
+            h_test = self.hotelling_t2("test")
 
             ax.scatter(
                 h_test,
@@ -288,13 +315,13 @@ class PCAReport:
             )
 
         ax.axhline(
-            q_residuals.critical_value_,
+            self.q_residuals_critical_value,
             color="red",
             linestyle="--",
             label="Q Residuals Threshold",
         )
         ax.axvline(
-            h_residuals.critical_value_,
+            self.hotelling_t2_critical_value,
             color="red",
             linestyle="--",
             label="Hotelling T2 Threshold",
@@ -316,8 +343,7 @@ class PCAReport:
         ax.set_title(title)
         ax.set_xlabel("Hotelling T2")
         ax.set_ylabel("Q Residuals")
-        plt.colorbar(scatter, ax=ax, label="Color by (train)")
+        fig.colorbar(scatter, ax=ax, label="Color by (train)")
         ax.grid()
-        plt.tight_layout()
-        plt.show()
+        finish_figure(fig, show)
         return self
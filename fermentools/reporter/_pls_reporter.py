@@ -6,20 +6,24 @@ import numpy as np
 from sklearn.decomposition import PCA
 from sklearn.pipeline import Pipeline
 
-from chemotools.outliers import QResiduals, HotellingT2
-
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.patches import Ellipse
 import matplotlib.transforms as transforms
 
-from reporter.plot.plot_spectra import plot_spectra
-from reporter._utils import (
-    extract_and_validate_model,
-    get_cut_wavenumbers_from_pipeline,
-)
+from .plot._figure import finish_figure, get_figure
+from .plot.plot_spectra import plot_spectra
+from ._base import Dataset, _Report
+
 
+class PLSRegressionReport(_Report):
+    _model_type = "pls"
+    _PLOTS = (
+        "plot_data",
+        "plot_preprocessed_data",
+        "plot_residuals",
+        "plot_prediction_results",
+    )
 
-class PLSRegressionReport:
     def __init__(
         self,
         model: Union[Pipeline, PCA],
@@ -35,10 +39,22 @@ class PLSRegressionReport:
         self.X_test = X_test
         self.y_test = y_test
         self.wavenumbers = wavenumbers
-        self.transformer, self.estimator = extract_and_validate_model(
-            model, model_type="pls"
-        )
-        self.cut_wavenumbers = get_cut_wavenumbers_from_pipeline(self.transformer)
+
+    def predictions(self, dataset: Dataset = "train") -> np.ndarray:
+        """
+        Predictions of the model.
+
+        Parameters
+        ----------
+        dataset : {'train', 'test'}
+            The data to predict.
+
+        Returns
+        -------
+        predictions : np.ndarray
+            The predictions, cached on the report.
+        """
+        return self._cached(("predictions", dataset), lambda: self._compute([dataset]))
 
     def plot_data(
         self,
@@ -46,6 +62,8 @@ class PLSRegressionReport:
         title: str = "Spectra",
         x_label: str = "Wavenumber",
         y_label: str = "Intensity",
+        show: bool = True,
+        fig: Optional[Figure] = None,
     ):
         """
         Plot spectra with optional color coding.
@@ -54,6 +72,10 @@ class PLSRegressionReport:
         ----------
         color_by : Optional[ArrayLike]
             Optional array for color coding the points.
+        show : bool
+            Whether to show the figure; False for headless rendering, which needs fig.
+        fig : Optional[Figure]
+            Figure to draw on, cleared first; a new figure is created when None.
         """
 
         if self.wavenumbers is None:
@@ -69,7 +91,10 @@ class PLSRegressionReport:
             title=title,
             x_label=x_label,
             y_label=y_label,
+            show=show,
+            fig=fig,
         )
+        return self
 
     def plot_preprocessed_data(
         self,
@@ -77,6 +102,8 @@ class PLSRegressionReport:
         title: str = "Spectra",
         x_label: str = "Wavenumber",
         y_label: str = "Intensity",
+        show: bool = True,
+        fig: Optional[Figure] = None,
     ):
         """
         Plot preprocessed spectra with optional color coding.
@@ -85,6 +112,10 @@ class PLSRegressionReport:
         ----------
         color_by : Optional[ArrayLike]
             Optional array for color coding the points.
+        show : bool
+            Whether to show the figure; False for headless rendering, which needs fig.
+        fig : Optional[Figure]
+            Figure to draw on, cleared first; a new figure is created when None.
         """
 
         if self.wavenumbers is None:
@@ -100,12 +131,15 @@ class PLSRegressionReport:
 
         plot_spectra(
             x=wavenumbers,
-            y=self.transformer.transform(self.X_train),
+            y=self.preprocessed_data("train"),
             color_by=color_by,
             title=title,
             x_label=x_label,
             y_label=y_label,
+            show=show,
+            fig=fig,
         )
+        return self
 
     def _get_ellipse(self, x, y, ax, n_std: int = 3, edgecolor: str = "red"):
         cov = np.cov(x, y)
@@ -141,17 +175,17 @@ class PLSRegressionReport:
         color_by=None,
         label_by=None,
         title="Residuals",
+        show=True,
+        fig=None,
     ):
-        q_residuals = QResiduals(self.model)
-        h_residuals = HotellingT2(self.model)
-
-        q_train = q_residuals.fit_predict_residuals(self.X_train)
-        h_train = h_residuals.fit_predict_residuals(self.X_train, y=None)
+        q_train = self.q_residuals("train")
+        h_train = self.hotelling_t2("train")
 
         if color_by is None:
             color_by = self.y_train
 
-        fig, ax = plt.subplots(figsize=(5, 4))
+        fig = get_figure(fig, (5, 4), show)
+        ax = fig.subplots()
         # Plot training data
         scatter = ax.scatter(
             h_train,
@@ -167,8 +201,8 @@ class PLSRegressionReport:
         if self.X_test is None:
             pass
         else:
-            q_test = q_residuals.predict_residuals(self.X_test)
-            h_test = h_residuals.predict_residuals(self.X_test, y=None)
+            q_test = self.q_residuals("test")
+            h_test = self.hotelling_t2("test")
 
             ax.scatter(
                 h_test,
@@ -181,13 +215,13 @@ class PLSRegressionReport:
             )
 
         ax.axhline(
-            q_residuals.critical_value_,
+            self.q_residuals_critical_value,
             color="red",
             linestyle="--",
             label="Q Residuals Threshold",
         )
         ax.axvline(
-            h_residuals.critical_value_,
+            self.hotelling_t2_critical_value,
             color="red",
             linestyle="--",
             label="Hotelling T2 Threshold",
@@ -209,37 +243,42 @@ class PLSRegressionReport:
         ax.set_title(title)
         ax.set_xlabel("Hotelling T2")
         ax.set_ylabel("Q Residuals")
-        plt.colorbar(scatter, ax=ax, label="Color by (train)")
+        fig.colorbar(scatter, ax=ax, label="Color by (train)")
         ax.grid()
-        plt.tight_layout()
-        plt.show()
+        finish_figure(fig, show)
         return self
     
-    def plot_prediction_results(self, color_by=None):
+    def plot_prediction_results(self, color_by=None, show=True, fig=None):
         """
         Plot prediction results for the PLS regression model.
 
         Parameters
         ----------
-        None
+        color_by : Optional[ArrayLike]
+            Optional array for color coding the training points.
+        show : bool
+            Whether to show the figure; False for headless rendering, which needs fig.
+        fig : Optional[Figure]
+            Figure to draw on, cleared first; a new figure is created when None.
 
         Returns
         -------
-        None
+        self
         """
         if color_by is None:
             color_by = self.y_train
         else:
             color_by = np.asarray(color_by)
-        fig, ax = plt.subplots(1, 3, figsize=(15, 5))
+        fig = get_figure(fig, (15, 5), show)
+        ax = fig.subplots(1, 3)
 
         # Parity plot
-        ax[0].scatter(self.y_train, self.model.predict(self.X_train), c=color_by)
+        ax[0].scatter(self.y_train, self.predictions("train"), c=color_by)
         if self.X_test is not None:
             ax[0].scatter(
                 self.y_test,
-                self.model.predict(self.X_test),
-                c=color_by,
+                self.predictions("test"),
+                c="blue",
                 marker="s",
             )
         ax[0].set_xlabel("True Values")
@@ -253,11 +292,11 @@ class PLSRegressionReport:
 
         # Residuals plot
 
-        ax[1].scatter(self.y_train, self.model.predict(self.X_train) - self.y_train, c=color_by)
+        ax[1].scatter(self.y_train, self.predictions("train") - self.y_train, c=color_by)
         if self.X_test is not None:
             ax[1].scatter(
                 self.y_test,
-                self.model.predict(self.X_test) - self.y_test,
+                self.predictions("test") - self.y_test,
                 c='blue',
                 marker="s",
             )
@@ -266,17 +305,16 @@ class PLSRegressionReport:
         ax[1].set_title("Residuals Plot")
 
         # Histogram of residuals
-        residuals = self.model.predict(self.X_train) - self.y_train
+        residuals = self.predictions("train") - self.y_train
         ax[2].hist(residuals, bins=30, color="red", alpha=0.7)
 
         if self.X_test is not None: 
-            residuals_test = self.model.predict(self.X_test) - self.y_test
+            residuals_test = self.predictions("test") - self.y_test
             ax[2].hist(residuals_test, bins=30, color="blue", alpha=0.5)      
 
         ax[2].set_xlabel("Residuals")
         ax[2].set_ylabel("Frequency")
         ax[2].set_title("Histogram of Residuals")
-        plt.tight_layout()
-        plt.show()
+        finish_figure(fig, show)
         return self
 
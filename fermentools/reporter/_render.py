@@ -0,0 +1,150 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import html
+import io
+import os
+
+from matplotlib.figure import Figure
+
+FORMATS = ("png", "svg", "pdf", "html")
+
+# figure reused by every report rendered in a worker process
+_WORKER_FIGURE: Optional[Figure] = None
+
+
+def render_report(
+    report,
+    directory: str,
+    name: str = "report",
+    formats: Sequence[str] = ("png",),
+    dpi: int = 100,
+    fig: Optional[Figure] = None,
+) -> List[str]:
+    """
+    Render every plot of a report to files without showing them.
+
+    The plots are drawn one after the other on the same figure, which is not
+    managed by pyplot, so no window is opened and no figure is left open.
+
+    Parameters
+    ----------
+    report : PCAReport or PLSRegressionReport
+        The report to render.
+    directory : str
+        Directory the files are written to; it is created if needed.
+    name : str
+        Prefix of the files, e.g. the reactor or model name.
+    formats : Sequence[str]
+        Any of 'png', 'svg' and 'pdf', one file per plot and format, and
+        'html', one file with every plot as inline SVG.
+    dpi : int
+        Resolution of the PNG files.
+    fig : Optional[Figure]
+        Figure to draw on; a new one is created when None.
+
+    Returns
+    -------
+    paths : List[str]
+        Paths of the written files.
+    """
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown formats {sorted(unknown)}; expected any of {FORMATS}.")
+    os.makedirs(directory, exist_ok=True)
+    fig = Figure() if fig is None else fig
+
+    # scores, predictions and statistics are computed once for every plot
+    report.compute()
+    paths = []
+    sections = []
+    for plot in report._available_plots():
+        getattr(report, plot)(show=False, fig=fig)
+        for file_format in formats:
+            if file_format == "html":
+                buffer = io.StringIO()
+                fig.savefig(buffer, format="svg")
+                svg = buffer.getvalue()
+                sections.append(f"<h2>{html.escape(plot)}</h2>\n{svg[svg.index('<svg'):]}")
+                continue
+            path = os.path.join(directory, f"{name}_{plot}.{file_format}")
+            fig.savefig(path, format=file_format, dpi=dpi)
+            paths.append(path)
+
+    if sections:
+        path = os.path.join(directory, f"{name}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(
+                f"<!DOCTYPE html>\n<html>\n<head><meta charset=\"utf-8\"><title>{html.escape(name)}</title></head>\n"
+                f"<body>\n<h1>{html.escape(name)}</h1>\n" + "\n".join(sections) + "\n</body>\n</html>\n"
+            )
+        paths.append(path)
+    fig.clear()
+    return paths
+
+
+def _initialize_worker() -> None:
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def _render_in_worker(report, directory: str, name: str, formats: Sequence[str], dpi: int) -> List[str]:
+    global _WORKER_FIGURE
+    if _WORKER_FIGURE is None:
+        _WORKER_FIGURE = Figure()
+    return render_report(report, directory, name, formats, dpi, fig=_WORKER_FIGURE)
+
+
+def render_reports(
+    reports: Mapping[str, object],
+    directory: str,
+    formats: Sequence[str] = ("png",),
+    dpi: int = 100,
+    n_jobs: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> Dict[str, List[str]]:
+    """
+    Render many reports to files in parallel worker processes.
+
+    matplotlib is not thread-safe, so the reports are spread over a process
+    pool with the Agg backend, and every worker reuses one figure for all the
+    plots it draws. The reports are pickled to the workers.
+
+    Parameters
+    ----------
+    reports : Mapping[str, report]
+        Reports keyed by name, e.g. the reactor or model; the name prefixes the files.
+    directory : str
+        Directory the files are written to.
+    formats : Sequence[str]
+        Any of 'png', 'svg', 'pdf' and 'html'.
+    dpi : int
+        Resolution of the PNG files.
+    n_jobs : Optional[int]
+        Number of worker processes, every core when None; 1 renders in this process.
+    executor : Optional[Executor]
+        Process pool to use instead of creating one.
+
+    Returns
+    -------
+    paths : Dict[str, List[str]]
+        Paths of the written files of every report.
+    """
+    if executor is None and n_jobs == 1:
+        fig = Figure()
+        return {
+            name: render_report(report, directory, name, formats, dpi, fig=fig)
+            for name, report in reports.items()
+        }
+
+    pool = executor or ProcessPoolExecutor(n_jobs, initializer=_initialize_worker)
+    try:
+        futures = {
+            name: pool.submit(_render_in_worker, report, directory, name, formats, dpi)
+            for name, report in reports.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
@@ -0,0 +1,50 @@
+from typing import Optional, Tuple
+
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+
+def get_figure(fig: Optional[Figure], figsize: Tuple[float, float], show: bool = True) -> Figure:
+    """
+    Get the figure to draw a plot on.
+
+    Parameters
+    ----------
+    fig : Optional[Figure]
+        Figure to reuse; it is cleared and resized. A new pyplot figure is
+        created when None.
+    figsize : Tuple[float, float]
+        Size of the figure in inches.
+    show : bool
+        Whether the figure will be shown. A plot that is not shown must be
+        drawn on a figure of the caller, which can save it, so that no pyplot
+        figure is left open and no work is lost.
+
+    Returns
+    -------
+    fig : matplotlib.figure.Figure
+        The figure to draw on.
+    """
+    if fig is None:
+        if not show:
+            raise ValueError("Pass the figure to draw on when the plot is not shown, e.g. fig=Figure().")
+        return plt.figure(figsize=figsize)
+    fig.clear()
+    fig.set_size_inches(figsize)
+    return fig
+
+
+def finish_figure(fig: Figure, show: bool) -> None:
+    """
+    Lay out a figure and show it if requested.
+
+    Parameters
+    ----------
+    fig : Figure
+        The figure to finish.
+    show : bool
+        Whether to call plt.show, which blocks or does nothing on headless servers.
+    """
+    fig.tight_layout()
+    if show:
+        plt.show()
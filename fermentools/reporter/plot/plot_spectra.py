@@ -1,10 +1,11 @@
-from typing import Optional
-import matplotlib.pyplot as plt
-from matplotlib import cm
-from matplotlib.colors import Normalize
+from typing import Literal, Optional
+from matplotlib.figure import Figure
 from numpy.typing import ArrayLike
 import numpy as np
 
+from ...plotting._lod import add_lines
+from ._figure import finish_figure, get_figure
+
 
 def plot_spectra(
     x: ArrayLike,
@@ -13,10 +14,18 @@ def plot_spectra(
     title: str = "Spectra",
     x_label: str = "Wavenumber",
     y_label: str = "Intensity",
+    show: bool = True,
+    fig: Optional[Figure] = None,
+    level_of_detail: Literal["auto", "density", "none"] = "auto",
+    max_lines: int = 500,
 ):
     """
     Plot spectra with optional color coding based on a scalar array.
 
+    The spectra are drawn as a single LineCollection. By default at most
+    max_lines evenly spaced spectra are drawn, each reduced to its min/max
+    envelope per pixel column, which looks the same as drawing every point.
+
     Parameters
     ----------
     x : ArrayLike
@@ -31,6 +40,16 @@ def plot_spectra(
         Label for the x-axis (default is "Wavenumber").
     y_label : str, optional
         Label for the y-axis (default is "Intensity").
+    show : bool, optional
+        Whether to show the figure (default is True); False for headless rendering.
+    fig : Optional[Figure], optional
+        Figure to draw on, cleared first; a new figure is created when None.
+        Required when show is False.
+    level_of_detail : {'auto', 'density', 'none'}, optional
+        'auto' samples and decimates the spectra (default), 'density' shades
+        how many spectra cross every pixel, and 'none' draws every point.
+    max_lines : int, optional
+        Largest number of spectra drawn in 'auto' mode (default is 500).
 
     Returns
     -------
@@ -47,19 +66,23 @@ def plot_spectra(
     else:
         color_by = np.asarray(color_by)
 
-    norm = Normalize(vmin=color_by.min(), vmax=color_by.max())
-    cmap = cm.get_cmap("viridis")
-
-    fig, ax = plt.subplots(figsize=(10, 4))
-
-    for i in range(y.shape[0]):
-        ax.plot(x, y[i], color=cmap(norm(color_by[i])), alpha=0.7)
+    fig = get_figure(fig, (10, 4), show)
+    ax = fig.subplots()
+    add_lines(
+        ax,
+        x,
+        y,
+        color_by=color_by,
+        cmap="viridis",
+        level_of_detail=level_of_detail,
+        max_lines=max_lines,
+        alpha=0.7,
+    )
 
     ax.set_title(title)
     ax.set_xlabel(x_label)
     ax.set_ylabel(y_label)
     ax.grid(True)
-    plt.tight_layout()
-    plt.show()
+    finish_figure(fig, show)
 
     return fig, ax
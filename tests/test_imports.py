@@ -0,0 +1,63 @@
+import subprocess
+import sys
+
+# largest import time in seconds of the prediction-only path, numpy included
+IMPORT_TIME_BUDGET = 1.0
+
+
+def test_prediction_import_time():
+  """
+  Test that the prediction-only path imports none of the modelling and plotting dependencies and stays within budget.
+  """
+  # Arrange
+  code = (
+    "import fermentools.plotting, fermentools.reporter, fermentools.chemometrics.modelling\n"
+    "from fermentools.chemometrics.models import LinearSpectralPredictor, load_pls_glucose_predictor\n"
+    "from fermentools.realtime import MicroBatchPredictor\n"
+  )
+
+  # Act
+  output = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True)
+  rows = [line.split("|") for line in output.stderr.splitlines() if line.startswith("import time:")][1:]
+  modules = {name.strip() for _, _, name in rows}
+  self_time = sum(int(time.split(":")[1]) for time, _, _ in rows) / 1e6
+
+  # Assert
+  assert not {"matplotlib", "sklearn", "mbpls", "joblib", "chemotools", "pandas"} & modules
+  assert self_time < IMPORT_TIME_BUDGET
+
+
+def test_lazy_imports():
+  """
+  Test that the lazily imported names resolve on first access.
+  """
+  # Arrange
+  import fermentools.chemometrics.modelling as modelling
+  import fermentools.reporter as reporter
+
+  # Act
+  plot_cross_validation = modelling.plot_cross_validation
+
+  # Assert
+  assert callable(modelling.cross_validation)
+  assert plot_cross_validation.__module__ == "fermentools.chemometrics.modelling._cross_validation"
+  assert "PCAReport" in dir(reporter)
+  assert reporter.render_reports.__name__ == "render_reports"
+
+
+def test_lazy_imports_are_not_shadowed_by_submodules():
+  """
+  Test that importing one submodule never binds a module over a lazily imported function of the same name.
+  """
+  # Arrange
+  code = (
+    "import fermentools.chemometrics.modelling as m\n"
+    "m.search_preprocessing\n"
+    "assert callable(m.pls_cross_validation)\n"
+    "from fermentools.chemometrics.modelling import cross_validation\n"
+    "from fermentools.chemometrics.modelling import pls_cross_validation\n"
+    "assert callable(cross_validation) and callable(pls_cross_validation)\n"
+  )
+
+  # Act & Assert
+  subprocess.run([sys.executable, "-c", code], check=True)
@@ -1,5 +1,9 @@
-from fermentools.datasets.ir import load_training_data, load_fermentation_spectra_data, load_fermentation_hplc_data
+import numpy as np
+
+from fermentools.datasets.ir import load_training_data, load_fermentation_spectra_data, load_fermentation_hplc_data, iter_fermentation_spectra
+from fermentools.datasets.ir._base import PACKAGE_DIRECTORY
 from fermentools.datasets.fluorescence import load_filtered_fluorescence_data, load_unfiltered_fluorescence_data
+from fermentools.datasets.fluorescence import _base as fluorescence_base
 
 def test_ir_train_loadings():
   """
@@ -42,4 +46,60 @@ def test_fluorescence_loadings():
 
   # Assert
   assert eem_filtered.shape == (10, 43, 91)
-  assert eem_unfiltered.shape == (10, 43, 91)
\ No newline at end of file
+  assert eem_unfiltered.shape == (10, 43, 91)
+
+def test_ir_cached_loadings(tmp_path, monkeypatch):
+  """
+  Test that the cached training data matches the parsed csv files.
+  """
+  # Arrange
+  monkeypatch.setenv("FERMENTOOLS_CACHE_DIR", str(tmp_path))
+  spectra, reference = load_training_data(cache=False)
+
+  # Act
+  load_training_data()
+  cached_spectra, cached_reference = load_training_data()
+  rebuilt_spectra, _ = load_training_data(rebuild_cache=True)
+
+  # Assert
+  assert any(tmp_path.iterdir())
+  assert cached_spectra.equals(spectra)
+  assert cached_reference.equals(reference)
+  assert rebuilt_spectra.equals(spectra)
+  assert cached_spectra.columns.dtype == float
+
+
+def test_fluorescence_views(tmp_path, monkeypatch):
+  """
+  Test that the filtered and unfiltered data are views of one shared tensor.
+  """
+  # Arrange
+  monkeypatch.setenv("FERMENTOOLS_CACHE_DIR", str(tmp_path))
+  monkeypatch.setattr(fluorescence_base, "_EXCITATION_EMISSION_DATA", {})
+  eem_filtered, _, _ = load_filtered_fluorescence_data()
+
+  # Act
+  eem_unfiltered, _, _ = load_unfiltered_fluorescence_data()
+
+  # Assert
+  assert any(tmp_path.iterdir())
+  assert eem_filtered.base is eem_unfiltered.base
+  assert not eem_filtered.flags.writeable
+
+
+def test_ir_streamed_spectra():
+  """
+  Test the chunked spectra reader with a wavenumber range.
+  """
+  # Arrange
+  spectra, _ = load_training_data()
+  path = PACKAGE_DIRECTORY + "/data/train_spectra.csv"
+
+  # Act
+  chunks = list(iter_fermentation_spectra(chunksize=8, columns=(950, 1550), dtype=np.float32, path=path))
+
+  # Assert
+  assert [chunk.spectra.shape for chunk in chunks] == [(8, 446), (8, 446), (5, 446)]
+  assert chunks[0].spectra.dtype == np.float32
+  assert chunks[-1].time[0] == 16 * 1.28 / 60
+  assert np.allclose(np.vstack([chunk.spectra for chunk in chunks]), spectra.loc[:, 950:1550].values)
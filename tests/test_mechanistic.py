@@ -0,0 +1,191 @@
+from fermentools.mechanistic import MassBalance, YeastModel, estimate_parameters, simulate_ensemble
+
+from concurrent.futures import ThreadPoolExecutor
+from scipy.integrate import odeint
+
+import numpy as np
+import pandas as pd
+
+
+def _yeast_model(model_type="monod_non_competitive"):
+  return YeastModel(
+    model_type,
+    substrate_biomass_yield=0.4,
+    substrate_product_yield=0.51,
+    max_uptake_rate=0.55,
+    affinity_constant=0.1,
+    substrate_inhibition_constant=5,
+  )
+
+
+def test_calculate_rates_broadcasting():
+  """
+  Test that the rates of arrays of states and parameter sets match the rates of single states.
+  """
+  # Arrange
+  yeast_model = YeastModel(
+    "monod_non_competitive",
+    substrate_biomass_yield=np.array([0.3, 0.4]),
+    substrate_product_yield=0.51,
+    max_uptake_rate=0.55,
+    affinity_constant=0.1,
+    substrate_inhibition_constant=5,
+  )
+  substrate = np.linspace(0.5, 40, 5)[:, np.newaxis]
+  biomass = np.linspace(0.5, 10, 5)[:, np.newaxis]
+  out = np.empty((3, 5, 2))
+
+  # Act
+  rates = yeast_model.calculate_rates(substrate, biomass)
+  yeast_model.calculate_rates(substrate, biomass, out=out)
+
+  # Assert
+  assert rates.shape == (3, 5, 2)
+  assert np.array_equal(rates, out)
+  for i in range(5):
+    for j, biomass_yield in enumerate([0.3, 0.4]):
+      uptake_rate = 0.55 * substrate[i, 0] / (0.1 + substrate[i, 0]) / (1 + substrate[i, 0] / 5) * biomass[i, 0]
+      assert np.allclose(rates[:, i, j], [-uptake_rate, uptake_rate * biomass_yield, uptake_rate * 0.51])
+
+
+def test_mass_balance_jacobian():
+  """
+  Test that the analytic jacobian of a fed-batch matches the complex-step derivative for every kinetic model.
+  """
+  # Arrange
+  states = np.random.default_rng(0).uniform(0.5, 20, (4, 6))
+  steps = np.eye(4)[:, :, np.newaxis] * 1e-20j
+
+  for model_type in ["monod_substrate_inhibition", "monod_non_competitive", "monod_competitive"]:
+    mass_balance = MassBalance(_yeast_model(model_type), inlet=0.1, outlet=0.02, feed_concentrations=(100, 0, 0))
+
+    # Act
+    jacobian = mass_balance.jacobian(states, 0.0)
+    complex_step = np.stack([mass_balance.calculate(states + step, 0.0).imag / 1e-20 for step in steps], axis=1)
+
+    # Assert
+    assert jacobian.shape == (4, 4, 6)
+    assert np.allclose(jacobian, complex_step)
+
+
+def test_mass_balance_simulate():
+  """
+  Test that simulate matches odeint for single and stacked initial states, and integrates the fed-batch volume.
+  """
+  # Arrange
+  mass_balance = MassBalance(_yeast_model(), 0, 0)
+  fed_batch = MassBalance(_yeast_model(), inlet=0.05, outlet=0, feed_concentrations=(200, 0, 0))
+  time = np.linspace(0, 35, 36)
+  initial_states = np.column_stack([[40, 0.45, 0], [30, 1.0, 2], [20, 0.3, 0]])
+  out = np.empty((36, 3, 3))
+
+  # Act
+  _, concentrations = mass_balance.simulate((0, 35), [40, 0.45, 0], t_eval=time)
+  _, stacked = mass_balance.simulate((0, 35), initial_states, t_eval=time, out=out)
+  _, fed_batch_concentrations = fed_batch.simulate((0, 35), [40, 0.45, 0, 1.0], t_eval=time)
+
+  # Assert
+  assert np.allclose(concentrations, odeint(mass_balance.calculate, [40, 0.45, 0], time), atol=1e-3)
+  assert stacked is out
+  for i in range(3):
+    assert np.allclose(stacked[:, :, i], odeint(mass_balance.calculate, initial_states[:, i], time), atol=1e-3)
+  assert np.allclose(fed_batch_concentrations[:, 3], 1.0 + 0.05 * time)
+
+
+def test_estimate_parameters():
+  """
+  Test that the kinetic constants of a simulated fermentation are recovered with their covariance.
+  """
+  # Arrange
+  time = np.linspace(0, 30, 16)
+  _, concentrations = MassBalance(_yeast_model(), 0, 0).simulate((0, 30), [40, 0.45, 0], t_eval=time)
+  noise = np.random.default_rng(0).normal(0, 0.05, (16, 2))
+  hplc = pd.DataFrame({"time": time, "glucose": concentrations[:, 0] + noise[:, 0], "ethanol": concentrations[:, 2] + noise[:, 1]})
+
+  # Act
+  result = estimate_parameters(
+    initial_parameters={"max_uptake_rate": 0.3, "substrate_product_yield": 0.4},
+    bounds={"max_uptake_rate": (0.01, 5), "substrate_product_yield": (0.05, 1)},
+    initial_state=[40, 0.45, 0],
+    hplc=hplc,
+    fixed_parameters={"substrate_biomass_yield": 0.4, "affinity_constant": 0.1, "substrate_inhibition_constant": 5},
+    n_starts=3,
+    random_state=0,
+    n_jobs=1,
+  )
+
+  # Assert
+  assert len(result.starts) == 3
+  assert result.covariance.shape == (2, 2)
+  assert abs(result.parameters["max_uptake_rate"] - 0.55) < 3 * result.standard_errors["max_uptake_rate"] + 1e-3
+  assert abs(result.parameters["substrate_product_yield"] - 0.51) < 3 * result.standard_errors["substrate_product_yield"] + 1e-3
+  assert np.isclose(result.residual_variance, 0.05**2, rtol=0.6)
+
+
+def test_simulate_ensemble():
+  """
+  Test that the stacked ensemble matches the members simulated one by one, with and without keeping the trajectories.
+  """
+  # Arrange
+  mass_balance = MassBalance(_yeast_model(), 0, 0)
+  rng = np.random.default_rng(0)
+  max_uptake_rates = rng.normal(0.55, 0.05, 40)
+  initial_states = np.column_stack([rng.normal(40, 2, 40), rng.uniform(0.3, 0.6, 40), np.zeros(40)])
+  time = np.linspace(0, 35, 36)
+
+  # Act
+  kept = simulate_ensemble(mass_balance, initial_states, time, parameters={"max_uptake_rate": max_uptake_rates}, chunk_size=16)
+  streamed = simulate_ensemble(
+    mass_balance, initial_states, time, parameters={"max_uptake_rate": max_uptake_rates}, chunk_size=16, keep_trajectories=False
+  )
+
+  # Assert
+  assert kept.trajectories.shape == (40, 36, 3)
+  for i in [0, 17, 39]:
+    yeast_model = _yeast_model()
+    yeast_model.model.max_uptake_rate = max_uptake_rates[i]
+    expected = odeint(MassBalance(yeast_model, 0, 0).calculate, initial_states[i], time)
+    assert np.allclose(kept.trajectories[i], expected, atol=1e-3)
+  assert streamed.trajectories is None
+  assert streamed.exact_quantiles
+  assert np.allclose(streamed.quantiles, kept.quantiles)
+  assert np.allclose(streamed.mean, kept.trajectories.mean(axis=0))
+  assert np.allclose(streamed.std, kept.trajectories.std(axis=0))
+
+
+def test_simulate_ensemble_bounded_chunks():
+  """
+  Test that at most two chunks per worker are in flight, so that finished chunks do not pile up in memory.
+  """
+  # Arrange
+  class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+      super().__init__(1)
+      self.in_flight = 0
+      self.max_in_flight = 0
+
+    def submit(self, *args):
+      future = super().submit(*args)
+      self.in_flight += 1
+      self.max_in_flight = max(self.max_in_flight, self.in_flight)
+      executor = self
+
+      class Consumed:
+        def result(self):
+          executor.in_flight -= 1
+          return future.result()
+
+      return Consumed()
+
+  mass_balance = MassBalance(_yeast_model(), 0, 0)
+  initial_states = np.column_stack([np.linspace(30, 40, 40), np.full(40, 0.45), np.zeros(40)])
+  time = np.linspace(0, 35, 36)
+
+  # Act
+  with CountingExecutor() as executor:
+    pooled = simulate_ensemble(mass_balance, initial_states, time, chunk_size=4, executor=executor, keep_trajectories=False)
+  serial = simulate_ensemble(mass_balance, initial_states, time, chunk_size=4, keep_trajectories=False)
+
+  # Assert
+  assert executor.max_in_flight == 2
+  assert np.allclose(pooled.mean, serial.mean)
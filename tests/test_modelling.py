@@ -0,0 +1,141 @@
+from fermentools.datasets.ir import load_training_data
+from fermentools.chemometrics.preprocessing import RangeCut, Derivative
+from fermentools.chemometrics.modelling import cross_validate, pls_cross_validation, search_preprocessing
+
+from sklearn.cross_decomposition import PLSRegression
+from sklearn.model_selection import KFold, LeaveOneOut, ShuffleSplit, cross_val_predict
+
+import numpy as np
+import os
+import pytest
+import subprocess
+import sys
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load_preprocessed_training_data():
+  spectra, reference = load_training_data()
+  spectra = Derivative(1, 15, 1).apply_to(RangeCut(950, 1550).apply_to(spectra))
+  return spectra.values, reference.glucose.values
+
+
+def test_pls_cross_validation_leave_one_out():
+  """
+  Test the nested leave-one-out cross-validation against refitting scikit-learn PLS models.
+  """
+  # Arrange
+  spectra, glucose = _load_preprocessed_training_data()
+  expected = [
+    np.sqrt(np.mean((cross_val_predict(PLSRegression(n), spectra, glucose, cv=LeaveOneOut()) - glucose) ** 2))
+    for n in range(1, 8)
+  ]
+
+  # Act
+  press, rmsecv = pls_cross_validation(spectra, glucose, max_components=7)
+
+  # Assert
+  assert press.shape == (7,)
+  assert np.allclose(rmsecv, expected)
+  assert np.allclose(press, np.array(expected) ** 2 * len(glucose))
+
+
+def test_pls_cross_validation_k_fold_parallel():
+  """
+  Test the k-fold cross-validation with folds run in parallel.
+  """
+  # Arrange
+  spectra, glucose = _load_preprocessed_training_data()
+  cv = KFold(5, shuffle=True, random_state=0)
+  expected = [
+    np.sqrt(np.mean((cross_val_predict(PLSRegression(n), spectra, glucose, cv=cv) - glucose) ** 2))
+    for n in range(1, 6)
+  ]
+
+  # Act
+  _, rmsecv = pls_cross_validation(spectra, glucose, max_components=5, cv=cv, n_jobs=2)
+
+  # Assert
+  assert np.allclose(rmsecv, expected)
+
+
+def test_pls_cross_validation_folds_must_partition_samples():
+  """
+  Test that folds that do not predict every sample exactly once are rejected.
+  """
+  # Arrange
+  spectra, glucose = _load_preprocessed_training_data()
+
+  # Act & Assert
+  with pytest.raises(ValueError):
+    pls_cross_validation(spectra, glucose, max_components=3, cv=ShuffleSplit(5, random_state=0))
+  with pytest.raises(ValueError):
+    pls_cross_validation(spectra, glucose, max_components=3, cv=[(np.arange(1, 10), np.array([0]))])
+
+
+def test_cross_validation_headless():
+  """
+  Test that the cross-validation results are returned without importing matplotlib.
+  """
+  # Arrange
+  code = (
+    "import sys\n"
+    "from fermentools.datasets.ir import load_training_data\n"
+    "from fermentools.chemometrics.modelling import cross_validation\n"
+    "spectra, reference = load_training_data()\n"
+    "result = cross_validation(spectra.loc[:, 950:1550], reference.glucose, plot=False)\n"
+    "assert 'matplotlib' not in sys.modules\n"
+    "print(result.selected_n_components, result.fold_rmse.shape)\n"
+  )
+
+  # Act
+  output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT_DIRECTORY)
+
+  # Assert
+  n_components, shape = output.stdout.split(" ", 1)
+  assert 1 <= int(n_components) <= 7
+  assert shape.strip() == "(21, 7)"
+
+
+def test_search_preprocessing():
+  """
+  Test that the search reports the candidate with the lowest cross-validation error.
+  """
+  # Arrange
+  spectra, reference = load_training_data()
+  steps = [("rangecut", RangeCut(950, 1550)), ("derivative", Derivative(1))]
+  param_grid = {
+    "rangecut__end": [1500, 1550],
+    "derivative__window_length": [11, 15, 31],
+    "derivative__polynomial_order": [1, 2, 40],
+  }
+
+  # Act
+  result = search_preprocessing(spectra, reference.glucose, steps, param_grid, max_components=5, n_jobs=2)
+  sampled = search_preprocessing(spectra, reference.glucose, steps, param_grid, max_components=5, n_iter=4, random_state=0)
+
+  # Assert
+  assert len(result.candidates) == 18
+  assert result.candidates.loc[result.candidates.derivative__polynomial_order == 40, "rmsecv"].isna().all()
+  assert result.candidates.loc[result.candidates.derivative__polynomial_order == 40, "error"].notna().all()
+  assert result.candidates.loc[result.candidates.derivative__polynomial_order != 40, "error"].isna().all()
+  assert result.best_rmsecv == result.candidates.rmsecv.min()
+  best = Derivative(1, result.best_params["derivative__window_length"], result.best_params["derivative__polynomial_order"])
+  best_spectra = best.apply_to(RangeCut(950, result.best_params["rangecut__end"]).apply_to(spectra))
+  expected = cross_validate(best_spectra, reference.glucose, max_components=5)
+  assert result.best_n_components == expected.selected_n_components
+  assert np.isclose(result.best_rmsecv, expected.rmsecv.min())
+  assert len(sampled.candidates) == 4
+
+
+def test_search_preprocessing_misconfiguration():
+  """
+  Test that a misconfiguration shared by every candidate is reported with its error.
+  """
+  # Arrange
+  spectra, reference = load_training_data()
+  steps = [("rangecut", RangeCut(950, 1550)), ("derivative", Derivative(1))]
+
+  # Act & Assert
+  with pytest.raises(ValueError, match="could be preprocessed"):
+    search_preprocessing(spectra.values, reference.glucose, steps, {"derivative__window_length": [11, 15]}, max_components=3, cv=5)
@@ -0,0 +1,151 @@
+from fermentools.datasets.ir import load_training_data
+from fermentools.chemometrics.preprocessing import RangeCut, Derivative, MeanCentering, StandardNormalVariate
+from fermentools.chemometrics.models import LinearSpectralPredictor, ModelRegistry, export_linear_predictor, get_model_registry
+from fermentools.chemometrics.models import load_pls_glucose_model, load_pls_glucose_predictor
+
+from sklearn.cross_decomposition import PLSRegression
+
+import joblib
+import numpy as np
+import pytest
+import subprocess
+import sys
+import warnings
+
+
+def test_export_linear_predictor(tmp_path):
+  """
+  Test that the exported predictor reproduces the preprocessing and the PLS model.
+  """
+  # Arrange
+  spectra, reference = load_training_data()
+  steps = [RangeCut(950, 1550), Derivative(1, 15, 1), MeanCentering()]
+  preprocessed = spectra
+  for step in steps:
+    preprocessed = step.fit(preprocessed).transform(preprocessed)
+  pls = PLSRegression(3).fit(preprocessed, reference.glucose)
+
+  # Act
+  predictor = export_linear_predictor(pls, steps, spectra.columns, targets=["glucose"], path=tmp_path / "pls.npz")
+  loaded = LinearSpectralPredictor.load(tmp_path / "pls.npz")
+
+  # Assert
+  expected = pls.predict(preprocessed).reshape(-1, 1)
+  assert np.allclose(predictor.predict(spectra), expected)
+  assert np.allclose(loaded.predict(spectra.values), expected)
+  assert np.allclose(loaded.predict(spectra.values[0]), expected[0])
+  assert loaded.stop - loaded.start == preprocessed.shape[1]
+  assert loaded.targets == ["glucose"]
+
+
+def test_export_linear_predictor_non_affine():
+  """
+  Test that a preprocessing that is not affine is rejected.
+  """
+  # Arrange
+  spectra, reference = load_training_data()
+  steps = [RangeCut(950, 1550), StandardNormalVariate()]
+  pls = PLSRegression(2).fit(StandardNormalVariate().apply_to(RangeCut(950, 1550).apply_to(spectra)), reference.glucose)
+
+  # Act & Assert
+  with pytest.raises(ValueError):
+    export_linear_predictor(pls, steps, spectra.columns)
+
+
+def test_pls_glucose_predictor():
+  """
+  Test the bundled glucose predictor without importing the modelling dependencies.
+  """
+  # Arrange
+  code = (
+    "import sys\n"
+    "from fermentools.chemometrics.models.load_pls_glucose_predictor import load_pls_glucose_predictor\n"
+    "predictor = load_pls_glucose_predictor()\n"
+    "assert not {'mbpls', 'sklearn', 'joblib'} & set(sys.modules)\n"
+    "print(predictor.n_features_in)\n"
+  )
+
+  # Act
+  output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+  spectra, reference = load_training_data()
+  predictions = load_pls_glucose_predictor().predict(spectra)
+
+  # Assert
+  assert int(output.stdout) == spectra.shape[1]
+  assert np.sqrt(np.mean((predictions[:, 0] - reference.glucose) ** 2)) < 1.0
+
+
+def test_model_registry():
+  """
+  Test that the registry loads models once and evicts the least recently used one.
+  """
+  # Arrange
+  calls = []
+  registry = ModelRegistry(max_models=2)
+  for name in ["a", "b", "c"]:
+    registry.register(name, loader=lambda name=name: calls.append(name) or {"name": name})
+
+  # Act
+  first = registry.get("a")
+  again = registry.get("a")
+  registry.get("b")
+  registry.get("a")
+  registry.get("c")
+
+  # Assert
+  assert first is again
+  assert calls == ["a", "b", "c"]
+  assert registry.loaded == [("a", "1"), ("c", "1")]
+  assert registry.evictions == 1
+
+
+def test_model_registry_memory_map(tmp_path):
+  """
+  Test that joblib models are served memory-mapped, the bundled one without alignment warnings, and shared between calls.
+  """
+  # Arrange
+  registry = get_model_registry()
+  registry.evict("pls_glucose")
+  path = str(tmp_path / "model.joblib")
+  joblib.dump({"coef": np.arange(1000.0)}, path)
+  local_registry = ModelRegistry()
+  local_registry.register("model", path)
+
+  # Act
+  with warnings.catch_warnings():
+    warnings.filterwarnings("error", message=".*not byte aligned")
+    model = load_pls_glucose_model()
+    mapped = local_registry.get("model")
+
+  # Assert
+  assert model is load_pls_glucose_model()
+  assert not isinstance(model.beta_, np.memmap)
+  assert ("pls_glucose", "1") in registry.loaded
+  assert isinstance(mapped["coef"], np.memmap)
+  assert not mapped["coef"].flags.writeable
+
+
+def test_model_registry_failed_load():
+  """
+  Test that a loader that raises can be retried.
+  """
+  # Arrange
+  calls = []
+
+  def loader():
+    calls.append(1)
+    if len(calls) == 1:
+      raise OSError("The file is not available yet.")
+    return "model"
+
+  registry = ModelRegistry()
+  registry.register("model", loader=loader)
+
+  # Act
+  with pytest.raises(OSError):
+    registry.get("model")
+  model = registry.get("model")
+
+  # Assert
+  assert model == "model"
+  assert registry._loading == {}
@@ -0,0 +1,84 @@
+from fermentools.plotting import plot_pls_fermentation
+from fermentools.plotting.plot_mechanistic import plot_mechanistic_fermentation
+from fermentools.plotting._lod import add_lines, min_max_envelope, sample_lines
+from fermentools.reporter.plot.plot_spectra import plot_spectra
+
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+import matplotlib.pyplot as plt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def test_min_max_envelope():
+  """
+  Test that the envelope keeps the extremes of every pixel column in the order they occur.
+  """
+  # Arrange
+  rng = np.random.default_rng(0)
+  x = np.linspace(4000, 400, 3600)
+  y = rng.normal(size=(5, 3600))
+
+  # Act
+  envelope_x, envelope_y = min_max_envelope(x, y, 100)
+
+  # Assert
+  assert envelope_x.shape == envelope_y.shape == (5, 200)
+  assert np.allclose(envelope_y.min(axis=1), y.min(axis=1))
+  assert np.allclose(envelope_y.max(axis=1), y.max(axis=1))
+  assert np.all(np.diff(envelope_x, axis=1) <= 0)
+
+
+def test_plot_spectra_level_of_detail():
+  """
+  Test that the spectra are drawn as one sampled and decimated line collection.
+  """
+  # Arrange
+  rng = np.random.default_rng(0)
+  x = np.linspace(4000, 400, 3000)
+  y = rng.normal(size=(2000, 3000))
+  color_by = np.arange(2000.0)
+
+  # Act
+  fig, ax = plot_spectra(x, y, color_by=color_by, show=False, fig=Figure(), max_lines=100)
+  collection, = ax.collections
+  density = add_lines(Figure().subplots(), x, y, level_of_detail="density")
+
+  # Assert
+  assert isinstance(collection, LineCollection)
+  assert len(collection.get_segments()) == 100
+  assert max(len(segment) for segment in collection.get_segments()) <= 2 * np.ceil(ax.bbox.width)
+  assert np.array_equal(collection.get_array(), color_by[sample_lines(2000, 100)])
+  assert density.get_array().sum() > 0
+
+
+def test_plot_fermentation_level_of_detail():
+  """
+  Test that long fermentations are drawn as their envelope per pixel column and that unknown levels of detail raise.
+  """
+  # Arrange
+  rng = np.random.default_rng(0)
+  n_points = 20000
+  prediction = rng.normal(size=n_points)
+  concentrations = rng.normal(size=(n_points, 4))
+  hplc = pd.DataFrame({"time": [0.0, 1.0], "glucose": [10.0, 5.0]})
+
+  # Act
+  plot_pls_fermentation(prediction, hplc)
+  pls_ax = plt.gca()
+  plot_mechanistic_fermentation(np.arange(n_points), concentrations)
+  mechanistic_ax = plt.gca()
+  plot_pls_fermentation(prediction, hplc, level_of_detail="none")
+  full_ax = plt.gca()
+
+  # Assert
+  assert len(pls_ax.lines[0].get_xdata()) <= 2 * np.ceil(pls_ax.bbox.width) < n_points
+  assert all(len(line.get_xdata()) <= 2 * np.ceil(mechanistic_ax.bbox.width) for line in mechanistic_ax.lines)
+  assert len(full_ax.lines[0].get_xdata()) == n_points
+  with pytest.raises(ValueError):
+    plot_pls_fermentation(prediction, hplc, level_of_detail="density")
+  with pytest.raises(ValueError):
+    plot_mechanistic_fermentation(np.arange(n_points), concentrations, level_of_detail="full")
+  plt.close("all")
@@ -1,7 +1,22 @@
 from fermentools.datasets.ir import load_training_data
-from fermentools.chemometrics.preprocessing import RangeCut, Derivative
+from fermentools.chemometrics.preprocessing import RangeCut, Derivative, FusedPreprocessing
+from fermentools.chemometrics.preprocessing import (
+  AsymmetricLeastSquaresBaseline,
+  MeanCentering,
+  MultiplicativeScatterCorrection,
+  PolynomialBaseline,
+  Smoothing,
+  StandardNormalVariate,
+)
 
+from scipy.signal import savgol_filter
+from sklearn.cross_decomposition import PLSRegression
+from sklearn.exceptions import NotFittedError
+from sklearn.pipeline import Pipeline
+
+import numpy as np
 import pandas as pd
+import pytest
 
 def test_range_cut():
   """
@@ -35,3 +50,132 @@ def test_derivate():
 
   # Assert
   assert spectra_derivative.shape == spectra.shape
+
+def test_range_cut_array():
+  """
+  Test the range cut on an array using the fitted wavenumber axis.
+  """
+  # Arrange
+  spectra = load_training_data()[0]
+  range_cut = RangeCut(950, 1550).fit(spectra)
+
+  # Act
+  spectra_cut = range_cut.apply_to(spectra.values)
+
+  # Assert
+  assert np.shares_memory(spectra_cut, spectra.values)
+  assert np.array_equal(spectra_cut, spectra.loc[:, 950:1550].values)
+  assert np.array_equal(range_cut.wavenumbers_, spectra.loc[:, 950:1550].columns)
+
+def test_derivative_matches_savgol_filter():
+  """
+  Test the precomputed kernel against scipy's savgol_filter, in batch, in-place and single-spectrum mode.
+  """
+  # Arrange
+  derivative = Derivative(2, 11, 3)
+  spectra = load_training_data()[0].values
+  expected = savgol_filter(spectra, 11, 3, deriv=2)
+  buffer = spectra.copy()
+
+  # Act
+  spectra_derivative = derivative.apply_to(spectra)
+  derivative.apply_to(buffer, out=buffer)
+  spectrum_derivative = derivative.apply_to(spectra[0])
+
+  # Assert
+  assert np.allclose(spectra_derivative, expected)
+  assert np.allclose(buffer, expected)
+  assert np.allclose(spectrum_derivative, expected[0])
+
+def test_preprocessing_pipeline():
+  """
+  Test RangeCut and Derivative as steps of a scikit-learn pipeline.
+  """
+  # Arrange
+  spectra, reference = load_training_data()
+  pipeline = Pipeline([
+    ("rangecut", RangeCut(950, 1550)),
+    ("derivative", Derivative(1, 15, 1)),
+    ("pls", PLSRegression(n_components=3)),
+  ])
+
+  # Act
+  pipeline.fit(spectra, reference.glucose)
+  prediction = pipeline.predict(spectra)
+
+  # Assert
+  assert prediction.shape == (21,)
+  assert pipeline.named_steps["rangecut"].wavenumbers_.shape == (446,)
+
+
+def test_fused_preprocessing():
+  """
+  Test that the fused derivative and range cut matches the unfused steps.
+  """
+  # Arrange
+  spectra = load_training_data()[0]
+  fused = FusedPreprocessing([Derivative(1, 15, 1), RangeCut(950, 1550)])
+  expected = RangeCut(950, 1550).apply_to(Derivative(1, 15, 1).apply_to(spectra))
+
+  # Act
+  spectra_preprocessed = fused.fit_transform(spectra)
+
+  # Assert
+  assert spectra_preprocessed.shape == (21, 446)
+  assert np.allclose(spectra_preprocessed.values, expected.values)
+
+
+def test_scatter_corrections():
+  """
+  Test the standard normal variate and multiplicative scatter correction against per-row computations.
+  """
+  # Arrange
+  spectra = load_training_data()[0].values
+  reference = spectra.mean(axis=0)
+  expected_snv = np.array([(row - row.mean()) / row.std() for row in spectra])
+  expected_msc = np.array([(row - np.polyfit(reference, row, 1)[1]) / np.polyfit(reference, row, 1)[0] for row in spectra])
+
+  # Act
+  spectra_snv = StandardNormalVariate().apply_to(spectra)
+  msc = MultiplicativeScatterCorrection().fit(spectra)
+  spectra_msc = msc.apply_to(spectra)
+  spectrum_msc = msc.apply_to(spectra[0])
+
+  # Assert
+  assert np.allclose(spectra_snv, expected_snv)
+  assert np.allclose(spectra_msc, expected_msc)
+  assert spectrum_msc.shape == spectra[0].shape
+  assert np.allclose(spectrum_msc, expected_msc[0])
+
+
+def test_unfitted_scatter_corrections():
+  """
+  Test that the operators that learn from the training data must be fitted before they are applied.
+  """
+  # Arrange
+  spectra = load_training_data()[0].values
+
+  # Act & Assert
+  for operator in [MeanCentering(), MultiplicativeScatterCorrection()]:
+    with pytest.raises(NotFittedError):
+      operator.apply_to(spectra)
+
+
+def test_baseline_in_place():
+  """
+  Test that the baseline operators give the same result in place.
+  """
+  # Arrange
+  spectra = load_training_data()[0]
+  operators = [PolynomialBaseline(), AsymmetricLeastSquaresBaseline(), MeanCentering().fit(spectra), Smoothing()]
+
+  for operator in operators:
+    buffer = spectra.values.copy()
+
+    # Act
+    expected = operator.apply_to(spectra)
+    operator.apply_to(buffer, out=buffer)
+
+    # Assert
+    assert expected.shape == spectra.shape
+    assert np.allclose(buffer, expected.values)
@@ -0,0 +1,313 @@
+from fermentools.datasets.ir import load_training_data
+from fermentools.chemometrics.preprocessing import RangeCut, Derivative
+from fermentools.chemometrics.models import load_pls_glucose_predictor
+from fermentools.mechanistic import MassBalance, YeastModel
+from fermentools.realtime import BatchedExtendedKalmanFilter, EnsembleKalmanFilter, ExtendedKalmanFilter, UnscentedKalmanFilter, FileTailSource, IngestionPipeline, MicroBatchPredictor, SimulatorSource, SocketSource
+
+from scipy.integrate import odeint
+from sklearn.cross_decomposition import PLSRegression
+
+import asyncio
+import logging
+import numpy as np
+import pandas as pd
+import threading
+import time
+
+
+def test_micro_batch_predictor():
+  """
+  Test that spectra submitted from many streams are batched and predicted per stream.
+  """
+  # Arrange
+  spectra, _ = load_training_data()
+  expected = load_pls_glucose_predictor().predict(spectra)
+  results = {}
+
+  def stream(reactor):
+    futures = [predictor.submit(reactor, spectrum) for spectrum in spectra.values]
+    results[reactor] = np.array([future.result(timeout=10) for future in futures])
+
+  # Act
+  with MicroBatchPredictor(max_batch_size=16, max_latency=0.02) as predictor:
+    threads = [threading.Thread(target=stream, args=(reactor,)) for reactor in range(8)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+  metrics = predictor.metrics
+
+  # Assert
+  for reactor in range(8):
+    assert np.allclose(results[reactor], expected)
+  assert metrics.n_predictions == 8 * len(spectra)
+  assert metrics.n_batches < metrics.n_predictions
+  assert metrics.queue_depth == 0
+
+
+def test_micro_batch_predictor_preprocessing():
+  """
+  Test the predictor with the preprocessing applied to every batch.
+  """
+  # Arrange
+  spectra, reference = load_training_data()
+  steps = [RangeCut(950, 1550, wavenumbers=spectra.columns), Derivative(1, 15, 1)]
+  preprocessed = steps[1].apply_to(steps[0].apply_to(spectra.values))
+  pls = PLSRegression(3).fit(preprocessed, reference.glucose)
+  received = []
+
+  # Act
+  with MicroBatchPredictor(pls, steps, max_batch_size=4, callback=lambda stream, value: received.append(stream)) as predictor:
+    futures = [predictor.submit("reactor", spectrum) for spectrum in spectra.values]
+    predictions = np.array([future.result(timeout=10) for future in futures])
+
+  # Assert
+  assert np.allclose(predictions[:, 0], pls.predict(preprocessed).ravel())
+  assert received == ["reactor"] * len(spectra)
+  assert predictor.metrics.mean_batch_size <= 4
+
+
+def test_micro_batch_predictor_cancel():
+  """
+  Test that cancelled requests and failing callbacks do not stop the predictor, and that close without waiting cancels the queued requests.
+  """
+  # Arrange
+  release = threading.Event()
+
+  class BlockingModel:
+    def predict(self, x):
+      release.wait(10)
+      return x.sum(axis=1)
+
+  def callback(stream, value):
+    raise RuntimeError("The callback failed.")
+
+  predictor = MicroBatchPredictor(BlockingModel(), n_features=3, max_batch_size=1, callback=callback)
+
+  # Act
+  running = predictor.submit("reactor", np.ones(3))
+  while not running.running():
+    time.sleep(0.001)
+  cancelled = predictor.submit("reactor", np.ones(3))
+  is_cancelled = cancelled.cancel()
+  release.set()
+  next_result = predictor.submit("reactor", np.full(3, 2.0)).result(timeout=10)
+  release.clear()
+  blocked = predictor.submit("reactor", np.ones(3))
+  while not blocked.running():
+    time.sleep(0.001)
+  queued = predictor.submit("reactor", np.ones(3))
+  predictor.close(wait=False)
+  release.set()
+
+  # Assert
+  assert is_cancelled
+  assert running.result(timeout=10) == 3
+  assert next_result == 6
+  assert blocked.result(timeout=10) == 3
+  assert queued.cancelled()
+
+
+def test_ingestion_soak():
+  """
+  Test the ingestion of 120 simulated reactors into the micro-batched predictor.
+  """
+  # Arrange
+  spectra, _ = load_training_data()
+  expected = load_pls_glucose_predictor().predict(spectra)
+  predictor = MicroBatchPredictor(max_batch_size=128, max_latency=0.01)
+  received = {}
+
+  async def handler(message):
+    prediction = await predictor.predict_async(message)
+    received.setdefault(message.stream_id, []).append((message.time, prediction))
+
+  pipeline = IngestionPipeline(handler, max_queue_size=4)
+  for reactor in range(120):
+    pipeline.add_source(SimulatorSource(reactor, spectra.values, speedup=20000))
+
+  # Act
+  metrics = asyncio.run(pipeline.run())
+  predictor.close()
+
+  # Assert
+  assert metrics.errors == 0
+  assert metrics.processed == 120 * len(spectra)
+  assert metrics.max_queue_depth <= 4
+  assert predictor.metrics.mean_batch_size > 1
+  for reactor in range(120):
+    times, predictions = zip(*received[reactor])
+    assert np.all(np.diff(times) > 0)
+    assert np.allclose(predictions, expected)
+
+
+def test_ingestion_errors(caplog):
+  """
+  Test that the errors of the sources and of the handler are logged and the last one is kept in the metrics.
+  """
+  # Arrange
+  class FailingSource:
+    async def __aiter__(self):
+      raise ConnectionRefusedError("The reactor is offline.")
+      yield
+
+  def handler(message):
+    raise ValueError(f"Spectrum {message.time} is corrupt.")
+
+  pipeline = IngestionPipeline(handler)
+  pipeline.add_source(FailingSource())
+  pipeline.add_source(SimulatorSource("reactor", np.ones((3, 4)), speedup=np.inf))
+
+  # Act
+  with caplog.at_level(logging.ERROR, logger="fermentools.realtime"):
+    metrics = asyncio.run(pipeline.run())
+
+  # Assert
+  assert metrics.errors == 4
+  assert metrics.processed == 0
+  assert "ValueError" in metrics.last_error or "ConnectionRefusedError" in metrics.last_error
+  logged = [record.exc_info[1] for record in caplog.records if record.exc_info]
+  assert len(logged) == 4
+  assert sum(isinstance(error, ConnectionRefusedError) for error in logged) == 1
+
+
+def test_ingestion_file_and_socket(tmp_path):
+  """
+  Test the file tail and socket sources with preprocessing in the thread pool.
+  """
+  # Arrange
+  spectra, _ = load_training_data()
+  lines = [",".join(map(str, spectrum)) for spectrum in spectra.values[:5]]
+  path = tmp_path / "spectra.csv"
+  path.write_text(",".join(map(str, spectra.columns)) + "\n" + "\n".join(lines[:2]) + "\n")
+  received = []
+
+  async def main():
+    async def serve(reader, writer):
+      writer.write(("\n".join(lines) + "\n").encode())
+      await writer.drain()
+      writer.close()
+
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    pipeline = IngestionPipeline(lambda message: received.append((message.stream_id, message.spectrum.sum())), preprocess=np.cumsum)
+    pipeline.add_source(FileTailSource("file", path, poll_interval=0.01, idle_timeout=0.3))
+    pipeline.add_source(SocketSource("socket", port=port))
+    run = asyncio.create_task(pipeline.run())
+    await asyncio.sleep(0.05)
+    with open(path, "a") as f:
+      f.write("\n".join(lines[2:]) + "\n")
+    metrics = await run
+    server.close()
+    return metrics
+
+  # Act
+  metrics = asyncio.run(main())
+
+  # Assert
+  expected = np.cumsum(spectra.values[:5], axis=1).sum(axis=1)
+  assert metrics.per_stream == {"file": 5, "socket": 5}
+  assert np.allclose([value for stream, value in received if stream == "file"], expected)
+  assert np.allclose([value for stream, value in received if stream == "socket"], expected)
+
+
+def _simulate_fermentation(n_times):
+  yeast_model = YeastModel(model_type="monod_non_competitive", substrate_biomass_yield=0.4, substrate_product_yield=0.51, max_uptake_rate=0.55, affinity_constant=0.1, substrate_inhibition_constant=5)
+  mass_balance = MassBalance(yeast_model, 0, 0)
+  times = np.arange(n_times) * 1.28 / 60
+  return mass_balance, times, odeint(mass_balance.calculate, [40, 0.45, 0], times)
+
+
+def test_extended_kalman_filter():
+  """
+  Test that the filter tracks a simulated fermentation from noisy glucose and sparse HPLC measurements.
+  """
+  # Arrange
+  mass_balance, times, states = _simulate_fermentation(600)
+  rng = np.random.default_rng(0)
+  glucose = states[:, 0] + rng.normal(0, 0.5, len(times))
+  hplc = pd.DataFrame({"time": times[::50], "glucose": states[::50, 0], "ethanol": states[::50, 2]})
+  ekf = ExtendedKalmanFilter([[0.25]], np.diag([1e-3, 1e-4, 1e-3]), mass_balance, initial_state=[35, 0.45, 2], initial_covariance=np.diag([10, 0.1, 4]))
+
+  # Act
+  estimates, covariances = ekf.filter(glucose, hplc=hplc, hplc_covariance=np.diag([0.01, 0.01]))
+
+  # Assert
+  assert estimates.shape == (600, 3)
+  assert np.abs(estimates[100:, [0, 2]] - states[100:, [0, 2]]).max() < 0.5
+  assert np.allclose(covariances, np.swapaxes(covariances, 1, 2))
+  assert np.all(np.linalg.eigvalsh(covariances) > 0)
+
+
+def test_extended_kalman_filter_jacobian():
+  """
+  Test that the complex-step transition matches the one from an analytic Jacobian.
+  """
+  # Arrange
+  mass_balance, _, _ = _simulate_fermentation(1)
+
+  class ComplexStepMassBalance:
+    # without a jacobian method the filter differentiates calculate by complex step
+    def calculate(self, state, time):
+      return mass_balance.calculate(state, time)
+
+  complex_step = ExtendedKalmanFilter([[0.25]], np.eye(3), ComplexStepMassBalance(), initial_state=[20, 2, 5])
+  analytic = ExtendedKalmanFilter([[0.25]], np.eye(3), mass_balance, initial_state=[20, 2, 5])
+
+  # Act
+  complex_step.predict(0.5)
+  analytic.predict(0.5)
+
+  # Assert
+  assert complex_step._jacobian is None and analytic._jacobian is not None
+  assert np.allclose(complex_step.state, analytic.state)
+  assert np.allclose(complex_step.covariance, analytic.covariance)
+
+
+def test_batched_extended_kalman_filter():
+  """
+  Test that the batched filter matches one filter per reactor, with masked missing measurements.
+  """
+  # Arrange
+  mass_balance, _, _ = _simulate_fermentation(1)
+  rng = np.random.default_rng(0)
+  initial_states = np.column_stack([rng.uniform(20, 40, 6), rng.uniform(0.3, 1, 6), rng.uniform(0, 5, 6)])
+  measurements = rng.normal(25, 3, (30, 6))
+  measurements[rng.random((30, 6)) < 0.3] = np.nan
+  covariance = np.diag([1e-3, 1e-4, 1e-3])
+  filters = [ExtendedKalmanFilter([[0.25]], covariance, mass_balance, initial_state=state, initial_covariance=np.diag([10, 0.1, 1])) for state in initial_states]
+  batched = BatchedExtendedKalmanFilter([[0.25]], covariance, mass_balance, initial_states=initial_states, initial_covariances=np.diag([10, 0.1, 1]))
+
+  # Act
+  for measurement in measurements:
+    for ekf, value in zip(filters, measurement):
+      ekf.step(value)
+    batched.step(measurement)
+
+  # Assert
+  assert np.allclose(batched.states, [ekf.state for ekf in filters])
+  assert np.allclose(batched.covariances, [ekf.covariance for ekf in filters])
+
+
+def test_unscented_and_ensemble_kalman_filters():
+  """
+  Test that the unscented and ensemble filters track a simulated fermentation, with the ensemble propagated in worker processes.
+  """
+  # Arrange
+  mass_balance, times, states = _simulate_fermentation(300)
+  rng = np.random.default_rng(0)
+  glucose = states[:, 0] + rng.normal(0, 0.5, len(times))
+  arguments = dict(measurement_covariance=[[0.25]], model_covariance=np.diag([1e-3, 1e-4, 1e-3]), process_model=mass_balance, initial_state=[35, 0.45, 0], initial_covariance=np.diag([10, 0.1, 0.1]))
+  ukf = UnscentedKalmanFilter(**arguments)
+  enkf = EnsembleKalmanFilter(n_members=200, random_state=0, **arguments)
+
+  # Act
+  ukf_states, _ = ukf.filter(glucose)
+  enkf_states, _ = enkf.filter(glucose[:20])
+  with EnsembleKalmanFilter(n_members=200, random_state=0, n_jobs=2, **arguments) as parallel:
+    parallel_states, _ = parallel.filter(glucose[:20])
+
+  # Assert
+  assert np.abs(ukf_states[100:, 0] - states[100:, 0]).max() < 0.5
+  assert np.abs(enkf_states[10:, 0] - states[10:20, 0]).max() < 1.0
+  assert np.allclose(parallel_states, enkf_states)
@@ -0,0 +1,93 @@
+from fermentools.reporter import PCAReport, PLSRegressionReport, render_report, render_reports
+
+from chemotools.outliers import QResiduals, HotellingT2
+from sklearn.cross_decomposition import PLSRegression
+from sklearn.decomposition import PCA
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from matplotlib.figure import Figure
+import matplotlib.pyplot as plt
+import numpy as np
+import os
+import pytest
+
+
+def test_report_cache():
+  """
+  Test that the cached statistics match chemotools and are recomputed after the model is refitted or the data change.
+  """
+  # Arrange
+  rng = np.random.default_rng(0)
+  X_train, X_test = rng.normal(size=(200, 30)), rng.normal(size=(50, 30))
+  y_train, y_test = X_train[:, :3].sum(axis=1), X_test[:, :3].sum(axis=1)
+  pipeline = make_pipeline(StandardScaler(), PLSRegression(3)).fit(X_train, y_train)
+  report = PLSRegressionReport(pipeline, X_train, y_train, X_test, y_test)
+
+  # Act
+  report.compute()
+  predictions = report.predictions("test")
+  q_residuals = QResiduals(pipeline).fit(X_train)
+  hotelling_t2 = HotellingT2(pipeline).fit(X_train)
+
+  # Assert
+  assert report.predictions("test") is predictions
+  assert np.allclose(predictions, pipeline.predict(X_test))
+  assert np.allclose(report.q_residuals("test"), q_residuals.predict_residuals(X_test))
+  assert np.allclose(report.hotelling_t2("train"), hotelling_t2.predict_residuals(X_train))
+  assert np.isclose(report.q_residuals_critical_value, q_residuals.critical_value_)
+  assert np.isclose(report.hotelling_t2_critical_value, hotelling_t2.critical_value_)
+
+  # Act
+  pipeline.fit(X_train[:100], y_train[:100])
+
+  # Assert
+  assert np.allclose(report.predictions("test"), pipeline.predict(X_test))
+
+  # Act
+  pca_report = PCAReport(PCA(3).fit(X_train), X_train, y_train)
+  scores = pca_report.scores("train")
+  pca_report.X_train = X_test
+
+  # Assert
+  assert len(scores) == 200
+  assert len(pca_report.scores("train")) == 50
+
+
+def test_render_reports(tmp_path):
+  """
+  Test that every plot of the reports is written to files without opening pyplot figures.
+  """
+  # Arrange
+  rng = np.random.default_rng(0)
+  X, wavenumbers = rng.normal(size=(60, 20)), np.linspace(1000, 1200, 20)
+  y = X[:, :3].sum(axis=1)
+  pca_report = PCAReport(make_pipeline(StandardScaler(), PCA(2)).fit(X), X, y, wavenumbers=wavenumbers)
+  pls_report = PLSRegressionReport(PLSRegression(2).fit(X, y), X, y, X[:10], y[:10], wavenumbers=wavenumbers)
+  n_figures = len(plt.get_fignums())
+
+  # Act
+  pca_paths = render_report(pca_report, tmp_path, "pca", formats=("png", "html"))
+  pls_paths = render_reports({"pls": pls_report}, tmp_path, formats=("svg",), n_jobs=1)["pls"]
+  pooled_paths = render_reports({"pca": pca_report, "pls": pls_report}, tmp_path / "pooled", formats=("png",), n_jobs=2)
+  for plot in pca_report._available_plots():
+    getattr(pca_report, plot)(show=False, fig=Figure())
+
+  # Assert
+  assert [os.path.basename(path) for path in pca_paths] == [
+    "pca_plot_data.png",
+    "pca_plot_preprocessed_data.png",
+    "pca_plot_scores.png",
+    "pca_plot_loadings.png",
+    "pca_plot_scree.png",
+    "pca_plot_residuals.png",
+    "pca.html",
+  ]
+  assert (tmp_path / "pca.html").read_text().count("<svg") == 6
+  assert len(pls_paths) == 4
+  assert all(os.path.exists(path) for path in pca_paths + pls_paths)
+  assert [len(paths) for paths in pooled_paths.values()] == [6, 4]
+  assert all(os.path.exists(path) for paths in pooled_paths.values() for path in paths)
+  assert len(plt.get_fignums()) == n_figures
+  with pytest.raises(ValueError):
+    pca_report.plot_scores(show=False)